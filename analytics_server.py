@@ -12,131 +12,246 @@ import os
 import statistics
 import math
 
+import numpy as np
+
+from crm_migrations import apply_migrations
+from db_pool import ConnectionPool
+from pipeline_rollup import open_stages, stage_totals
+from result_cache import ResultCache, cached
+
 # Initialize MCP server
 mcp = FastMCP("AI Sales Analytics Server")
 
 # Database path (shared with CRM server)
 DB_PATH = os.path.join("data", "sales_crm.db")
 
+# Persistent connections owned by this server process (schema migrated on first use)
+pool = ConnectionPool(DB_PATH, initializer=apply_migrations)
+
 def get_db():
-    """Get database connection"""
-    return sqlite3.connect(DB_PATH)
+    """Check out a pooled database connection (use as a context manager)"""
+    return pool.connection()
+
+# Results of the read-only dashboard tools, invalidated when CRM data changes
+cache = ResultCache()
+
+# Monte Carlo forecast settings
+MONTE_CARLO_TRIALS = 10000
+MAX_MONTE_CARLO_TRIALS = 100000
+SLIPPAGE_MEAN_DAYS = 14.0           # Mean close-date slip for deals that are won
+SIMULATION_CHUNK_ELEMENTS = 1 << 22  # Deal-trials sampled at once (~8 MB of uint16)
+PROBABILITY_RESOLUTION = 1 << 16    # Outcomes are sampled from uint16 uniforms
+
+# Days from today at which each forecast band ends
+FORECAST_BAND_ENDS = {
+    "next_month": [30],
+    "next_quarter": [30, 60, 90],
+    "next_year": [91, 182, 273, 365]
+}
+
+def simulate_pipeline(
+    amounts: np.ndarray,
+    probabilities: np.ndarray,
+    days_to_close: np.ndarray,
+    band_ends: List[int],
+    trials: int,
+    seed: Optional[int] = None,
+    slippage_mean_days: float = SLIPPAGE_MEAN_DAYS,
+    chunk_elements: int = SIMULATION_CHUNK_ELEMENTS
+) -> np.ndarray:
+    """
+    Simulate won revenue per forecast band for every trial
+
+    Each deal is won with its probability; a won deal closes on its close date
+    (today if overdue) plus an exponential slip. One uniform draw per deal and
+    trial is compared against the deal's cumulative "won and closed by the end
+    of band b" probability, which samples outcome and slip together.
+
+    Returns:
+        Array of shape (trials, bands) with the revenue closed in each band
+    """
+    # Deals that can never close won are dropped; the rest sorted by close day
+    # so each band only touches the prefix of deals that could close in it
+    keep = probabilities > 0
+    days = np.maximum(days_to_close[keep], 0)
+    order = np.argsort(days, kind="stable")
+    days = days[order]
+    win = probabilities[keep][order] / 100
+    weights = amounts[keep][order].astype(np.float32)  # float32 BLAS; ~1e-6 relative error
+
+    ends = np.asarray(band_ends, dtype=float)
+    prefix = np.searchsorted(days, ends, side="left")
+    closed_by = win[None, :] * -np.expm1(-np.maximum(ends[:, None] - days[None, :], 0) / slippage_mean_days)
+    thresholds = (np.ceil(closed_by * PROBABILITY_RESOLUTION) - 1).clip(0, PROBABILITY_RESOLUTION - 1)
+    thresholds = thresholds.astype(np.uint16)
+
+    rng = np.random.default_rng(seed)
+    cumulative = np.zeros((trials, len(ends)))
+    sampled = int(prefix[-1])
+    chunk = max(1, chunk_elements // max(sampled, 1))
+
+    for start in range(0, trials, chunk):
+        stop = min(start + chunk, trials)
+        # Whole uint32 words per trial, so results do not depend on the chunk size
+        words = rng.integers(0, 1 << 32, size=(stop - start, (sampled + 1) // 2), dtype=np.uint32)
+        draws = words.view(np.uint16)[:, :sampled]
+        for band, k in enumerate(prefix):
+            closed = draws[:, :k] <= thresholds[band, :k]
+            cumulative[start:stop, band] = closed.view(np.uint8) @ weights[:k]
+
+    return np.diff(cumulative, axis=1, prepend=0)
 
 @mcp.tool()
+@cached(cache, get_db, bypass=lambda args: args["method"] == "monte_carlo" and args["seed"] is None)
 def generate_sales_forecast(
     period: str = "next_quarter",
-    method: str = "weighted_pipeline"
+    method: str = "weighted_pipeline",
+    trials: int = MONTE_CARLO_TRIALS,
+    seed: Optional[int] = None
 ) -> Dict:
     """
     Generate AI-powered sales forecast
 
     Args:
         period: Forecast period (next_quarter, next_month, next_year)
-        method: Forecasting method (weighted_pipeline, historical_trend, hybrid)
+        method: Forecasting method (weighted_pipeline, historical_trend, hybrid, monte_carlo)
+        trials: Simulated pipeline outcomes (monte_carlo only)
+        seed: Random seed for reproducible simulations (monte_carlo only; unseeded runs are never cached)
 
     Returns:
         Forecast with confidence intervals
     """
-    conn = get_db()
-    cursor = conn.cursor()
-
-    # Get historical closed won deals
-    cursor.execute("""
-        SELECT amount, close_date 
-        FROM deals 
-        WHERE stage = 'Closed Won'
-        AND close_date >= date('now', '-180 days')
-        ORDER BY close_date
-    """)
-    historical_deals = cursor.fetchall()
-
-    # Calculate historical metrics
-    if historical_deals:
-        amounts = [deal[0] for deal in historical_deals]
-        avg_deal_size = statistics.mean(amounts)
-        deal_variance = statistics.variance(amounts) if len(amounts) > 1 else 0
-
-        # Calculate monthly run rate
-        months_of_data = 6
-        total_historical = sum(amounts)
-        monthly_run_rate = total_historical / months_of_data
-    else:
-        avg_deal_size = 50000  # Default
-        monthly_run_rate = 100000  # Default
-        deal_variance = 10000
-
-    # Get current pipeline
-    cursor.execute("""
-        SELECT stage, SUM(amount) as total, AVG(probability) as avg_prob, COUNT(*) as count
-        FROM deals
-        WHERE stage NOT IN ('Closed Won', 'Closed Lost')
-        GROUP BY stage
-    """)
-    pipeline = cursor.fetchall()
-
-    # Calculate weighted pipeline value
-    weighted_pipeline = sum(
-        (row[1] or 0) * (row[2] or 0) / 100 
-        for row in pipeline
-    )
-
-    # Forecast based on method
-    if method == "weighted_pipeline":
-        base_forecast = weighted_pipeline
-    elif method == "historical_trend":
-        # Simple linear projection
-        if period == "next_quarter":
-            base_forecast = monthly_run_rate * 3
-        elif period == "next_month":
-            base_forecast = monthly_run_rate
-        else:  # next_year
-            base_forecast = monthly_run_rate * 12
-    else:  # hybrid
-        # Combine pipeline and historical
-        pipeline_factor = 0.6
-        historical_factor = 0.4
-
-        period_multiplier = {"next_month": 1, "next_quarter": 3, "next_year": 12}[period]
-        historical_component = monthly_run_rate * period_multiplier
-
-        base_forecast = (weighted_pipeline * pipeline_factor) + (historical_component * historical_factor)
-
-    # Calculate confidence intervals
-    confidence_factor = 0.2  # 20% variance
-    low_forecast = base_forecast * (1 - confidence_factor)
-    high_forecast = base_forecast * (1 + confidence_factor)
-
-    # Get pipeline stages for breakdown
-    cursor.execute("""
-        SELECT stage, COUNT(*) as count, SUM(amount) as total
-        FROM deals
-        WHERE stage NOT IN ('Closed Won', 'Closed Lost')
-        GROUP BY stage
-    """)
-    stage_breakdown = []
-    for row in cursor.fetchall():
-        stage_breakdown.append({
-            "stage": row[0],
-            "deal_count": row[1],
-            "total_value": row[2] or 0
-        })
-
-    conn.close()
-
-    return {
+    with get_db() as conn:
+        cursor = conn.cursor()
+
+        # Get historical closed won deals
+        cursor.execute("""
+            SELECT amount, close_date 
+            FROM deals 
+            WHERE stage = 'Closed Won'
+            AND close_date >= date('now', '-180 days')
+            ORDER BY close_date
+        """)
+        historical_deals = cursor.fetchall()
+
+        # Calculate historical metrics
+        if historical_deals:
+            amounts = [deal[0] for deal in historical_deals]
+            avg_deal_size = statistics.mean(amounts)
+            deal_variance = statistics.variance(amounts) if len(amounts) > 1 else 0
+
+            # Calculate monthly run rate
+            months_of_data = 6
+            total_historical = sum(amounts)
+            monthly_run_rate = total_historical / months_of_data
+        else:
+            avg_deal_size = 50000  # Default
+            monthly_run_rate = 100000  # Default
+            deal_variance = 10000
+
+        # Current pipeline, from the write-maintained rollup
+        pipeline = open_stages(stage_totals(conn))
+
+        # Calculate weighted pipeline value
+        weighted_pipeline = sum(
+            row["total_value"] * (row["avg_probability"] or 0) / 100
+            for row in pipeline.values()
+        )
+
+        # Forecast based on method
+        simulation = None
+        if method == "monte_carlo":
+            cursor.execute("""
+                SELECT IFNULL(amount, 0), IFNULL(probability, 0),
+                       IFNULL(julianday(close_date) - julianday('now', 'localtime', 'start of day'), 0)
+                FROM deals
+                WHERE stage NOT IN ('Closed Won', 'Closed Lost')
+            """)
+            deals = np.array(cursor.fetchall(), dtype=float).reshape(-1, 3)
+            band_ends = FORECAST_BAND_ENDS[period]
+            trials = max(1, min(trials, MAX_MONTE_CARLO_TRIALS))
+
+            band_revenue = simulate_pipeline(
+                amounts=deals[:, 0],
+                probabilities=deals[:, 1],
+                days_to_close=deals[:, 2],
+                band_ends=band_ends,
+                trials=trials,
+                seed=seed
+            )
+            totals = band_revenue.sum(axis=1)
+            base_forecast = float(totals.mean())
+            low_forecast, median_forecast, high_forecast = np.percentile(totals, [10, 50, 90]).tolist()
+
+            today = datetime.now().date()
+            band_p10, band_p50, band_p90 = np.percentile(band_revenue, [10, 50, 90], axis=0)
+            simulation = {
+                "trials": trials,
+                "seed": seed,
+                "open_deals": len(deals),
+                "slippage_mean_days": SLIPPAGE_MEAN_DAYS,
+                "median": round(median_forecast, 2),
+                "period_bands": [
+                    {
+                        "start_date": (today + timedelta(days=band_start)).strftime("%Y-%m-%d"),
+                        "end_date": (today + timedelta(days=band_end - 1)).strftime("%Y-%m-%d"),
+                        "p10": round(float(band_p10[i]), 2),
+                        "p50": round(float(band_p50[i]), 2),
+                        "p90": round(float(band_p90[i]), 2),
+                        "expected": round(float(band_revenue[:, i].mean()), 2)
+                    }
+                    for i, (band_start, band_end) in enumerate(zip([0] + band_ends[:-1], band_ends))
+                ]
+            }
+        elif method == "weighted_pipeline":
+            base_forecast = weighted_pipeline
+        elif method == "historical_trend":
+            # Simple linear projection
+            if period == "next_quarter":
+                base_forecast = monthly_run_rate * 3
+            elif period == "next_month":
+                base_forecast = monthly_run_rate
+            else:  # next_year
+                base_forecast = monthly_run_rate * 12
+        else:  # hybrid
+            # Combine pipeline and historical
+            pipeline_factor = 0.6
+            historical_factor = 0.4
+
+            period_multiplier = {"next_month": 1, "next_quarter": 3, "next_year": 12}[period]
+            historical_component = monthly_run_rate * period_multiplier
+
+            base_forecast = (weighted_pipeline * pipeline_factor) + (historical_component * historical_factor)
+
+        # Calculate confidence intervals (simulated P10/P90 for monte_carlo)
+        if simulation is None:
+            confidence_factor = 0.2  # 20% variance
+            low_forecast = base_forecast * (1 - confidence_factor)
+            high_forecast = base_forecast * (1 + confidence_factor)
+
+        # Pipeline stages for breakdown
+        stage_breakdown = []
+        for stage, row in pipeline.items():
+            stage_breakdown.append({
+                "stage": stage,
+                "deal_count": row["deals"],
+                "total_value": row["total_value"]
+            })
+
+    forecast = {
         "period": period,
         "method": method,
         "forecast": {
             "expected": round(base_forecast, 2),
             "low": round(low_forecast, 2),
             "high": round(high_forecast, 2),
-            "confidence": "80%"
+            "confidence": "80%" if simulation is None else "80% (simulated P10-P90)"
         },
         "pipeline_breakdown": stage_breakdown,
         "historical_metrics": {
             "avg_deal_size": round(avg_deal_size, 2),
             "monthly_run_rate": round(monthly_run_rate, 2),
-            "total_pipeline": round(sum(row[1] or 0 for row in pipeline), 2)
+            "total_pipeline": round(sum(row["total_value"] for row in pipeline.values()), 2)
         },
         "factors_considered": [
             "Current pipeline value and probability",
@@ -146,84 +261,96 @@ def generate_sales_forecast(
         ]
     }
 
+    if simulation is not None:
+        forecast["simulation"] = simulation
+        forecast["factors_considered"] = [
+            "Per-deal win probability",
+            f"Close date slippage (exponential, mean {SLIPPAGE_MEAN_DAYS:.0f} days)",
+            "Overdue deals re-forecast from today"
+        ]
+
+    return forecast
+
+# Funnel stages in order (Closed Lost is an exit, not a funnel step)
+FUNNEL_STAGES = ["Prospecting", "Qualification", "Proposal", "Negotiation", "Closed Won"]
+
+# Rollup day windows for the analysis periods
+PERIOD_START = {
+    "last_month": "date('now', '-30 days')",
+    "last_quarter": "date('now', '-90 days')",
+    "all_time": "'1900-01-01'"
+}
+
 @mcp.tool()
+@cached(cache, get_db)
 def analyze_conversion_rates(
     time_period: str = "last_quarter"
 ) -> Dict:
     """
     Analyze conversion rates through the sales funnel
 
+    Computed from recorded stage transitions (deal_stage_history), read from
+    the per-day transition rollup so cost depends on stages, not deal count.
+
     Args:
         time_period: Analysis period (last_quarter, last_month, all_time)
 
     Returns:
         Funnel analysis with conversion rates
     """
-    conn = get_db()
-    cursor = conn.cursor()
-
-    # Define funnel stages in order
-    funnel_stages = ["Prospecting", "Qualification", "Proposal", "Negotiation", "Closed Won"]
-
-    # Get deal movements (simplified - in production would track stage history)
-    date_filter = {
-        "last_month": "date('now', '-30 days')",
-        "last_quarter": "date('now', '-90 days')",
-        "all_time": "'1900-01-01'"
-    }[time_period]
-
-    # Count deals by stage
-    stage_counts = {}
-    for stage in funnel_stages + ["Closed Lost"]:
-        cursor.execute(f"""
-            SELECT COUNT(*) FROM deals 
-            WHERE stage = ? AND created_date >= {date_filter}
-        """, (stage,))
-        stage_counts[stage] = cursor.fetchone()[0]
-
-    # Calculate conversion rates
+    date_filter = PERIOD_START[time_period]
+
+    with get_db() as conn:
+        # Single aggregate pass over (from_stage, to_stage) pairs in the window
+        cursor = conn.execute(f"""
+            SELECT from_stage, to_stage, SUM(transitions), SUM(total_days_in_from_stage)
+            FROM stage_transition_rollup
+            WHERE day >= {date_filter}
+            GROUP BY from_stage, to_stage
+        """)
+        transitions = {(row[0], row[1]): (row[2], row[3]) for row in cursor.fetchall()}
+
+    # Deals entering each stage, and deals leaving it (with time spent there)
+    entered = {}
+    exits = {}
+    for (from_stage, to_stage), (count, days) in transitions.items():
+        entered[to_stage] = entered.get(to_stage, 0) + count
+        if from_stage:
+            exit_count, exit_days = exits.get(from_stage, (0, 0.0))
+            exits[from_stage] = (exit_count + count, exit_days + days)
+
+    # Conversion = moves from a stage to any later funnel stage / deals that entered it
     conversions = []
-    total_entered = sum(stage_counts.values())
-
-    for i in range(len(funnel_stages) - 1):
-        current_stage = funnel_stages[i]
-        next_stage = funnel_stages[i + 1]
+    for i in range(len(FUNNEL_STAGES) - 1):
+        current_stage = FUNNEL_STAGES[i]
+        later_stages = FUNNEL_STAGES[i + 1:]
 
-        # In real system, would track actual transitions
-        # Here we estimate based on current distribution
-        current_count = sum(stage_counts[s] for s in funnel_stages[i:])
-        next_count = sum(stage_counts[s] for s in funnel_stages[i+1:])
+        current_count = entered.get(current_stage, 0)
+        next_count = sum(transitions.get((current_stage, s), (0, 0))[0] for s in later_stages)
 
-        conversion_rate = (next_count / current_count * 100) if current_count > 0 else 0
+        conversion_rate = min(next_count / current_count * 100, 100) if current_count > 0 else 0
 
         conversions.append({
             "from_stage": current_stage,
-            "to_stage": next_stage,
+            "to_stage": FUNNEL_STAGES[i + 1],
             "conversion_rate": round(conversion_rate, 1),
             "deals_converted": next_count,
             "deals_in_stage": current_count
         })
 
     # Overall funnel metrics
-    total_won = stage_counts.get("Closed Won", 0)
-    total_lost = stage_counts.get("Closed Lost", 0)
+    total_entered = sum(count for (from_stage, _), (count, _) in transitions.items() if not from_stage)
+    total_won = entered.get("Closed Won", 0)
+    total_lost = entered.get("Closed Lost", 0)
     total_closed = total_won + total_lost
 
     overall_win_rate = (total_won / total_closed * 100) if total_closed > 0 else 0
 
-    # Calculate velocity (average days in each stage)
-    cursor.execute(f"""
-        SELECT stage, AVG(julianday('now') - julianday(created_date)) as avg_days
-        FROM deals
-        WHERE created_date >= {date_filter}
-        GROUP BY stage
-    """)
-
-    velocity_by_stage = {}
-    for row in cursor.fetchall():
-        velocity_by_stage[row[0]] = round(row[1], 1) if row[1] else 0
-
-    conn.close()
+    # Velocity = average days spent in a stage before moving out of it
+    velocity_by_stage = {
+        stage: round(days / count, 1) if count else 0
+        for stage, (count, days) in exits.items()
+    }
 
     return {
         "time_period": time_period,
@@ -235,6 +362,7 @@ def analyze_conversion_rates(
             "deals_won": total_won,
             "deals_lost": total_lost
         },
+        "stage_entries": entered,
         "velocity_by_stage": velocity_by_stage,
         "bottlenecks": [
             conv for conv in conversions 
@@ -247,6 +375,83 @@ def analyze_conversion_rates(
         ] if conversions else []
     }
 
+# Deal scoring weights
+AVG_DEAL_SIZE = 100000  # Could calculate from historical
+STAGE_SCORES = {
+    "Prospecting": 5,
+    "Qualification": 10,
+    "Proposal": 20,
+    "Negotiation": 25
+}
+SCORING_TOP_K = 10
+
+def score_deal_features(
+    amount: np.ndarray,
+    stage: np.ndarray,
+    days_in_pipeline: np.ndarray,
+    annual_revenue: np.ndarray,
+    recent_activities: np.ndarray,
+    days_to_close: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """
+    Score deals column-wise; every argument is an array with one entry per deal
+
+    Returns:
+        Each factor's score array plus the clamped total under "score"
+    """
+    # 1. Deal size factor (larger deals score higher)
+    size_score = np.minimum(30, (amount / AVG_DEAL_SIZE) * 15)
+
+    # 2. Stage progression factor (lookup once per distinct stage)
+    stages, stage_index = np.unique(stage, return_inverse=True)
+    stage_score = np.array([STAGE_SCORES.get(s, 0) for s in stages], dtype=np.int64)[stage_index]
+
+    # 3. Time in pipeline (penalty for stale deals)
+    time_penalty = np.select([days_in_pipeline > 90, days_in_pipeline > 60], [-10, -5], 5)
+
+    # 4. Account quality
+    account_score = np.select([annual_revenue > 50000000, annual_revenue > 10000000], [15, 10], 5)
+
+    # 5. Recent engagement
+    engagement_score = np.select([recent_activities > 5, recent_activities > 2], [15, 10], 0)
+
+    # 6. Close date proximity
+    urgency_score = np.select([(days_to_close > 0) & (days_to_close < 30), days_to_close < 0], [10, -5], 5)
+
+    # Same summation order as the per-deal version, then normalize to 0-100
+    score = size_score + stage_score
+    score = score + time_penalty
+    score = score + account_score
+    score = score + engagement_score
+    score = score + urgency_score
+
+    return {
+        "size": size_score,
+        "stage": stage_score,
+        "time": time_penalty,
+        "account": account_score,
+        "engagement": engagement_score,
+        "urgency": urgency_score,
+        "score": np.clip(score, 0, 100)
+    }
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest scores, highest first
+
+    Ties keep input order, matching a stable sort over the whole array.
+    """
+    n = len(scores)
+    if n > k:
+        kth_value = scores[np.argpartition(scores, n - k)[n - k]]
+        above = np.flatnonzero(scores > kth_value)
+        ties = np.flatnonzero(scores == kth_value)[:k - len(above)]
+        candidates = np.concatenate([above, ties])
+    else:
+        candidates = np.arange(n)
+
+    return candidates[np.lexsort((candidates, -scores[candidates]))]
+
 @mcp.tool()
 def calculate_deal_scoring(
     account_id: Optional[int] = None,
@@ -262,95 +467,56 @@ def calculate_deal_scoring(
     Returns:
         Scored and ranked deals with recommendations
     """
-    conn = get_db()
-    cursor = conn.cursor()
-
-    # Get deals to score
-    query = """
-        SELECT d.*, a.annual_revenue, a.industry,
-               (SELECT COUNT(*) FROM activities WHERE account_id = d.account_id 
-                AND activity_date >= date('now', '-30 days')) as recent_activities,
-               julianday('now') - julianday(d.created_date) as days_in_pipeline
-        FROM deals d
-        JOIN accounts a ON d.account_id = a.id
-        WHERE d.stage NOT IN ('Closed Won', 'Closed Lost')
-    """
-
-    if account_id:
-        query += f" AND d.account_id = {account_id}"
-
-    cursor.execute(query)
-    columns = [desc[0] for desc in cursor.description]
-    deals = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    with get_db() as conn:
+        # Get deal features; recent activity counted once per account, not per deal
+        query = """
+            SELECT d.id, d.name, d.amount, d.stage, d.close_date, a.annual_revenue,
+                   IFNULL(act.recent_activities, 0),
+                   julianday('now') - julianday(d.created_date) as days_in_pipeline
+            FROM deals d
+            JOIN accounts a ON d.account_id = a.id
+            LEFT JOIN (
+                SELECT account_id, COUNT(*) as recent_activities
+                FROM activities
+                WHERE activity_date >= date('now', '-30 days')
+                GROUP BY account_id
+            ) act ON act.account_id = d.account_id
+            WHERE d.stage NOT IN ('Closed Won', 'Closed Lost')
+        """
+        params = []
+
+        if account_id:
+            query += " AND d.account_id = ?"
+            params.append(account_id)
+
+        rows = conn.execute(query, params).fetchall()
+
+    if not rows:
+        return []
+
+    # Columnar feature arrays
+    ids, names, amounts, stages, close_dates, revenues, recent, days_in_pipe = zip(*rows)
+    now = np.datetime64(datetime.now(), "us")
+    close = np.array(close_dates, dtype="datetime64[D]").astype("datetime64[us]")
+    days_to_close = (close - now) // np.timedelta64(1, "D")
+
+    days_in_pipe = np.array(days_in_pipe, dtype=float)
+    factors = score_deal_features(
+        amount=np.array(amounts, dtype=float),
+        stage=np.array(stages, dtype=object),
+        days_in_pipeline=days_in_pipe,
+        annual_revenue=np.array(revenues, dtype=float),
+        recent_activities=np.array(recent, dtype=float),
+        days_to_close=days_to_close
+    )
+    scores = factors["score"]
 
-    # Score each deal
+    # Explanations are only built for the deals we return
     scored_deals = []
-
-    for deal in deals:
-        score = 0
-        factors = []
-
-        # 1. Deal size factor (larger deals score higher)
-        avg_deal_size = 100000  # Could calculate from historical
-        size_score = min(30, (deal['amount'] / avg_deal_size) * 15)
-        score += size_score
-        factors.append(f"Deal size: +{size_score:.0f}")
-
-        # 2. Stage progression factor
-        stage_scores = {
-            "Prospecting": 5,
-            "Qualification": 10,
-            "Proposal": 20,
-            "Negotiation": 25
-        }
-        stage_score = stage_scores.get(deal['stage'], 0)
-        score += stage_score
-        factors.append(f"Stage ({deal['stage']}): +{stage_score}")
-
-        # 3. Time in pipeline (penalty for stale deals)
-        days_in_pipe = deal['days_in_pipeline']
-        if days_in_pipe > 90:
-            time_penalty = -10
-        elif days_in_pipe > 60:
-            time_penalty = -5
-        else:
-            time_penalty = 5
-        score += time_penalty
-        factors.append(f"Pipeline age: {time_penalty:+d}")
-
-        # 4. Account quality
-        if deal['annual_revenue'] > 50000000:
-            account_score = 15
-        elif deal['annual_revenue'] > 10000000:
-            account_score = 10
-        else:
-            account_score = 5
-        score += account_score
-        factors.append(f"Account size: +{account_score}")
-
-        # 5. Recent engagement
-        if deal['recent_activities'] > 5:
-            engagement_score = 15
-        elif deal['recent_activities'] > 2:
-            engagement_score = 10
-        else:
-            engagement_score = 0
-        score += engagement_score
-        factors.append(f"Recent engagement: +{engagement_score}")
-
-        # 6. Close date proximity
-        days_to_close = (datetime.strptime(deal['close_date'], "%Y-%m-%d") - datetime.now()).days
-        if 0 < days_to_close < 30:
-            urgency_score = 10
-        elif days_to_close < 0:
-            urgency_score = -5  # Overdue
-        else:
-            urgency_score = 5
-        score += urgency_score
-        factors.append(f"Close date urgency: {urgency_score:+d}")
-
-        # Normalize score to 0-100
-        score = max(0, min(100, score))
+    for i in top_k_indices(scores, SCORING_TOP_K):
+        # Same number type as the per-deal version: min(30, ...) and the 0-100 clamp returned ints there
+        score = scores[i]
+        score = int(score) if factors["size"][i] >= 30 or score <= 0 or score >= 100 else float(score)
 
         # Determine priority and action
         if score >= 75:
@@ -364,27 +530,30 @@ def calculate_deal_scoring(
             action = "Nurture with automated touchpoints"
 
         scored_deals.append({
-            "deal_id": deal['id'],
-            "account_name": deal['name'],
-            "deal_name": deal['name'],
-            "amount": deal['amount'],
-            "stage": deal['stage'],
+            "deal_id": ids[i],
+            "account_name": names[i],
+            "deal_name": names[i],
+            "amount": amounts[i],
+            "stage": stages[i],
             "score": score,
             "priority": priority,
             "recommended_action": action,
-            "scoring_factors": factors,
-            "days_in_pipeline": int(days_in_pipe),
-            "close_date": deal['close_date']
+            "scoring_factors": [
+                f"Deal size: +{factors['size'][i]:.0f}",
+                f"Stage ({stages[i]}): +{factors['stage'][i]}",
+                f"Pipeline age: {int(factors['time'][i]):+d}",
+                f"Account size: +{factors['account'][i]}",
+                f"Recent engagement: +{factors['engagement'][i]}",
+                f"Close date urgency: {int(factors['urgency'][i]):+d}"
+            ],
+            "days_in_pipeline": int(days_in_pipe[i]),
+            "close_date": close_dates[i]
         })
 
-    # Sort by score descending
-    scored_deals.sort(key=lambda x: x['score'], reverse=True)
-
-    conn.close()
-
-    return scored_deals[:10]  # Return top 10
+    return scored_deals
 
 @mcp.tool()
+@cached(cache, get_db)
 def get_activity_analytics(
     time_period: str = "last_30_days",
     group_by: str = "activity_type"
@@ -392,96 +561,136 @@ def get_activity_analytics(
     """
     Analyze sales activity patterns and effectiveness
 
+    Answered from the activity_rollup cube (day x type x account x rep), which
+    triggers keep current, so cost tracks distinct cells rather than log size.
+
     Args:
         time_period: Period to analyze
-        group_by: Grouping dimension (activity_type, account, day_of_week)
+        group_by: Grouping dimension (activity_type, account, day_of_week, week, month, rep)
 
     Returns:
         Activity analytics with insights
     """
-    conn = get_db()
-    cursor = conn.cursor()
-
-    # Time period filter
-    period_filters = {
-        "last_7_days": "date('now', '-7 days')",
-        "last_30_days": "date('now', '-30 days')",
-        "last_quarter": "date('now', '-90 days')"
-    }
-    date_filter = period_filters.get(time_period, "date('now', '-30 days')")
-
-    # Get activity summary
-    cursor.execute(f"""
-        SELECT 
-            COUNT(*) as total_activities,
-            COUNT(DISTINCT account_id) as accounts_touched,
-            COUNT(DISTINCT DATE(activity_date)) as active_days
-        FROM activities
-        WHERE activity_date >= {date_filter}
-    """)
-
-    summary = cursor.fetchone()
-
-    # Group by analysis
-    if group_by == "activity_type":
-        cursor.execute(f"""
-            SELECT activity_type, COUNT(*) as count
-            FROM activities
-            WHERE activity_date >= {date_filter}
-            GROUP BY activity_type
-            ORDER BY count DESC
-        """)
-        grouped_data = [{"type": row[0], "count": row[1]} for row in cursor.fetchall()]
+    with get_db() as conn:
+        cursor = conn.cursor()
+
+        # Time period filter
+        period_filters = {
+            "last_7_days": "date('now', '-7 days')",
+            "last_30_days": "date('now', '-30 days')",
+            "last_quarter": "date('now', '-90 days')"
+        }
+        date_filter = period_filters.get(time_period, "date('now', '-30 days')")
 
-    elif group_by == "day_of_week":
+        # Get activity summary
         cursor.execute(f"""
-            SELECT 
-                CASE CAST(strftime('%w', activity_date) AS INTEGER)
-                    WHEN 0 THEN 'Sunday'
-                    WHEN 1 THEN 'Monday'
-                    WHEN 2 THEN 'Tuesday'
-                    WHEN 3 THEN 'Wednesday'
-                    WHEN 4 THEN 'Thursday'
-                    WHEN 5 THEN 'Friday'
-                    WHEN 6 THEN 'Saturday'
-                END as day_name,
-                COUNT(*) as count
-            FROM activities
-            WHERE activity_date >= {date_filter}
-            GROUP BY strftime('%w', activity_date)
-            ORDER BY strftime('%w', activity_date)
+            SELECT
+                IFNULL(SUM(activities), 0) as total_activities,
+                COUNT(DISTINCT NULLIF(account_id, 0)) as accounts_touched,
+                COUNT(DISTINCT day) as active_days
+            FROM activity_rollup
+            WHERE day >= {date_filter}
         """)
-        grouped_data = [{"day": row[0], "count": row[1]} for row in cursor.fetchall()]
 
-    else:  # by account
+        summary = cursor.fetchone()
+
+        # Group by analysis
+        if group_by == "activity_type":
+            cursor.execute(f"""
+                SELECT NULLIF(activity_type, ''), SUM(activities) as count
+                FROM activity_rollup
+                WHERE day >= {date_filter}
+                GROUP BY activity_type
+                ORDER BY count DESC
+            """)
+            grouped_data = [{"type": row[0], "count": row[1]} for row in cursor.fetchall()]
+
+        elif group_by == "day_of_week":
+            cursor.execute(f"""
+                SELECT 
+                    CASE CAST(strftime('%w', day) AS INTEGER)
+                        WHEN 0 THEN 'Sunday'
+                        WHEN 1 THEN 'Monday'
+                        WHEN 2 THEN 'Tuesday'
+                        WHEN 3 THEN 'Wednesday'
+                        WHEN 4 THEN 'Thursday'
+                        WHEN 5 THEN 'Friday'
+                        WHEN 6 THEN 'Saturday'
+                    END as day_name,
+                    SUM(activities) as count
+                FROM activity_rollup
+                WHERE day >= {date_filter}
+                GROUP BY strftime('%w', day)
+                ORDER BY strftime('%w', day)
+            """)
+            grouped_data = [{"day": row[0], "count": row[1]} for row in cursor.fetchall()]
+
+        elif group_by == "week":
+            # Weeks start on Monday
+            cursor.execute(f"""
+                SELECT date(day, '-6 days', 'weekday 1') as week_start, SUM(activities) as count
+                FROM activity_rollup
+                WHERE day >= {date_filter}
+                GROUP BY week_start
+                ORDER BY week_start
+            """)
+            grouped_data = [{"week_start": row[0], "count": row[1]} for row in cursor.fetchall()]
+
+        elif group_by == "month":
+            cursor.execute(f"""
+                SELECT substr(day, 1, 7) as month, SUM(activities) as count
+                FROM activity_rollup
+                WHERE day >= {date_filter}
+                GROUP BY month
+                ORDER BY month
+            """)
+            grouped_data = [{"month": row[0], "count": row[1]} for row in cursor.fetchall()]
+
+        elif group_by == "rep":
+            cursor.execute(f"""
+                SELECT IFNULL(NULLIF(rep, ''), 'Unassigned'), SUM(activities) as count,
+                       COUNT(DISTINCT NULLIF(account_id, 0))
+                FROM activity_rollup
+                WHERE day >= {date_filter}
+                GROUP BY rep
+                ORDER BY count DESC
+            """)
+            grouped_data = [
+                {"rep": row[0], "count": row[1], "accounts_touched": row[2]}
+                for row in cursor.fetchall()
+            ]
+
+        else:  # by account
+            cursor.execute(f"""
+                SELECT a.name, IFNULL(r.activity_count, 0) as activity_count
+                FROM accounts a
+                LEFT JOIN (
+                    SELECT account_id, SUM(activities) as activity_count
+                    FROM activity_rollup
+                    WHERE day >= {date_filter}
+                    GROUP BY account_id
+                ) r ON r.account_id = a.id
+                ORDER BY activity_count DESC, a.id
+                LIMIT 10
+            """)
+            grouped_data = [{"account": row[0], "activities": row[1]} for row in cursor.fetchall()]
+
+        # Activity to outcome correlation (simplified): deals at accounts touched in the window
         cursor.execute(f"""
-            SELECT a.name, COUNT(act.id) as activity_count
-            FROM accounts a
-            LEFT JOIN activities act ON a.id = act.account_id
-                AND act.activity_date >= {date_filter}
-            GROUP BY a.id
-            ORDER BY activity_count DESC
-            LIMIT 10
+            SELECT 
+                COUNT(*) as deals_progressed,
+                COUNT(CASE WHEN stage = 'Closed Won' THEN 1 END) as deals_won
+            FROM deals
+            WHERE created_date >= {date_filter}
+                AND account_id IN (
+                    SELECT account_id FROM activity_rollup WHERE day >= {date_filter}
+                )
         """)
-        grouped_data = [{"account": row[0], "activities": row[1]} for row in cursor.fetchall()]
 
-    # Activity to outcome correlation (simplified)
-    cursor.execute(f"""
-        SELECT 
-            COUNT(DISTINCT d.id) as deals_progressed,
-            COUNT(DISTINCT CASE WHEN d.stage = 'Closed Won' THEN d.id END) as deals_won
-        FROM activities a
-        JOIN deals d ON a.account_id = d.account_id
-        WHERE a.activity_date >= {date_filter}
-            AND d.created_date >= {date_filter}
-    """)
+        outcomes = cursor.fetchone()
 
-    outcomes = cursor.fetchone()
-
-    # Calculate metrics
-    activities_per_day = summary[0] / max(summary[2], 1) if summary[2] else 0
-
-    conn.close()
+        # Calculate metrics
+        activities_per_day = summary[0] / max(summary[2], 1) if summary[2] else 0
 
     return {
         "time_period": time_period,
@@ -513,6 +722,7 @@ def get_activity_analytics(
     }
 
 @mcp.tool()
+@cached(cache, get_db)
 def get_performance_metrics(
     metric_type: str = "summary"
 ) -> Dict:
@@ -525,52 +735,48 @@ def get_performance_metrics(
     Returns:
         Performance metrics dashboard data
     """
-    conn = get_db()
-    cursor = conn.cursor()
-
-    # Current quarter dates
-    today = datetime.now()
-    quarter_start = datetime(today.year, ((today.month-1)//3)*3+1, 1)
-
-    # Revenue metrics
-    cursor.execute("""
-        SELECT 
-            SUM(CASE WHEN stage = 'Closed Won' THEN amount ELSE 0 END) as revenue_closed,
-            SUM(CASE WHEN stage NOT IN ('Closed Won', 'Closed Lost') THEN amount ELSE 0 END) as pipeline_value,
-            COUNT(CASE WHEN stage = 'Closed Won' THEN 1 END) as deals_won,
-            COUNT(CASE WHEN stage = 'Closed Lost' THEN 1 END) as deals_lost,
-            AVG(CASE WHEN stage = 'Closed Won' THEN amount END) as avg_deal_size
-        FROM deals
-        WHERE created_date >= ?
-    """, (quarter_start.strftime("%Y-%m-%d"),))
-
-    revenue_metrics = cursor.fetchone()
-
-    # Calculate additional metrics
-    total_deals = (revenue_metrics[2] or 0) + (revenue_metrics[3] or 0)
-    win_rate = (revenue_metrics[2] / total_deals * 100) if total_deals > 0 else 0
-
-    # Sales velocity (simplified)
-    cursor.execute("""
-        SELECT AVG(julianday(close_date) - julianday(created_date)) as avg_sales_cycle
-        FROM deals
-        WHERE stage = 'Closed Won'
-        AND created_date >= date('now', '-180 days')
-    """)
-
-    avg_cycle = cursor.fetchone()[0] or 90
-
-    # Activity metrics
-    cursor.execute("""
-        SELECT COUNT(*) as total_activities,
-               COUNT(DISTINCT account_id) as accounts_engaged
-        FROM activities
-        WHERE activity_date >= ?
-    """, (quarter_start.strftime("%Y-%m-%d"),))
-
-    activity_metrics = cursor.fetchone()
-
-    conn.close()
+    with get_db() as conn:
+        cursor = conn.cursor()
+
+        # Current quarter dates
+        today = datetime.now()
+        quarter_start = datetime(today.year, ((today.month-1)//3)*3+1, 1)
+
+        # Revenue metrics for deals created this quarter
+        quarter = stage_totals(conn, created_since=quarter_start.strftime("%Y-%m-%d"))
+        won = quarter.get("Closed Won", {"deals": 0, "total_value": 0, "avg_amount": None})
+        lost = quarter.get("Closed Lost", {"deals": 0})
+        revenue_metrics = (
+            won["total_value"],
+            sum(row["total_value"] for row in open_stages(quarter).values()),
+            won["deals"],
+            lost["deals"],
+            won["avg_amount"]
+        )
+
+        # Calculate additional metrics
+        total_deals = (revenue_metrics[2] or 0) + (revenue_metrics[3] or 0)
+        win_rate = (revenue_metrics[2] / total_deals * 100) if total_deals > 0 else 0
+
+        # Sales velocity (simplified)
+        cursor.execute("""
+            SELECT AVG(julianday(close_date) - julianday(created_date)) as avg_sales_cycle
+            FROM deals
+            WHERE stage = 'Closed Won'
+            AND created_date >= date('now', '-180 days')
+        """)
+
+        avg_cycle = cursor.fetchone()[0] or 90
+
+        # Activity metrics
+        cursor.execute("""
+            SELECT COUNT(*) as total_activities,
+                   COUNT(DISTINCT account_id) as accounts_engaged
+            FROM activities
+            WHERE activity_date >= ?
+        """, (quarter_start.strftime("%Y-%m-%d"),))
+
+        activity_metrics = cursor.fetchone()
 
     # Build response based on metric_type
     metrics = {
@@ -611,6 +817,22 @@ def get_performance_metrics(
 
     return metrics
 
+@mcp.tool()
+def get_cache_stats(clear: bool = False) -> Dict:
+    """
+    Get analytics result cache statistics
+
+    Args:
+        clear: Drop all cached results after reading the statistics
+
+    Returns:
+        Hits, misses, hit rate, evictions, invalidations and current size
+    """
+    stats = cache.snapshot()
+    if clear:
+        cache.clear()
+    return stats
+
 # Run the server
 if __name__ == "__main__":
     print("🚀 Starting Analytics MCP Server...")
@@ -622,6 +844,7 @@ if __name__ == "__main__":
     print("   - calculate_deal_scoring()")
     print("   - get_activity_analytics()")
     print("   - get_performance_metrics()")
+    print("   - get_cache_stats()")
     print()
     print("🤖 AI-powered analytics ready!")
 
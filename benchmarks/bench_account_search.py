@@ -0,0 +1,101 @@
+"""
+Benchmark: account search latency, LIKE '%q%' scan vs. FTS5 with BM25 ranking
+
+Usage:
+    python -m benchmarks.bench_account_search [--accounts 1000000] [--runs 20]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from crm_migrations import MIGRATIONS, apply_migrations
+from db_pool import ConnectionPool
+from servers import crm_server
+
+# Company names: a distinctive stem plus a common suffix, like real books of business
+SYLLABLES = ["ac", "me", "glo", "dy", "na", "vor", "tex", "qua", "ntum", "har", "bor", "pio", "neer", "at", "las", "zen"]
+SUFFIXES = ["Systems", "Solutions", "Labs", "Works", "Partners", "Networks", "Analytics", "Group"]
+INDUSTRIES = ["Technology", "Manufacturing", "Software", "Consulting", "Healthcare", "Financial Services"]
+QUERIES = ["acme", "quantum labs", "harbo", "vortex systems", "zenlas", "partners"]
+
+
+def build_database(path: str, accounts: int):
+    """Create the baseline schema, bulk-load synthetic accounts, then migrate"""
+    rng = random.Random(1)
+    conn = sqlite3.connect(path)
+    for statement in MIGRATIONS[0][2]:
+        conn.execute(statement)
+
+    batch = []
+    for i in range(1, accounts + 1):
+        stem = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3)))
+        name = f"{stem.title()} {rng.choice(SUFFIXES)}"
+        batch.append((name, rng.choice(INDUSTRIES), rng.randint(1, 500) * 1e5, f"{stem}{i}.com"))
+        if len(batch) == 50000:
+            conn.executemany("INSERT INTO accounts (name, industry, annual_revenue, website) VALUES (?, ?, ?, ?)", batch)
+            batch = []
+    if batch:
+        conn.executemany("INSERT INTO accounts (name, industry, annual_revenue, website) VALUES (?, ?, ?, ?)", batch)
+
+    conn.executemany(
+        "INSERT INTO contacts (account_id, name, email) VALUES (?, ?, ?)",
+        ((i, f"Contact {i}", f"contact{i}@example.com") for i in range(1, accounts + 1))
+    )
+    conn.commit()
+
+    start = time.perf_counter()
+    apply_migrations(conn)
+    conn.close()
+    return time.perf_counter() - start
+
+
+def like_search(conn: sqlite3.Connection, query: str, limit: int = 10):
+    """The pre-FTS search path"""
+    return conn.execute(
+        f"SELECT * FROM accounts WHERE name LIKE ? ORDER BY annual_revenue DESC LIMIT {limit}",
+        (f"%{query}%",)
+    ).fetchall()
+
+
+def time_ms(fn, runs: int):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--accounts", type=int, default=1000000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "sales_crm.db")
+        print(f"🏗️  Building {args.accounts:,} synthetic accounts...")
+        index_seconds = build_database(db_path, args.accounts)
+        print(f"   FTS index built in {index_seconds:.1f}s")
+
+        crm_server.pool = ConnectionPool(db_path, size=1)
+        raw = sqlite3.connect(db_path)
+
+        print(f"📊 Search latency (median of {args.runs} runs, limit 10)")
+        print(f"   {'query':<20}{'LIKE (ms)':>12}{'FTS5 (ms)':>12}{'speedup':>10}")
+        for query in QUERIES:
+            like_ms = time_ms(lambda: like_search(raw, query), args.runs)
+            fts_ms = time_ms(lambda: crm_server.search_accounts(query=query), args.runs)
+            print(f"   {query:<20}{like_ms:>12.2f}{fts_ms:>12.2f}{like_ms / fts_ms:>9.1f}x")
+
+        raw.close()
+        crm_server.pool.close()
+
+
+if __name__ == "__main__":
+    main()
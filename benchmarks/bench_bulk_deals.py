@@ -0,0 +1,67 @@
+"""
+Benchmark: deal ingestion rows/sec, create_deal per row vs. bulk_create_deals
+
+Usage:
+    python -m benchmarks.bench_bulk_deals [--rows 5000] [--batch-size 500]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import init_crm_db
+from db_pool import ConnectionPool
+from servers import crm_server
+
+
+def make_records(rows: int):
+    stages = list(crm_server.STAGE_PROBABILITIES)
+    return [
+        {
+            "account_id": 1 + i % 10,
+            "deal_name": f"Imported Deal {i}",
+            "amount": 1000 + i,
+            "stage": stages[i % len(stages)],
+            "close_date": "2027-03-31"
+        }
+        for i in range(rows)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    records = make_records(args.rows)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        init_crm_db.DB_PATH = os.path.join(tmp, "sales_crm.db")
+        with contextlib.redirect_stdout(io.StringIO()):
+            init_crm_db.init_database()
+        crm_server.pool = ConnectionPool(init_crm_db.DB_PATH)
+
+        start = time.perf_counter()
+        for record in records:
+            crm_server.create_deal(
+                record["account_id"], record["deal_name"], record["amount"],
+                stage=record["stage"], close_date=record["close_date"]
+            )
+        single = args.rows / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        result = crm_server.bulk_create_deals(deals=records, batch_size=args.batch_size)
+        bulk = args.rows / (time.perf_counter() - start)
+        crm_server.pool.close()
+
+    print(f"📊 Deal ingestion ({args.rows:,} rows, {result['batches']} transactions for bulk)")
+    print(f"   create_deal per row: {single:,.0f} rows/sec")
+    print(f"   bulk_create_deals:   {bulk:,.0f} rows/sec")
+    print(f"   speedup:             {bulk / single:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark: CRM tool calls/sec with connect-per-call vs. the shared connection pool
+
+Usage:
+    python -m benchmarks.bench_crm_pool [--calls 2000]
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+
+import init_crm_db
+from db_pool import ConnectionPool
+from servers import crm_server
+
+
+def run_workload(calls: int) -> float:
+    """Run a mixed read/write workload against the CRM tools, return calls/sec"""
+    start = time.perf_counter()
+    for i in range(calls):
+        op = i % 5
+        if op == 0:
+            crm_server.search_accounts(industry="Technology", limit=5)
+        elif op == 1:
+            crm_server.get_account_details(1 + i % 10)
+        elif op == 2:
+            crm_server.get_pipeline_summary()
+        elif op == 3:
+            crm_server.list_all_accounts()
+        else:
+            crm_server.create_deal(1 + i % 10, f"Bench Deal {i}", 10000)
+    return calls / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "sales_crm.db")
+        init_crm_db.DB_PATH = db_path
+        init_crm_db.init_database()
+
+        # Before: a brand-new connection per call
+        @contextmanager
+        def connect_per_call():
+            conn = sqlite3.connect(db_path)
+            try:
+                yield conn
+            finally:
+                conn.close()
+
+        crm_server.get_db = connect_per_call
+        baseline = run_workload(args.calls)
+
+        # After: pooled, tuned connections
+        crm_server.pool = ConnectionPool(db_path)
+        crm_server.get_db = crm_server.pool.connection
+        pooled = run_workload(args.calls)
+        crm_server.pool.close()
+
+    print("📊 CRM tool throughput")
+    print(f"   connect-per-call: {baseline:,.0f} calls/sec")
+    print(f"   pooled:           {pooled:,.0f} calls/sec")
+    print(f"   speedup:          {pooled / baseline:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
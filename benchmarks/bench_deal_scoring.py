@@ -0,0 +1,177 @@
+"""
+Benchmark: calculate_deal_scoring, per-deal Python loop vs. the NumPy engine
+
+Usage:
+    python -m benchmarks.bench_deal_scoring [--sizes 10000 100000 1000000]
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+import numpy as np
+
+from servers import analytics_server
+
+
+def legacy_score_deals(deals: List[Dict]) -> List[Dict]:
+    """The original per-deal scoring loop, kept as the reference implementation"""
+    # Score each deal
+    scored_deals = []
+
+    for deal in deals:
+        score = 0
+        factors = []
+
+        # 1. Deal size factor (larger deals score higher)
+        avg_deal_size = 100000  # Could calculate from historical
+        size_score = min(30, (deal['amount'] / avg_deal_size) * 15)
+        score += size_score
+        factors.append(f"Deal size: +{size_score:.0f}")
+
+        # 2. Stage progression factor
+        stage_scores = {
+            "Prospecting": 5,
+            "Qualification": 10,
+            "Proposal": 20,
+            "Negotiation": 25
+        }
+        stage_score = stage_scores.get(deal['stage'], 0)
+        score += stage_score
+        factors.append(f"Stage ({deal['stage']}): +{stage_score}")
+
+        # 3. Time in pipeline (penalty for stale deals)
+        days_in_pipe = deal['days_in_pipeline']
+        if days_in_pipe > 90:
+            time_penalty = -10
+        elif days_in_pipe > 60:
+            time_penalty = -5
+        else:
+            time_penalty = 5
+        score += time_penalty
+        factors.append(f"Pipeline age: {time_penalty:+d}")
+
+        # 4. Account quality
+        if deal['annual_revenue'] > 50000000:
+            account_score = 15
+        elif deal['annual_revenue'] > 10000000:
+            account_score = 10
+        else:
+            account_score = 5
+        score += account_score
+        factors.append(f"Account size: +{account_score}")
+
+        # 5. Recent engagement
+        if deal['recent_activities'] > 5:
+            engagement_score = 15
+        elif deal['recent_activities'] > 2:
+            engagement_score = 10
+        else:
+            engagement_score = 0
+        score += engagement_score
+        factors.append(f"Recent engagement: +{engagement_score}")
+
+        # 6. Close date proximity
+        days_to_close = (datetime.strptime(deal['close_date'], "%Y-%m-%d") - datetime.now()).days
+        if 0 < days_to_close < 30:
+            urgency_score = 10
+        elif days_to_close < 0:
+            urgency_score = -5  # Overdue
+        else:
+            urgency_score = 5
+        score += urgency_score
+        factors.append(f"Close date urgency: {urgency_score:+d}")
+
+        # Normalize score to 0-100
+        score = max(0, min(100, score))
+
+        # Determine priority and action
+        if score >= 75:
+            priority = "🔥 Hot"
+            action = "Immediate attention needed"
+        elif score >= 50:
+            priority = "🟡 Warm"
+            action = "Schedule follow-up this week"
+        else:
+            priority = "🔵 Cool"
+            action = "Nurture with automated touchpoints"
+
+        scored_deals.append({
+            "deal_id": deal['id'],
+            "account_name": deal['name'],
+            "deal_name": deal['name'],
+            "amount": deal['amount'],
+            "stage": deal['stage'],
+            "score": score,
+            "priority": priority,
+            "recommended_action": action,
+            "scoring_factors": factors,
+            "days_in_pipeline": int(days_in_pipe),
+            "close_date": deal['close_date']
+        })
+
+    # Sort by score descending
+    scored_deals.sort(key=lambda x: x['score'], reverse=True)
+
+    return scored_deals[:10]  # Return top 10
+
+
+def synthetic_deals(n: int, seed: int = 0) -> Dict[str, np.ndarray]:
+    """Random open-deal features shaped like the CRM data"""
+    rng = np.random.default_rng(seed)
+    today = np.datetime64(datetime.now().date())
+    return {
+        "id": np.arange(1, n + 1),
+        "amount": rng.integers(10000, 500000, n).astype(float),
+        "stage": rng.choice(["Prospecting", "Qualification", "Proposal", "Negotiation"], n).astype(object),
+        "days_in_pipeline": rng.uniform(0, 180, n),
+        "annual_revenue": rng.choice([5e6, 2e7, 7.5e7], n),
+        "recent_activities": rng.integers(0, 10, n).astype(float),
+        "close_date": (today + rng.integers(-30, 180, n)).astype(str).astype(object)
+    }
+
+
+def run_vectorized(cols: Dict[str, np.ndarray]) -> np.ndarray:
+    """Score all deals and pick the top 10 (the engine's hot path)"""
+    now = np.datetime64(datetime.now(), "us")
+    close = np.array(cols["close_date"], dtype="datetime64[D]").astype("datetime64[us]")
+    factors = analytics_server.score_deal_features(
+        amount=cols["amount"],
+        stage=cols["stage"],
+        days_in_pipeline=cols["days_in_pipeline"],
+        annual_revenue=cols["annual_revenue"],
+        recent_activities=cols["recent_activities"],
+        days_to_close=(close - now) // np.timedelta64(1, "D")
+    )
+    return analytics_server.top_k_indices(factors["score"], analytics_server.SCORING_TOP_K)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    args = parser.parse_args()
+
+    print("📊 Deal scoring (open deals -> top 10)")
+    print(f"   {'deals':>10}{'loop (ms)':>14}{'numpy (ms)':>14}{'speedup':>10}")
+    for n in args.sizes:
+        cols = synthetic_deals(n)
+        rows = [
+            {key: cols[key][i] for key in cols} | {"name": f"Deal {i}"}
+            for i in range(n)
+        ]
+
+        start = time.perf_counter()
+        legacy = legacy_score_deals(rows)
+        loop_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        top = run_vectorized(cols)
+        numpy_ms = (time.perf_counter() - start) * 1000
+
+        assert [d["deal_id"] for d in legacy] == list(cols["id"][top])
+        print(f"   {n:>10,}{loop_ms:>14.1f}{numpy_ms:>14.1f}{loop_ms / numpy_ms:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Benchmark: quantized knowledge-collection storage - resident memory and recall@10 at 1M entity vectors
+
+One float32 mmap collection is built, then each configuration re-encodes it
+(train + encode in its own child process) and is served from a fresh child, so
+serve RSS counts only the pages that configuration's queries touch: the whole
+float32 matrix for "none", the codes plus re-scored candidate rows otherwise.
+Vectors are clustered synthetic 384-dim unit vectors (MiniLM-sized entities).
+
+Usage:
+    python -m benchmarks.bench_quantization [--rows 1000000] [--queries 200] [--configs none int8 pq96 pq48]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_vector_store import BATCH, DIM, peak_rss_mb, query_vectors, vector_batch
+
+# name -> (quantization, PQ subspaces)
+CONFIGS = {
+    "none": ("none", 48),
+    "int8": ("int8", 48),
+    "pq192": ("pq", 192),
+    "pq96": ("pq", 96),
+    "pq48": ("pq", 48),
+}
+
+
+def open_collection(path: str, config: str = "none", quantization=None):
+    """The benchmark collection, optionally switching its quantization"""
+    from vector_store import MmapCollection
+    return MmapCollection(
+        os.path.join(path, "knowledge"), "knowledge", {"hnsw:space": "cosine"},
+        quantization=quantization, pq_subspaces=CONFIGS[config][1]
+    )
+
+
+def child_build(path: str, rows: int) -> dict:
+    """Append every entity vector in batches, with IDs, documents and metadata"""
+    start = time.perf_counter()
+    collection = open_collection(path, quantization="none")
+    for batch in range((rows + BATCH - 1) // BATCH):
+        vectors = vector_batch(batch, rows)
+        ids = [f"entity_{batch * BATCH + i}" for i in range(len(vectors))]
+        collection.add(
+            ids=ids,
+            embeddings=vectors,
+            documents=[f"company: Account {i} (context: synthetic)" for i in ids],
+            metadatas=[{"entity_type": "company", "confidence": 0.9} for _ in ids]
+        )
+    return {"build_s": time.perf_counter() - start}
+
+
+def child_encode(path: str, config: str) -> dict:
+    """Switch the collection to a configuration: train the quantizer and encode every row"""
+    start = time.perf_counter()
+    collection = open_collection(path, config, quantization=CONFIGS[config][0])
+    stats = collection.stats()
+    return {"encode_s": time.perf_counter() - start, "code_bytes": stats["code_bytes"]}
+
+
+def child_serve(path: str, config: str, rows: int, queries: int) -> dict:
+    """Open cold with the stored quantization and time single-vector queries"""
+    batch = query_vectors(queries, rows)
+    collection = open_collection(path, config)
+    opened = peak_rss_mb()
+
+    latencies, found = [], []
+    for vector in batch:
+        tick = time.perf_counter()
+        result = collection.query(query_embeddings=[vector.tolist()], n_results=10)
+        latencies.append((time.perf_counter() - tick) * 1000)
+        found.append([int(doc_id.split("_")[1]) for doc_id in result["ids"][0]])
+    serve = peak_rss_mb()
+    return {
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "vector_rss_mb": serve - opened,
+        "serve_rss_mb": serve,
+        "found": found
+    }
+
+
+def exact_neighbours(rows: int, queries: int) -> np.ndarray:
+    """Ground-truth top-10 by brute force, merged batch by batch (no queries x rows matrix)"""
+    batch = query_vectors(queries, rows)
+    best_s = np.full((queries, 0), -np.inf, dtype=np.float32)
+    best_r = np.zeros((queries, 0), dtype=np.int64)
+    for b in range((rows + BATCH - 1) // BATCH):
+        scores = batch @ vector_batch(b, rows).T
+        best_s = np.concatenate([best_s, scores], axis=1)
+        best_r = np.concatenate([best_r, np.broadcast_to(b * BATCH + np.arange(scores.shape[1]), scores.shape)], axis=1)
+        keep = np.argsort(-best_s, axis=1)[:, :10]
+        best_s = np.take_along_axis(best_s, keep, axis=1)
+        best_r = np.take_along_axis(best_r, keep, axis=1)
+    return best_r
+
+
+def run_child(*args) -> dict:
+    """Run one phase in a fresh interpreter and parse its JSON result"""
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_quantization", "--child", *map(str, args)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--configs", nargs="+", default=["none", "int8", "pq96", "pq48"], choices=list(CONFIGS))
+    parser.add_argument("--child", nargs="+", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        phase, path, *rest = args.child
+        if phase == "build":
+            result = child_build(path, int(rest[0]))
+        elif phase == "encode":
+            result = child_encode(path, rest[0])
+        else:
+            result = child_serve(path, rest[0], int(rest[1]), int(rest[2]))
+        print(json.dumps(result))
+        return
+
+    path = tempfile.mkdtemp(prefix="bench_quant_")
+    try:
+        truth = exact_neighbours(args.rows, args.queries)
+        build = run_child("build", path, args.rows)
+        print(f"📊 Knowledge collection quantization ({args.rows:,} x {DIM}-dim entity vectors, {args.queries} queries, top 10)")
+        print(f"   built float32 collection in {build['build_s']:.1f}s")
+        print(
+            f"   {'config':<10}{'bytes/vec':>10}{'encode s':>10}{'p50 ms':>9}{'p99 ms':>9}{'recall':>8}"
+            f"{'vector RSS':>12}{'reduction':>11}{'serve RSS':>11}"
+        )
+        reference = None  # vector RSS of the unquantized configuration
+        for config in args.configs:
+            encode = run_child("encode", path, config)
+            serve = run_child("serve", path, config, args.rows, args.queries)
+            recall = np.mean([len(set(f) & set(t)) / 10 for f, t in zip(serve["found"], truth.tolist())])
+            if config == "none":
+                reference = serve["vector_rss_mb"]
+            reduction = f"{reference / max(serve['vector_rss_mb'], 1):>10.1f}x" if reference else f"{'-':>11}"
+            print(
+                f"   {config:<10}{encode['code_bytes'] or DIM * 4:>10}{encode['encode_s']:>10.1f}{serve['p50_ms']:>9.1f}"
+                f"{serve['p99_ms']:>9.1f}{recall:>8.3f}{serve['vector_rss_mb']:>10.0f}MB"
+                f"{reduction}{serve['serve_rss_mb']:>9.0f}MB"
+            )
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark: search_similar retrieval quality and latency, vector vs. hybrid (BM25 + RRF) vs. reranked
+
+Indexes the demo transcripts (generate_demo_data.py, story_demo_data_generator.py)
+among synthetic distractor calls, then runs labelled queries through each mode and
+candidate pool size. Use it to pick `candidates`/`rerank_k` for a latency budget.
+Needs sentence-transformers and chromadb; uses a throwaway Chroma directory and caches.
+
+Usage:
+    python -m benchmarks.bench_rag_hybrid [--distractors 500] [--candidates 10 20 50 100] [--cross-encoder]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import tempfile
+import time
+
+BENCH_DIR = tempfile.mkdtemp(prefix="bench_rag_hybrid_")
+os.environ.setdefault("RAG_CHROMA_PATH", os.path.join(BENCH_DIR, "chroma_db"))
+os.environ.setdefault("RAG_EMBEDDING_CACHE_PATH", os.path.join(BENCH_DIR, "embedding_cache.db"))
+os.environ.setdefault("RAG_LEXICAL_PATH", os.path.join(BENCH_DIR, "rag_lexical.db"))
+
+import rag_server  # noqa: E402  (reads the paths above at import)
+from benchmarks.bench_rag_ingest import synthetic_transcripts  # noqa: E402
+from generate_demo_data import generate_test_data  # noqa: E402
+from story_demo_data_generator import create_story_driven_data  # noqa: E402
+
+# Demo transcripts get IDs clear of the distractors
+DEMO_OFFSET = 10 ** 6
+
+# (query, relevant demo transcript IDs); exact-term queries first, then paraphrases
+QUERIES = [
+    ("$400,000 to $600,000 budget", {1}),
+    ("SOC 2 Type II AES-256", {2}),
+    ("US data residency private cloud", {2}),
+    ("REST API webhook support", {2}),
+    ("$2.6M annually", {3}),
+    ("quarterly payments cash flow", {3}),
+    ("$800,000 to $1.2M annually", {4}),
+    ("Salesforce updates before Q4", {4}),
+    ("reps spend hours on data entry", {1, 4}),
+    ("CRM cannot keep up with a growing sales team", {1}),
+    ("buyer wants a security review and architecture documents", {2}),
+    ("customer picked us and needs the contract by month end", {3})
+]
+
+
+def demo_transcripts() -> list:
+    """The demo call transcripts, numbered 1..n after DEMO_OFFSET"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        cwd = os.getcwd()
+        os.chdir(BENCH_DIR)  # generate_test_data writes test_data.json
+        try:
+            demo = generate_test_data()["transcripts"]
+        finally:
+            os.chdir(cwd)
+    demo += create_story_driven_data()["transcripts"]
+    return [
+        {"transcript_id": DEMO_OFFSET + n, "content": t["content"].strip(), "metadata": {"title": t["title"]}}
+        for n, t in enumerate(demo, start=1)
+    ]
+
+
+def run_config(mode: str, rerank: str, candidates: int, top_k: int, repeats: int) -> dict:
+    """Recall@top_k, MRR and per-query latency for one search configuration"""
+    recall, reciprocal_ranks, latencies = [], [], []
+    for query, relevant in QUERIES:
+        request = {
+            "query": query,
+            "collection": "transcripts",
+            "top_k": top_k,
+            "mode": mode,
+            "candidates": candidates,
+            "rerank": rerank,
+            "rerank_k": candidates
+        }
+        for _ in range(repeats):
+            start = time.perf_counter()
+            matches = rag_server.search_batch([request])[0]
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        found = [match["metadata"]["transcript_id"] - DEMO_OFFSET for match in matches]
+        recall.append(len(relevant & set(found)) / len(relevant))
+        first = next((rank for rank, doc in enumerate(found, start=1) if doc in relevant), None)
+        reciprocal_ranks.append(1 / first if first else 0.0)
+
+    latencies.sort()
+    return {
+        "recall": statistics.mean(recall),
+        "mrr": statistics.mean(reciprocal_ranks),
+        "p50": latencies[len(latencies) // 2],
+        "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--distractors", type=int, default=500)
+    parser.add_argument("--candidates", type=int, nargs="+", default=[10, 20, 50, 100])
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--cross-encoder", action="store_true", help="also time the cross-encoder reranker")
+    args = parser.parse_args()
+
+    rag_server.store_transcripts(demo_transcripts() + synthetic_transcripts(args.distractors, 0))
+    rag_server.sync_lexical_index("transcripts")
+
+    configs = [("vector", "none", args.top_k)]
+    for candidates in args.candidates:
+        configs += [("hybrid", "none", candidates), ("hybrid", "lite", candidates)]
+        if args.cross_encoder:
+            configs.append(("hybrid", "cross-encoder", candidates))
+
+    # Warm the model(s) and caches so timings are steady-state
+    for mode, rerank, candidates in configs:
+        run_config(mode, rerank, candidates, args.top_k, 1)
+
+    print(f"📊 search_similar over {args.distractors} distractors + demo transcripts ({len(QUERIES)} queries)")
+    print(f"   {'mode':<8}{'rerank':<15}{'candidates':>10}{'recall@' + str(args.top_k):>11}{'MRR':>7}{'p50 ms':>9}{'p95 ms':>9}")
+    for mode, rerank, candidates in configs:
+        result = run_config(mode, rerank, candidates, args.top_k, args.repeats)
+        print(
+            f"   {mode:<8}{rerank:<15}{candidates:>10}{result['recall']:>11.2f}{result['mrr']:>7.2f}"
+            f"{result['p50']:>9.1f}{result['p95']:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark: RAG transcript ingest, per-text encode/add vs. one batched pass
+
+Needs sentence-transformers and chromadb; uses a throwaway Chroma directory and embedding cache.
+
+Usage:
+    python -m benchmarks.bench_rag_ingest [--transcripts 50] [--entities 40] [--batch-size 64]
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = tempfile.mkdtemp(prefix="bench_rag_")
+os.environ.setdefault("RAG_CHROMA_PATH", os.path.join(BENCH_DIR, "chroma_db"))
+os.environ.setdefault("RAG_EMBEDDING_CACHE_PATH", os.path.join(BENCH_DIR, "embedding_cache.db"))
+
+import rag_server  # noqa: E402  (reads the paths above at import)
+
+COMPANIES = ["Acme Corp", "Globex", "Initech", "Umbrella", "Stark Industries", "Wayne Enterprises"]
+ENTITY_TYPES = ["company", "person", "budget", "timeline", "competitor", "product", "pain_point"]
+LINES = [
+    "We are evaluating the platform for our sales team of about {n} reps.",
+    "Our budget for this quarter is around ${n},000 and we need approval from finance.",
+    "{company} is currently using a competitor and the renewal is in {n} months.",
+    "The main pain point is manual data entry into the CRM after every call.",
+    "Can you send over pricing for the enterprise tier and the onboarding timeline?",
+    "We would like a demo for the VP of Sales next week."
+]
+
+
+def synthetic_transcripts(count: int, entities: int, offset: int = 0):
+    """Call transcripts (~60 lines) with a fixed number of extracted entities each"""
+    rng = random.Random(offset)
+    transcripts = []
+    for i in range(count):
+        company = rng.choice(COMPANIES)
+        content = "\n".join(
+            rng.choice(LINES).format(n=rng.randint(2, 90), company=company) for _ in range(60)
+        )
+        transcripts.append({
+            "transcript_id": offset + i,
+            "content": content,
+            "entities": [
+                {
+                    "type": rng.choice(ENTITY_TYPES),
+                    "value": f"{company} item {j}",
+                    "context": content[j * 40:j * 40 + 80],
+                    "confidence": round(rng.uniform(0.5, 1.0), 2)
+                }
+                for j in range(entities)
+            ],
+            "metadata": {"company": company}
+        })
+    return transcripts
+
+
+def legacy_store_transcript(arguments):
+    """The original store_transcript path: one encode and one add per text"""
+    embedding = rag_server.get_embedder().encode(arguments["content"]).tolist()
+    rag_server.get_collection("transcripts").add(
+        embeddings=[embedding],
+        documents=[arguments["content"]],
+        metadatas=[{
+            "transcript_id": arguments["transcript_id"],
+            "entities": json.dumps(arguments.get("entities", [])),
+            "timestamp": datetime.now().isoformat(),
+            **arguments.get("metadata", {})
+        }],
+        ids=[f"transcript_{arguments['transcript_id']}"]
+    )
+
+    for entity in arguments.get("entities", []):
+        entity_text = rag_server.entity_document(entity)
+        rag_server.get_collection("knowledge").add(
+            embeddings=[rag_server.get_embedder().encode(entity_text).tolist()],
+            documents=[entity_text],
+            metadatas=[{
+                "transcript_id": arguments["transcript_id"],
+                "entity_type": entity["type"],
+                "entity_value": entity["value"],
+                "confidence": entity.get("confidence", 0.5)
+            }],
+            ids=[f"entity_{arguments['transcript_id']}_{entity['type']}_{entity['value']}"]
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--transcripts", type=int, default=50)
+    parser.add_argument("--entities", type=int, default=40)
+    parser.add_argument("--batch-size", type=int, default=rag_server.EMBEDDING_BATCH_SIZE)
+    args = parser.parse_args()
+
+    # Warm the model so neither side pays for lazy initialization
+    rag_server.generate_embeddings(["warm up"])
+
+    legacy = synthetic_transcripts(args.transcripts, args.entities, offset=0)
+    start = time.perf_counter()
+    for transcript in legacy:
+        legacy_store_transcript(transcript)
+    legacy_rate = len(legacy) / (time.perf_counter() - start)
+
+    per_call = synthetic_transcripts(args.transcripts, args.entities, offset=10 ** 6)
+    start = time.perf_counter()
+    for transcript in per_call:
+        rag_server.store_transcripts([transcript], batch_size=args.batch_size)
+    per_call_rate = len(per_call) / (time.perf_counter() - start)
+
+    queued = synthetic_transcripts(args.transcripts, args.entities, offset=2 * 10 ** 6)
+    start = time.perf_counter()
+    rag_server.store_transcripts(queued, batch_size=args.batch_size)
+    queued_rate = len(queued) / (time.perf_counter() - start)
+
+    print(f"📊 Transcript ingest ({args.entities} entities each, batch size {args.batch_size})")
+    print(f"   per-text encode/add:      {legacy_rate:8.2f} transcripts/sec")
+    print(f"   batched per transcript:   {per_call_rate:8.2f} transcripts/sec ({per_call_rate / legacy_rate:.1f}x)")
+    print(f"   batched queue of {len(queued):<6}   {queued_rate:8.2f} transcripts/sec ({queued_rate / legacy_rate:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark: RAG server startup, time-to-list_tools and time-to-first-query per warm-up mode
+
+Spawns `python rag_server.py` over stdio like an MCP client would. Needs
+sentence-transformers and chromadb; uses a throwaway Chroma directory and embedding cache.
+
+Usage:
+    python -m benchmarks.bench_rag_startup [--runs 3] [--modes eager background off]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def measure(mode: str, work_dir: str) -> tuple:
+    """Seconds from spawn to list_tools and to the first search_similar result"""
+    params = StdioServerParameters(
+        command=sys.executable,
+        args=[os.path.join(REPO_ROOT, "rag_server.py")],
+        env={
+            **os.environ,
+            "PYTHONPATH": os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get("PYTHONPATH")])),
+            "RAG_WARMUP": mode,
+            "RAG_CHROMA_PATH": os.path.join(work_dir, "chroma_db"),
+            "RAG_EMBEDDING_CACHE_PATH": os.path.join(work_dir, f"embedding_cache_{time.time_ns()}.db")
+        },
+        cwd=work_dir
+    )
+
+    start = time.perf_counter()
+    async with stdio_client(params) as (read_stream, write_stream):
+        async with ClientSession(read_stream, write_stream) as session:
+            await session.initialize()
+            await session.list_tools()
+            listed = time.perf_counter() - start
+
+            await session.call_tool("search_similar", {"query": "pricing objections from enterprise buyers"})
+            first_query = time.perf_counter() - start
+
+    return listed, first_query
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--modes", nargs="+", default=["eager", "background", "off"])
+    args = parser.parse_args()
+
+    print(f"📊 RAG server startup (median of {args.runs} spawns)")
+    print(f"   {'warm-up':<12}{'list_tools (s)':>16}{'first query (s)':>18}")
+    with tempfile.TemporaryDirectory() as work_dir:
+        for mode in args.modes:
+            samples = [asyncio.run(measure(mode, work_dir)) for _ in range(args.runs)]
+            listed = statistics.median(s[0] for s in samples)
+            first_query = statistics.median(s[1] for s in samples)
+            print(f"   {mode:<12}{listed:>16.2f}{first_query:>18.2f}")
+
+
+if __name__ == "__main__":
+    main()
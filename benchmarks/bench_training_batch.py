@@ -0,0 +1,99 @@
+"""
+Benchmark: training-server transcript backfill, per-call processing vs. process_transcripts_batch
+
+The per-call path is the original process_transcript (row-by-row inserts, one
+commit per transcript, extraction in-process). The batch path is measured at
+1, 2, 4, ... workers up to the available cores; speedup is relative to 1 worker.
+
+Usage:
+    python -m benchmarks.bench_training_batch [--transcripts 2000] [--size 8192] [--workers 1 2 4] [--write-batch 200]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.bench_entity_extraction import synthetic_transcript
+from transcript_processing import (
+    DEFAULT_WRITE_BATCH, analyze_transcript, available_cores, init_training_db, process_transcripts_batch
+)
+
+
+def legacy_process(db_path: str, transcripts):
+    """The original process_transcript, once per transcript"""
+    for transcript in transcripts:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO transcripts (content, source, processed_at, status) VALUES (?, ?, ?, ?)",
+            (transcript["content"], transcript.get("source", "upload"), datetime.now(), "processing")
+        )
+        transcript_id = cursor.lastrowid
+        analysis = analyze_transcript(transcript["content"])
+        for entity in analysis["entities"]:
+            cursor.execute(
+                "INSERT INTO extracted_entities (transcript_id, entity_type, entity_value, confidence, context) VALUES (?, ?, ?, ?, ?)",
+                (transcript_id, entity["type"], entity["value"], entity["confidence"], entity["context"])
+            )
+        for suggestion in analysis["suggestions"]:
+            cursor.execute(
+                "INSERT INTO crm_suggestions (transcript_id, suggestion_type, suggestion_data, confidence, created_at) VALUES (?, ?, ?, ?, ?)",
+                (transcript_id, suggestion["type"], json.dumps(suggestion["data"]), suggestion["confidence"], datetime.now())
+            )
+        cursor.execute("UPDATE transcripts SET status = ? WHERE id = ?", ("processed", transcript_id))
+        conn.commit()
+        conn.close()
+
+
+def fresh_db(directory: str, name: str) -> str:
+    """An empty training database"""
+    path = os.path.join(directory, f"{name}.db")
+    init_training_db(path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--transcripts", type=int, default=2000)
+    parser.add_argument("--size", type=int, default=8192, help="bytes per transcript")
+    parser.add_argument("--workers", type=int, nargs="+")
+    parser.add_argument("--write-batch", type=int, default=DEFAULT_WRITE_BATCH)
+    args = parser.parse_args()
+
+    cores = available_cores()
+    workers = sorted(set(args.workers or [w for w in (2, 4, 8, 16, 32, 64) if w <= cores] + [cores]) | {1})
+    transcripts = [{"content": synthetic_transcript(args.size, seed=i), "source": "audio"} for i in range(args.transcripts)]
+    directory = tempfile.mkdtemp(prefix="bench_training_")
+    try:
+        print(f"📊 Transcript backfill ({args.transcripts:,} x {args.size // 1024}KB transcripts, {cores} cores available)")
+        print(f"   {'mode':<16}{'seconds':>9}{'per sec':>10}{'speedup':>9}{'efficiency':>12}")
+
+        start = time.perf_counter()
+        legacy_process(fresh_db(directory, "legacy"), transcripts)
+        legacy_s = time.perf_counter() - start
+        print(f"   {'per-call':<16}{legacy_s:>9.2f}{args.transcripts / legacy_s:>10.0f}{'-':>9}{'-':>12}")
+
+        baseline = None  # 1-worker seconds
+        for count in workers:
+            summary = process_transcripts_batch(
+                fresh_db(directory, f"batch_{count}"), transcripts, workers=count, write_batch=args.write_batch
+            )
+            assert summary["processed"] == args.transcripts, summary["failures"][:3]
+            elapsed = summary["elapsed_s"]
+            baseline = baseline or elapsed
+            speedup = baseline / elapsed
+            print(
+                f"   {f'batch x{count}':<16}{elapsed:>9.2f}{args.transcripts / elapsed:>10.0f}"
+                f"{speedup:>8.2f}x{speedup / count:>11.0%}"
+            )
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
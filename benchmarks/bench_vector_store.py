@@ -0,0 +1,171 @@
+"""
+Benchmark: RAG vector store backends - build time, cold open, query p50/p99, recall@10 and RSS
+
+Each backend is built and then served from a fresh child process, so peak RSS and
+time-to-first-query reflect that backend alone. Vectors are clustered synthetic
+384-dim unit vectors (MiniLM-sized); Chroma is included when chromadb is installed.
+
+Usage:
+    python -m benchmarks.bench_vector_store [--rows 100000] [--queries 500] [--backends mmap-f32 mmap-f16 mmap-ivf chroma]
+"""
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+DIM = 384
+BATCH = 1000
+SEED = 7
+
+
+def vector_batch(batch: int, rows: int) -> np.ndarray:
+    """Deterministic batch of clustered unit vectors (~100 per cluster)"""
+    centers = np.random.default_rng(SEED).standard_normal((max(1, rows // 100), DIM)).astype(np.float32)
+    rng = np.random.default_rng(SEED + 1 + batch)
+    size = min(BATCH, rows - batch * BATCH)
+    vectors = centers[rng.integers(0, len(centers), size)] + 0.6 * rng.standard_normal((size, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def query_vectors(count: int, rows: int) -> np.ndarray:
+    """Perturbed copies of stored vectors"""
+    rng = np.random.default_rng(SEED - 1)
+    picks = rng.integers(0, rows, count)
+    base = np.stack([vector_batch(int(p) // BATCH, rows)[int(p) % BATCH].copy() for p in picks])
+    noisy = base + 0.05 * rng.standard_normal(base.shape).astype(np.float32)
+    return noisy / np.linalg.norm(noisy, axis=1, keepdims=True)
+
+
+def open_collection(backend: str, path: str):
+    """The benchmark collection for a backend name"""
+    if backend == "chroma":
+        from vector_store import create_vector_store
+        return create_vector_store("chroma", path).get_or_create_collection("bench")
+    from vector_store import MmapCollection
+    dtype = "float16" if backend == "mmap-f16" else "float32"
+    index = "ivf" if backend == "mmap-ivf" else "flat"
+    return MmapCollection(os.path.join(path, "bench"), "bench", dtype=dtype, index=index)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process (VmHWM; ru_maxrss can carry over the parent's peak)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child_build(backend: str, path: str, rows: int) -> dict:
+    """Append every vector in batches, with IDs, documents and metadata"""
+    start = time.perf_counter()
+    collection = open_collection(backend, path)
+    for batch in range((rows + BATCH - 1) // BATCH):
+        vectors = vector_batch(batch, rows)
+        ids = [f"entity_{batch * BATCH + i}" for i in range(len(vectors))]
+        collection.add(
+            ids=ids,
+            embeddings=vectors.tolist() if backend == "chroma" else vectors,
+            documents=[f"company: Account {i} (context: synthetic)" for i in ids],
+            metadatas=[{"entity_type": "company", "confidence": 0.9} for _ in ids]
+        )
+    return {"build_s": time.perf_counter() - start, "build_rss_mb": peak_rss_mb()}
+
+
+def child_serve(backend: str, path: str, rows: int, queries: int) -> dict:
+    """Open the built store cold, then time single-vector queries"""
+    batch = query_vectors(queries, rows)
+    start = time.perf_counter()
+    collection = open_collection(backend, path)
+    first = collection.query(query_embeddings=[batch[0].tolist()], n_results=10)
+    cold = time.perf_counter() - start
+
+    latencies, found = [], []
+    for vector in batch:
+        tick = time.perf_counter()
+        result = collection.query(query_embeddings=[vector.tolist()], n_results=10)
+        latencies.append((time.perf_counter() - tick) * 1000)
+        found.append([int(doc_id.split("_")[1]) for doc_id in result["ids"][0]])
+    assert first["ids"][0]
+    return {
+        "cold_query_s": cold,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "serve_rss_mb": peak_rss_mb(),
+        "found": found
+    }
+
+
+def exact_neighbours(rows: int, queries: int) -> np.ndarray:
+    """Ground-truth top-10 by brute force over the same data"""
+    batch = query_vectors(queries, rows)
+    scores = np.concatenate(
+        [batch @ vector_batch(b, rows).T for b in range((rows + BATCH - 1) // BATCH)], axis=1
+    )
+    return np.argsort(-scores, axis=1)[:, :10]
+
+
+def run_child(*args) -> dict:
+    """Run one phase in a fresh interpreter and parse its JSON result"""
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_vector_store", "--child", *map(str, args)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--backends", nargs="+", default=["mmap-f32", "mmap-f16", "mmap-ivf", "chroma"])
+    parser.add_argument("--child", nargs="+", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        phase, backend, path, rows, *rest = args.child
+        if phase == "build":
+            result = child_build(backend, path, int(rows))
+        else:
+            result = child_serve(backend, path, int(rows), int(rest[0]))
+        print(json.dumps(result))
+        return
+
+    truth = exact_neighbours(args.rows, args.queries)
+    print(f"📊 Vector store backends ({args.rows:,} x {DIM}-dim vectors, {args.queries} queries, top 10)")
+    print(f"   {'backend':<10}{'build s':>9}{'cold q s':>10}{'p50 ms':>9}{'p99 ms':>9}{'recall':>8}{'build RSS':>11}{'serve RSS':>11}{'disk MB':>9}")
+    for backend in args.backends:
+        if backend == "chroma":
+            try:
+                import chromadb  # noqa: F401
+            except ImportError:
+                print(f"   {backend:<10}skipped (chromadb not installed)")
+                continue
+
+        path = tempfile.mkdtemp(prefix=f"bench_vs_{backend}_")
+        try:
+            build = run_child("build", backend, path, args.rows)
+            serve = run_child("serve", backend, path, args.rows, args.queries)
+            recall = np.mean([len(set(f) & set(t)) / 10 for f, t in zip(serve["found"], truth.tolist())])
+            disk = sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files) / 2 ** 20
+            print(
+                f"   {backend:<10}{build['build_s']:>9.1f}{serve['cold_query_s']:>10.2f}{serve['p50_ms']:>9.2f}"
+                f"{serve['p99_ms']:>9.2f}{recall:>8.3f}{build['build_rss_mb']:>9.0f}MB{serve['serve_rss_mb']:>9.0f}MB{disk:>9.0f}"
+            )
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Context Packing - Fits the most relevant retrieved chunks into a chat token budget
+Greedy by similarity, skipping near-duplicates, truncating at word boundaries only when it pays off
+"""
+
+import math
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Rough LLM tokenizer ratio for English prose; avoids shipping a tokenizer just to count
+CHARS_PER_TOKEN = 4
+
+# Chunks at or above this cosine similarity to an already packed chunk count as duplicates
+DEFAULT_DEDUPE_THRESHOLD = 0.95
+
+# A chunk that does not fit is truncated into the remaining budget only if at least this much is left
+MIN_PARTIAL_TOKENS = 48
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate LLM token count of text"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to roughly max_tokens, backing off to the last sentence or word boundary"""
+    limit = max(0, max_tokens * CHARS_PER_TOKEN - 3)
+    if len(text) <= limit:
+        return text
+    head = text[:limit]
+    sentence_end = max(head.rfind(". "), head.rfind("? "), head.rfind("! "), head.rfind("\n"))
+    if sentence_end >= limit // 2:
+        return head[:sentence_end + 1].rstrip() + "..."
+    return re.sub(r"\s+\S*$", "", head) + "..."
+
+
+def _unit(vector) -> Optional[np.ndarray]:
+    """L2-normalized float32 copy of a vector (None stays None)"""
+    if vector is None:
+        return None
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def pack_context(
+    candidates: List[Dict],
+    max_tokens: int,
+    dedupe_threshold: float = DEFAULT_DEDUPE_THRESHOLD
+) -> Dict:
+    """
+    Choose which retrieved chunks go into the chat context
+
+    Candidates are taken in descending similarity. A candidate is dropped if
+    its text matches a packed chunk or its embedding is within dedupe_threshold
+    cosine of one. Otherwise it is packed whole if it fits. If it does not fit,
+    it is truncated when at least MIN_PARTIAL_TOKENS remain, and skipped if not
+    (a smaller one further down may still fit).
+
+    Args:
+        candidates: Items with content and similarity, optionally embedding and any extra fields
+        max_tokens: Token budget for all packed content
+        dedupe_threshold: Cosine similarity at which two chunks count as the same
+
+    Returns:
+        Packed items (best first, each with tokens and truncated), tokens used and skip counts
+    """
+    packed, packed_vectors, packed_texts = [], [], set()
+    used = duplicates = over_budget = 0
+
+    for candidate in sorted(candidates, key=lambda c: c["similarity"], reverse=True):
+        text = candidate["content"]
+        key = " ".join(text.split()).lower()
+        vector = _unit(candidate.get("embedding"))
+
+        if key in packed_texts or (
+            vector is not None and any(float(vector @ other) >= dedupe_threshold for other in packed_vectors)
+        ):
+            duplicates += 1
+            continue
+
+        remaining = max_tokens - used
+        tokens = estimate_tokens(text)
+        truncated = False
+        if tokens > remaining:
+            if remaining < MIN_PARTIAL_TOKENS:
+                over_budget += 1
+                continue
+            text = truncate_to_tokens(text, remaining)
+            tokens = estimate_tokens(text)
+            truncated = True
+
+        item = {k: v for k, v in candidate.items() if k != "embedding"}
+        packed.append({**item, "content": text, "tokens": tokens, "truncated": truncated})
+        packed_texts.add(key)
+        if vector is not None:
+            packed_vectors.append(vector)
+        used += tokens
+
+    return {
+        "items": packed,
+        "tokens_used": used,
+        "duplicates_skipped": duplicates,
+        "over_budget_skipped": over_budget
+    }
@@ -0,0 +1,451 @@
+"""
+CRM Schema Migrations - Versioned, idempotent upgrades for data/sales_crm.db
+The applied version is tracked in SQLite's PRAGMA user_version
+
+Usage:
+    python crm_migrations.py [db_path]
+"""
+
+import os
+import sqlite3
+import sys
+from typing import List
+
+# Row source for accounts_fts: one document per account, contacts folded in
+ACCOUNT_FTS_ROW = """
+    SELECT a.id, a.name, a.industry, a.website,
+           (SELECT group_concat(c.name, ' ') FROM contacts c WHERE c.account_id = a.id),
+           (SELECT group_concat(c.email, ' ') FROM contacts c WHERE c.account_id = a.id)
+    FROM accounts a
+"""
+
+# Row source for pipeline_rollup: deal aggregates per (stage, created day)
+PIPELINE_ROLLUP_ROWS = """
+    SELECT stage, IFNULL(date(created_date), ''), COUNT(*),
+           IFNULL(SUM(amount), 0), COUNT(amount), IFNULL(SUM(probability), 0), COUNT(probability)
+    FROM deals
+    WHERE stage IS NOT NULL
+    GROUP BY stage, IFNULL(date(created_date), '')
+"""
+
+# Add / remove one deal's contribution to its pipeline_rollup cell
+_ROLLUP_ADD = """
+    INSERT INTO pipeline_rollup (stage, created_day, deals, amount_sum, amount_count, probability_sum, probability_count)
+    VALUES ({row}.stage, IFNULL(date({row}.created_date), ''), 1, IFNULL({row}.amount, 0), {row}.amount IS NOT NULL,
+            IFNULL({row}.probability, 0), {row}.probability IS NOT NULL)
+    ON CONFLICT (stage, created_day) DO UPDATE SET
+        deals = deals + 1,
+        amount_sum = amount_sum + excluded.amount_sum,
+        amount_count = amount_count + excluded.amount_count,
+        probability_sum = probability_sum + excluded.probability_sum,
+        probability_count = probability_count + excluded.probability_count;
+"""
+_ROLLUP_REMOVE = """
+    UPDATE pipeline_rollup SET
+        deals = deals - 1,
+        amount_sum = amount_sum - IFNULL({row}.amount, 0),
+        amount_count = amount_count - ({row}.amount IS NOT NULL),
+        probability_sum = probability_sum - IFNULL({row}.probability, 0),
+        probability_count = probability_count - ({row}.probability IS NOT NULL)
+    WHERE stage = {row}.stage AND created_day = IFNULL(date({row}.created_date), '');
+    DELETE FROM pipeline_rollup
+    WHERE stage = {row}.stage AND created_day = IFNULL(date({row}.created_date), '') AND deals = 0;
+"""
+
+# Row source for activity_rollup: activity counts per (day, type, account, rep)
+ACTIVITY_ROLLUP_ROWS = """
+    SELECT IFNULL(date(activity_date), ''), IFNULL(activity_type, ''), IFNULL(account_id, 0), IFNULL(rep, ''), COUNT(*)
+    FROM activities
+    GROUP BY 1, 2, 3, 4
+"""
+
+# Cube cell key expressions for one activities row version
+_ACTIVITY_CELL = (
+    "IFNULL(date({row}.activity_date), ''), IFNULL({row}.activity_type, ''), "
+    "IFNULL({row}.account_id, 0), IFNULL({row}.rep, '')"
+)
+_ACTIVITY_CELL_MATCH = (
+    "day = IFNULL(date({row}.activity_date), '') AND activity_type = IFNULL({row}.activity_type, '') "
+    "AND account_id = IFNULL({row}.account_id, 0) AND rep = IFNULL({row}.rep, '')"
+)
+_ACTIVITY_ADD = f"""
+    INSERT INTO activity_rollup (day, activity_type, account_id, rep, activities)
+    VALUES ({_ACTIVITY_CELL}, 1)
+    ON CONFLICT (day, activity_type, account_id, rep) DO UPDATE SET activities = activities + 1;
+"""
+_ACTIVITY_REMOVE = f"""
+    UPDATE activity_rollup SET activities = activities - 1 WHERE {_ACTIVITY_CELL_MATCH};
+    DELETE FROM activity_rollup WHERE {_ACTIVITY_CELL_MATCH} AND activities = 0;
+"""
+
+# Each migration is (version, description, statements); append only, never edit
+MIGRATIONS = [
+    (1, "Baseline CRM schema", [
+        """
+        CREATE TABLE IF NOT EXISTS accounts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            industry TEXT,
+            annual_revenue REAL,
+            employees INTEGER,
+            website TEXT,
+            created_date TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS contacts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            account_id INTEGER,
+            name TEXT NOT NULL,
+            title TEXT,
+            email TEXT,
+            phone TEXT,
+            is_primary BOOLEAN,
+            FOREIGN KEY (account_id) REFERENCES accounts (id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS deals (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            account_id INTEGER,
+            name TEXT NOT NULL,
+            amount REAL,
+            stage TEXT,
+            close_date TEXT,
+            probability INTEGER,
+            created_date TEXT,
+            FOREIGN KEY (account_id) REFERENCES accounts (id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS activities (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            account_id INTEGER,
+            activity_type TEXT,
+            description TEXT,
+            activity_date TEXT,
+            FOREIGN KEY (account_id) REFERENCES accounts (id)
+        )
+        """
+    ]),
+    (2, "Indexes for hot CRM and analytics access paths", [
+        # Stage filters combined with created/close date windows
+        "CREATE INDEX IF NOT EXISTS idx_deals_stage_created ON deals (stage, created_date)",
+        "CREATE INDEX IF NOT EXISTS idx_deals_stage_close ON deals (stage, close_date)",
+        "CREATE INDEX IF NOT EXISTS idx_deals_created ON deals (created_date)",
+        "CREATE INDEX IF NOT EXISTS idx_deals_account ON deals (account_id, stage)",
+        # Open pipeline only - covering for the stage rollups and per-account pipeline
+        """
+        CREATE INDEX IF NOT EXISTS idx_deals_open_stage ON deals (stage, amount, probability)
+        WHERE stage NOT IN ('Closed Won', 'Closed Lost')
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_deals_open_account ON deals (account_id, amount)
+        WHERE stage NOT IN ('Closed Won', 'Closed Lost')
+        """,
+        # Per-account activity timelines and the deal scoring engagement subquery
+        "CREATE INDEX IF NOT EXISTS idx_activities_account_date ON activities (account_id, activity_date)",
+        "CREATE INDEX IF NOT EXISTS idx_activities_date ON activities (activity_date, account_id)",
+        "CREATE INDEX IF NOT EXISTS idx_contacts_account ON contacts (account_id)"
+    ]),
+    (3, "FTS5 account search over account and contact fields", [
+        # rowid = accounts.id; contact names/emails are denormalized per account
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS accounts_fts USING fts5(
+            name, industry, website, contact_names, contact_emails,
+            prefix = '2 3'
+        )
+        """,
+        f"""
+        INSERT INTO accounts_fts (rowid, name, industry, website, contact_names, contact_emails)
+        {ACCOUNT_FTS_ROW}
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS accounts_fts_insert AFTER INSERT ON accounts BEGIN
+            INSERT INTO accounts_fts (rowid, name, industry, website, contact_names, contact_emails)
+            {ACCOUNT_FTS_ROW} WHERE a.id = new.id;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS accounts_fts_update AFTER UPDATE ON accounts BEGIN
+            DELETE FROM accounts_fts WHERE rowid = old.id;
+            INSERT INTO accounts_fts (rowid, name, industry, website, contact_names, contact_emails)
+            {ACCOUNT_FTS_ROW} WHERE a.id = new.id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS accounts_fts_delete AFTER DELETE ON accounts BEGIN
+            DELETE FROM accounts_fts WHERE rowid = old.id;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS contacts_fts_insert AFTER INSERT ON contacts BEGIN
+            DELETE FROM accounts_fts WHERE rowid = new.account_id;
+            INSERT INTO accounts_fts (rowid, name, industry, website, contact_names, contact_emails)
+            {ACCOUNT_FTS_ROW} WHERE a.id = new.account_id;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS contacts_fts_update AFTER UPDATE ON contacts BEGIN
+            DELETE FROM accounts_fts WHERE rowid IN (old.account_id, new.account_id);
+            INSERT INTO accounts_fts (rowid, name, industry, website, contact_names, contact_emails)
+            {ACCOUNT_FTS_ROW} WHERE a.id IN (old.account_id, new.account_id);
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS contacts_fts_delete AFTER DELETE ON contacts BEGIN
+            DELETE FROM accounts_fts WHERE rowid = old.account_id;
+            INSERT INTO accounts_fts (rowid, name, industry, website, contact_names, contact_emails)
+            {ACCOUNT_FTS_ROW} WHERE a.id = old.account_id;
+        END
+        """
+    ]),
+    (4, "Keyset index for account pagination", [
+        # Must match ACCOUNT_SORT_KEY in crm_server.py
+        "CREATE INDEX IF NOT EXISTS idx_accounts_keyset ON accounts (IFNULL(annual_revenue, 0), id)"
+    ]),
+    (5, "Deal stage history with incrementally maintained transition rollup", [
+        """
+        CREATE TABLE IF NOT EXISTS deal_stage_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            deal_id INTEGER NOT NULL,
+            from_stage TEXT,
+            to_stage TEXT NOT NULL,
+            changed_at TEXT NOT NULL,
+            days_in_from_stage REAL,
+            FOREIGN KEY (deal_id) REFERENCES deals (id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_stage_history_deal ON deal_stage_history (deal_id, changed_at)",
+        # One row per (day, from_stage, to_stage); from_stage '' = deal created
+        """
+        CREATE TABLE IF NOT EXISTS stage_transition_rollup (
+            day TEXT NOT NULL,
+            from_stage TEXT NOT NULL,
+            to_stage TEXT NOT NULL,
+            transitions INTEGER NOT NULL DEFAULT 0,
+            total_days_in_from_stage REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, from_stage, to_stage)
+        ) WITHOUT ROWID
+        """,
+        # Existing deals: only their current stage is known, entered on created_date
+        """
+        INSERT INTO deal_stage_history (deal_id, from_stage, to_stage, changed_at, days_in_from_stage)
+        SELECT id, NULL, stage, created_date, NULL FROM deals
+        WHERE stage IS NOT NULL AND id NOT IN (SELECT deal_id FROM deal_stage_history)
+        """,
+        """
+        INSERT OR REPLACE INTO stage_transition_rollup
+        SELECT date(changed_at), IFNULL(from_stage, ''), to_stage, COUNT(*), IFNULL(SUM(days_in_from_stage), 0)
+        FROM deal_stage_history
+        GROUP BY date(changed_at), IFNULL(from_stage, ''), to_stage
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS deals_stage_history_insert AFTER INSERT ON deals
+        WHEN new.stage IS NOT NULL BEGIN
+            INSERT INTO deal_stage_history (deal_id, from_stage, to_stage, changed_at, days_in_from_stage)
+            VALUES (new.id, NULL, new.stage, datetime('now', 'localtime'), NULL);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS deals_stage_history_update AFTER UPDATE OF stage ON deals
+        WHEN old.stage IS NOT new.stage BEGIN
+            INSERT INTO deal_stage_history (deal_id, from_stage, to_stage, changed_at, days_in_from_stage)
+            VALUES (
+                new.id, old.stage, new.stage, datetime('now', 'localtime'),
+                julianday('now', 'localtime') - julianday(IFNULL(
+                    (SELECT MAX(changed_at) FROM deal_stage_history WHERE deal_id = new.id),
+                    old.created_date
+                ))
+            );
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS stage_history_rollup AFTER INSERT ON deal_stage_history BEGIN
+            INSERT INTO stage_transition_rollup (day, from_stage, to_stage, transitions, total_days_in_from_stage)
+            VALUES (date(new.changed_at), IFNULL(new.from_stage, ''), new.to_stage, 1, IFNULL(new.days_in_from_stage, 0))
+            ON CONFLICT (day, from_stage, to_stage) DO UPDATE SET
+                transitions = transitions + 1,
+                total_days_in_from_stage = total_days_in_from_stage + excluded.total_days_in_from_stage;
+        END
+        """
+    ]),
+    (6, "Pipeline aggregates per stage and created day, maintained on write", [
+        """
+        CREATE TABLE IF NOT EXISTS pipeline_rollup (
+            stage TEXT NOT NULL,
+            created_day TEXT NOT NULL,
+            deals INTEGER NOT NULL DEFAULT 0,
+            amount_sum REAL NOT NULL DEFAULT 0,
+            amount_count INTEGER NOT NULL DEFAULT 0,
+            probability_sum REAL NOT NULL DEFAULT 0,
+            probability_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (stage, created_day)
+        ) WITHOUT ROWID
+        """,
+        f"INSERT OR REPLACE INTO pipeline_rollup {PIPELINE_ROLLUP_ROWS}",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS deals_pipeline_rollup_insert AFTER INSERT ON deals
+        WHEN new.stage IS NOT NULL BEGIN
+            {_ROLLUP_ADD.format(row="new")}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS deals_pipeline_rollup_delete AFTER DELETE ON deals
+        WHEN old.stage IS NOT NULL BEGIN
+            {_ROLLUP_REMOVE.format(row="old")}
+        END
+        """,
+        # Split in two so each side only fires when that row version has a stage
+        f"""
+        CREATE TRIGGER IF NOT EXISTS deals_pipeline_rollup_update_old
+        AFTER UPDATE OF stage, amount, probability, created_date ON deals
+        WHEN old.stage IS NOT NULL BEGIN
+            {_ROLLUP_REMOVE.format(row="old")}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS deals_pipeline_rollup_update_new
+        AFTER UPDATE OF stage, amount, probability, created_date ON deals
+        WHEN new.stage IS NOT NULL BEGIN
+            {_ROLLUP_ADD.format(row="new")}
+        END
+        """
+    ]),
+    (7, "Data version counter for analytics cache invalidation", [
+        # Single row; CRM write tools bump it in the same transaction as the write
+        """
+        CREATE TABLE IF NOT EXISTS data_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+        """,
+        # Random start, so a recreated database never reuses a version a cache has seen
+        "INSERT OR IGNORE INTO data_version (id, version) VALUES (1, random() & 140737488355327)"
+    ]),
+    (8, "Activity rep and day x type x account x rep rollup cube", [
+        "ALTER TABLE activities ADD COLUMN rep TEXT",
+        # Empty string / 0 stand in for NULLs so every cell has a full key
+        """
+        CREATE TABLE IF NOT EXISTS activity_rollup (
+            day TEXT NOT NULL,
+            activity_type TEXT NOT NULL,
+            account_id INTEGER NOT NULL,
+            rep TEXT NOT NULL,
+            activities INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, activity_type, account_id, rep)
+        ) WITHOUT ROWID
+        """,
+        f"INSERT OR REPLACE INTO activity_rollup {ACTIVITY_ROLLUP_ROWS}",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS activities_rollup_insert AFTER INSERT ON activities BEGIN
+            {_ACTIVITY_ADD.format(row="new")}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS activities_rollup_delete AFTER DELETE ON activities BEGIN
+            {_ACTIVITY_REMOVE.format(row="old")}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS activities_rollup_update
+        AFTER UPDATE OF activity_date, activity_type, account_id, rep ON activities BEGIN
+            {_ACTIVITY_REMOVE.format(row="old")}
+            {_ACTIVITY_ADD.format(row="new")}
+        END
+        """
+    ]),
+    (9, "Stage history creation entries stamped with the deal's created_date", [
+        # v5's insert trigger used the insert time, so imported/seeded deals all "entered" today
+        "DROP TRIGGER IF EXISTS deals_stage_history_insert",
+        """
+        CREATE TRIGGER deals_stage_history_insert AFTER INSERT ON deals
+        WHEN new.stage IS NOT NULL BEGIN
+            INSERT INTO deal_stage_history (deal_id, from_stage, to_stage, changed_at, days_in_from_stage)
+            VALUES (new.id, NULL, new.stage, IFNULL(new.created_date, datetime('now', 'localtime')), NULL);
+        END
+        """,
+        """
+        UPDATE deal_stage_history
+        SET changed_at = (SELECT d.created_date FROM deals d WHERE d.id = deal_stage_history.deal_id)
+        WHERE from_stage IS NULL
+          AND (SELECT d.created_date FROM deals d WHERE d.id = deal_stage_history.deal_id) IS NOT NULL
+        """,
+        "DELETE FROM stage_transition_rollup",
+        """
+        INSERT INTO stage_transition_rollup
+        SELECT date(changed_at), IFNULL(from_stage, ''), to_stage, COUNT(*), IFNULL(SUM(days_in_from_stage), 0)
+        FROM deal_stage_history
+        GROUP BY date(changed_at), IFNULL(from_stage, ''), to_stage
+        """
+    ]),
+]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Return the migration version the database is currently at"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def apply_migrations(conn: sqlite3.Connection) -> List[int]:
+    """
+    Apply every pending migration, each in its own transaction
+
+    Each step takes the write lock (BEGIN IMMEDIATE) and re-reads the version
+    inside it, so connections migrating the same database concurrently (the
+    CRM and analytics pool initializers) apply every step exactly once.
+
+    Args:
+        conn: Open connection to the CRM database
+
+    Returns:
+        Versions that were applied (empty if already up to date)
+    """
+    if conn.in_transaction:
+        conn.commit()
+
+    applied = []
+    current = get_schema_version(conn)
+
+    for version, description, statements in MIGRATIONS:
+        if version <= current:
+            continue
+
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            current = get_schema_version(conn)
+            if version <= current:
+                # Another connection applied it while we waited for the lock
+                conn.rollback()
+                continue
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        applied.append(version)
+
+    if applied:
+        # Refresh planner statistics for the new indexes
+        conn.execute("PRAGMA optimize")
+
+    return applied
+
+
+if __name__ == "__main__":
+    db_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join("data", "sales_crm.db")
+    conn = sqlite3.connect(db_path)
+    before = get_schema_version(conn)
+    applied = apply_migrations(conn)
+    conn.close()
+
+    if applied:
+        print(f"✅ Migrated {db_path} from v{before} to v{applied[-1]}")
+        for version, description, _ in MIGRATIONS:
+            if version in applied:
+                print(f"   - v{version}: {description}")
+    else:
+        print(f"✅ {db_path} already at v{before}")
@@ -0,0 +1,228 @@
+"""
+SQLite Connection Pool - Shared by the CRM and Analytics MCP servers
+Keeps a fixed set of tuned connections open for the life of the server process
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+
+# Pool defaults (overridable per process through the environment)
+DEFAULT_POOL_SIZE = int(os.environ.get("CRM_DB_POOL_SIZE", "4"))
+DEFAULT_TIMEOUT = float(os.environ.get("CRM_DB_POOL_TIMEOUT", "10"))
+DEFAULT_HEALTH_CHECK_INTERVAL = float(os.environ.get("CRM_DB_HEALTH_CHECK_INTERVAL", "30"))
+
+# Per-connection PRAGMAs applied once when a connection is opened
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 268435456,     # 256 MB
+    "cache_size": -65536,       # 64 MB (negative = KiB)
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000
+}
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available in time"""
+
+
+class ConnectionPool:
+    """Thread-safe pool of persistent SQLite connections"""
+
+    def __init__(
+        self,
+        db_path: str,
+        size: int = DEFAULT_POOL_SIZE,
+        timeout: float = DEFAULT_TIMEOUT,
+        health_check_interval: float = DEFAULT_HEALTH_CHECK_INTERVAL,
+        pragmas: Optional[Dict] = None,
+        initializer: Optional[Callable[[sqlite3.Connection], object]] = None
+    ):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self.initializer = initializer
+
+        self._idle = []  # (connection, last used), most recently returned last
+        self._created = 0
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)  # notified when a connection or a free slot appears
+        self._closed = False
+        self._initialized = initializer is None
+
+        self.stats = {
+            "connections_opened": 0,
+            "connections_replaced": 0,
+            "checkouts": 0,
+            "waits": 0
+        }
+
+    def _open(self) -> sqlite3.Connection:
+        """Open a new connection and apply the configured PRAGMAs"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        for pragma, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {pragma} = {value}")
+
+        # One-time database setup (e.g. schema migrations) on first open
+        if not self._initialized:
+            with self._lock:
+                if not self._initialized:
+                    try:
+                        self.initializer(conn)
+                    except Exception:
+                        conn.close()
+                        raise
+                    self._initialized = True
+
+        self._count("connections_opened")
+        return conn
+
+    def _count(self, stat: str):
+        """Increment a statistics counter (callers must not hold the lock)"""
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _is_healthy(self, conn: sqlite3.Connection) -> bool:
+        """Check that a connection can still run a query"""
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self) -> sqlite3.Connection:
+        """Check out a connection, opening one if the pool is not yet full"""
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        with self._available:
+            while True:
+                if self._closed:
+                    raise PoolTimeout("Connection pool is closed")
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                    break
+                if self._created < self.size:
+                    self._created += 1
+                    conn = idle_since = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(
+                        f"No database connection available after {self.timeout}s (pool size {self.size})"
+                    )
+                if not waited:
+                    self.stats["waits"] += 1
+                    waited = True
+                self._available.wait(remaining)
+
+        if conn is None:
+            conn = self._open_or_free_slot()
+        elif time.monotonic() - idle_since > self.health_check_interval and not self._is_healthy(conn):
+            # Health check connections that have been idle for a while
+            self._discard(conn)
+            conn = self._open_or_free_slot()
+            self._count("connections_replaced")
+
+        self._count("checkouts")
+        return conn
+
+    def _open_or_free_slot(self) -> sqlite3.Connection:
+        """Open a connection for a reserved slot, giving the slot back (and waking a waiter) on failure"""
+        try:
+            return self._open()
+        except Exception:
+            self._free_slot()
+            raise
+
+    def _free_slot(self):
+        """Forget a connection that is gone, so a waiting thread can open a new one"""
+        with self._available:
+            self._created -= 1
+            self._available.notify()
+
+    def release(self, conn: sqlite3.Connection):
+        """Return a connection to the pool, rolling back any open transaction"""
+        if self._closed:
+            self._discard(conn)
+            self._free_slot()
+            return
+
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # Broken connection - a waiter (or the next checkout) opens a replacement
+            self._discard(conn)
+            self._free_slot()
+            return
+
+        with self._available:
+            self._idle.append((conn, time.monotonic()))
+            self._available.notify()
+
+    def _discard(self, conn: sqlite3.Connection):
+        """Close a connection"""
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Context manager that checks out a connection and always returns it"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def health_check(self) -> Dict:
+        """Run a health check on every idle connection, replacing broken ones"""
+        checked = 0
+        replaced = 0
+        with self._available:
+            idle, self._idle = self._idle, []
+
+        checked_idle = []
+        try:
+            for conn, idle_since in idle:
+                checked += 1
+                if not self._is_healthy(conn):
+                    self._discard(conn)
+                    conn = self._open_or_free_slot()
+                    replaced += 1
+                    self._count("connections_replaced")
+                checked_idle.append((conn, time.monotonic()))
+        finally:
+            # Connections not yet checked (after a failed replacement) go back unchanged
+            with self._available:
+                self._idle.extend(checked_idle + idle[checked:])
+                self._available.notify_all()
+
+        with self._lock:
+            return {
+                "pool_size": self.size,
+                "open_connections": self._created,
+                "idle_connections": len(self._idle),
+                "checked": checked,
+                "replaced": replaced,
+                **self.stats
+            }
+
+    def close(self):
+        """Close all idle connections; checked-out ones close on release"""
+        with self._available:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._available.notify_all()
+        for conn, _ in idle:
+            self._discard(conn)
@@ -0,0 +1,204 @@
+"""
+Embedding Cache - Content-addressed cache for sentence embeddings
+In-memory LRU tier in front of an on-disk SQLite tier that survives restarts
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+# Cache defaults (overridable per process through the environment)
+DEFAULT_CACHE_PATH = os.environ.get("RAG_EMBEDDING_CACHE_PATH", "./embedding_cache.db")
+DEFAULT_MEMORY_ENTRIES = int(os.environ.get("RAG_EMBEDDING_CACHE_MEMORY_ENTRIES", "10000"))
+DEFAULT_DISK_ENTRIES = int(os.environ.get("RAG_EMBEDDING_CACHE_DISK_ENTRIES", "200000"))
+
+# Disk eviction trims down to this fraction of the cap, so it runs rarely
+DISK_EVICTION_TARGET = 0.9
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form for cache keys: NFC, trimmed, whitespace runs collapsed"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache keyed by sha256(model name + normalized text)
+
+    Vectors are stored as float32. Pass path=None for a memory-only cache.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        path: Optional[str] = DEFAULT_CACHE_PATH,
+        memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+        disk_entries: int = DEFAULT_DISK_ENTRIES
+    ):
+        self.model_name = model_name
+        self.path = path
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+
+        self._memory = OrderedDict()  # key -> vector, least recently used first
+        self._lock = threading.Lock()
+        self._conn = None
+        self._disk_count = 0
+
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute("PRAGMA synchronous = NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key TEXT PRIMARY KEY,
+                    vector BLOB NOT NULL,
+                    last_used REAL NOT NULL
+                ) WITHOUT ROWID
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+            self._conn.commit()
+            self._disk_count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0
+        }
+
+    def key(self, text: str) -> str:
+        """Content address for a text under this cache's model"""
+        payload = f"{self.model_name}\0{normalize_text(text)}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Look unique keys up in memory, then on disk; returns only the hits"""
+        found = {}
+        with self._lock:
+            missing = []
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+                    self.stats["memory_hits"] += 1
+                else:
+                    missing.append(key)
+
+            if missing and self._conn is not None:
+                for start in range(0, len(missing), 500):
+                    chunk = missing[start:start + 500]
+                    rows = self._conn.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                    ).fetchall()
+                    for key, blob in rows:
+                        vector = np.frombuffer(blob, dtype=np.float32)
+                        found[key] = vector
+                        self._remember(key, vector)
+                    self.stats["disk_hits"] += len(rows)
+                    if rows:
+                        self._conn.executemany(
+                            "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                            [(time.time(), key) for key, _ in rows]
+                        )
+                        self._conn.commit()
+
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray]):
+        """Store freshly computed vectors in both tiers"""
+        with self._lock:
+            for key, vector in items.items():
+                self._remember(key, vector)
+
+            if self._conn is not None and items:
+                now = time.time()
+                before = self._conn.total_changes
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                    [(key, vector.tobytes(), now) for key, vector in items.items()]
+                )
+                self._disk_count += self._conn.total_changes - before
+                if self._disk_count > self.disk_entries:
+                    self._evict_disk()
+                self._conn.commit()
+
+    def _remember(self, key: str, vector: np.ndarray):
+        """Insert into the memory tier, evicting least recently used entries"""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self.stats["memory_evictions"] += 1
+
+    def _evict_disk(self):
+        """Drop least recently used rows until the disk tier is back under its cap"""
+        excess = self._disk_count - int(self.disk_entries * DISK_EVICTION_TARGET)
+        self._conn.execute("""
+            DELETE FROM embeddings WHERE key IN (
+                SELECT key FROM embeddings ORDER BY last_used LIMIT ?
+            )
+        """, (excess,))
+        self._disk_count -= excess
+        self.stats["disk_evictions"] += excess
+
+    def embed(self, texts: List[str], encode: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Embeddings for texts, calling encode only for texts not cached yet
+
+        Args:
+            texts: Texts to embed (duplicates are encoded once)
+            encode: Model call that embeds a list of texts into a 2-D array
+
+        Returns:
+            float32 array with one row per input text
+        """
+        keys = [self.key(text) for text in texts]
+        found = self.get_many(list(dict.fromkeys(keys)))
+
+        misses = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in misses:
+                misses[key] = text
+
+        if misses:
+            with self._lock:
+                self.stats["misses"] += len(misses)
+
+            vectors = np.asarray(encode(list(misses.values())), dtype=np.float32)
+            # Own copies, so a cached row does not pin the whole batch array
+            computed = {key: vector.copy() for key, vector in zip(misses, vectors)}
+            self.put_many(computed)
+            found.update(computed)
+
+        return np.stack([found[key] for key in keys])
+
+    def snapshot(self) -> Dict:
+        """Hit/miss statistics and tier occupancy"""
+        with self._lock:
+            hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+            lookups = hits + self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_rate": round(hits / lookups * 100, 1) if lookups else 0,
+                "memory_entries": len(self._memory),
+                "memory_capacity": self.memory_entries,
+                "disk_entries": self._disk_count,
+                "disk_capacity": self.disk_entries if self._conn is not None else 0,
+                "model": self.model_name
+            }
+
+    def close(self):
+        """Close the on-disk tier"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
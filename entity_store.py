@@ -0,0 +1,226 @@
+"""
+Entity Store - Canonical registry for the entities extracted from transcripts
+Upserts by normalized (type, value), near-duplicate aliases, and per-transcript mention back-references in SQLite
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+# Registry location and collapse settings (overridable per process through the environment)
+DEFAULT_ENTITY_STORE_PATH = os.environ.get("RAG_ENTITY_STORE_PATH", "./rag_entities.db")
+DEFAULT_ENTITY_DEDUPE_THRESHOLD = float(os.environ.get("RAG_ENTITY_DEDUPE_THRESHOLD", "0.92"))
+
+# Transcript back-references copied into vector-store metadata (the registry keeps all of them)
+BACKREF_LIMIT = 50
+
+
+def normalize_entity_value(value: str) -> str:
+    """Canonical form of an entity value: NFKC, case-folded, punctuation dropped, whitespace collapsed"""
+    text = unicodedata.normalize("NFKC", str(value)).casefold()
+    return " ".join(re.findall(r"\w+(?:[.@'+-]\w+)*", text))
+
+
+def entity_key(entity_type: str, value: str) -> Tuple[str, str]:
+    """(type, normalized value) key that identifies an entity"""
+    return normalize_entity_value(entity_type), normalize_entity_value(value)
+
+
+def canonical_entity_id(key: Tuple[str, str]) -> str:
+    """Stable vector-store ID for the entity first seen under key"""
+    return f"entity_{key[0]}_{key[1]}"
+
+
+class EntityStore:
+    """
+    Canonical entities, the normalized keys (aliases) that resolve to them, and their mentions
+
+    A mention is one (entity, transcript) pair, so storing a transcript again
+    leaves counts unchanged. Pass path=":memory:" for a throwaway registry.
+    Writes commit immediately unless made inside transaction().
+    """
+
+    def __init__(self, path: str = DEFAULT_ENTITY_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._deferred = False
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS entities (
+                entity_id TEXT PRIMARY KEY,
+                entity_type TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS aliases (
+                entity_type TEXT NOT NULL,
+                normalized TEXT NOT NULL,
+                entity_id TEXT NOT NULL REFERENCES entities (entity_id),
+                value TEXT NOT NULL,
+                PRIMARY KEY (entity_type, normalized)
+            );
+            CREATE TABLE IF NOT EXISTS mentions (
+                entity_id TEXT NOT NULL REFERENCES entities (entity_id),
+                transcript_id TEXT NOT NULL,
+                confidence REAL NOT NULL DEFAULT 0.5,
+                mentioned_at TEXT NOT NULL,
+                PRIMARY KEY (entity_id, transcript_id)
+            );
+            CREATE INDEX IF NOT EXISTS idx_aliases_entity ON aliases (entity_id);
+        """)
+        self._conn.commit()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Hold back commits until the block exits; an exception rolls back every write made in it
+
+        Callers serialize their own writers: writes from other threads share the
+        connection and become part of the open transaction.
+        """
+        self._deferred = True
+        try:
+            yield self
+        except BaseException:
+            with self._lock:
+                self._conn.rollback()
+            raise
+        else:
+            with self._lock:
+                self._conn.commit()
+        finally:
+            self._deferred = False
+
+    def _commit(self):
+        """Commit, unless a transaction() is open"""
+        if not self._deferred:
+            self._conn.commit()
+
+    def resolve(self, keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], str]:
+        """Entity IDs for the keys already registered (as a canonical value or an alias)"""
+        found = {}
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                row = self._conn.execute(
+                    "SELECT entity_id FROM aliases WHERE entity_type = ? AND normalized = ?", key
+                ).fetchone()
+                if row:
+                    found[key] = row[0]
+        return found
+
+    def known(self, entity_ids: List[str]) -> set:
+        """The subset of entity_ids that are registered canonical entities"""
+        with self._lock:
+            return {
+                entity_id for entity_id in entity_ids
+                if self._conn.execute("SELECT 1 FROM entities WHERE entity_id = ?", (entity_id,)).fetchone()
+            }
+
+    def register(self, entity_id: str, key: Tuple[str, str], value: str):
+        """Create a canonical entity whose first key is key; a no-op if it already exists"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO entities (entity_id, entity_type, value, created_at) VALUES (?, ?, ?, ?)",
+                (entity_id, key[0], value, datetime.now().isoformat())
+            )
+            self._conn.execute(
+                "INSERT OR IGNORE INTO aliases (entity_type, normalized, entity_id, value) VALUES (?, ?, ?, ?)",
+                (key[0], key[1], entity_id, value)
+            )
+            self._commit()
+
+    def add_alias(self, key: Tuple[str, str], entity_id: str, value: str):
+        """Resolve key to an existing entity from now on (the first mapping of a key wins)"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO aliases (entity_type, normalized, entity_id, value) VALUES (?, ?, ?, ?)",
+                (key[0], key[1], entity_id, value)
+            )
+            self._commit()
+
+    def add_mentions(self, mentions: List[Tuple[str, str, float]]) -> set:
+        """
+        Record (entity_id, transcript_id, confidence) mentions
+
+        Returns:
+            Entity IDs that gained a mention (repeats of a known pair only raise its confidence)
+        """
+        now = datetime.now().isoformat()
+        changed = set()
+        with self._lock:
+            for entity_id, transcript_id, confidence in mentions:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO mentions (entity_id, transcript_id, confidence, mentioned_at) VALUES (?, ?, ?, ?)",
+                    (entity_id, str(transcript_id), confidence, now)
+                )
+                if cursor.rowcount:
+                    changed.add(entity_id)
+                else:
+                    self._conn.execute(
+                        "UPDATE mentions SET confidence = MAX(confidence, ?) WHERE entity_id = ? AND transcript_id = ?",
+                        (confidence, entity_id, str(transcript_id))
+                    )
+            self._commit()
+        return changed
+
+    def summaries(self, entity_ids: List[str], backref_limit: int = BACKREF_LIMIT) -> Dict[str, Dict]:
+        """
+        Vector-store metadata for canonical entities
+
+        Returns:
+            entity_id -> entity_type, entity_value, mention_count, confidence (highest),
+            transcript_id (first mention), transcript_ids (latest backref_limit, JSON)
+            and aliases (JSON)
+        """
+        summaries = {}
+        with self._lock:
+            for entity_id in dict.fromkeys(entity_ids):
+                entity = self._conn.execute(
+                    "SELECT entity_type, value FROM entities WHERE entity_id = ?", (entity_id,)
+                ).fetchone()
+                if entity is None:
+                    continue
+                count, confidence = self._conn.execute(
+                    "SELECT COUNT(*), COALESCE(MAX(confidence), 0.5) FROM mentions WHERE entity_id = ?", (entity_id,)
+                ).fetchone()
+                transcripts = [row[0] for row in self._conn.execute(
+                    "SELECT transcript_id FROM mentions WHERE entity_id = ? ORDER BY mentioned_at DESC, rowid DESC LIMIT ?",
+                    (entity_id, backref_limit)
+                )]
+                first = self._conn.execute(
+                    "SELECT transcript_id FROM mentions WHERE entity_id = ? ORDER BY mentioned_at, rowid LIMIT 1",
+                    (entity_id,)
+                ).fetchone()
+                aliases = [row[0] for row in self._conn.execute(
+                    "SELECT value FROM aliases WHERE entity_id = ? ORDER BY rowid", (entity_id,)
+                )]
+                summaries[entity_id] = {
+                    "entity_type": entity[0],
+                    "entity_value": entity[1],
+                    "mention_count": count,
+                    "confidence": confidence,
+                    "transcript_id": first[0] if first else "",
+                    "transcript_ids": json.dumps(transcripts),
+                    "aliases": json.dumps(aliases)
+                }
+        return summaries
+
+    def stats(self) -> Dict:
+        """Entity, alias and mention counts"""
+        with self._lock:
+            return {
+                table: self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("entities", "aliases", "mentions")
+            }
+
+    def close(self):
+        """Close the registry"""
+        self._conn.close()
@@ -0,0 +1,158 @@
+"""
+Hybrid Search - BM25 keyword index and rank fusion for the RAG collections
+SQLite FTS5 mirror of the Chroma documents, so exact terms (company names, SKUs, amounts) are retrievable
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+# Index location (overridable per process through the environment)
+DEFAULT_LEXICAL_PATH = os.environ.get("RAG_LEXICAL_PATH", "./rag_lexical.db")
+
+# Reciprocal rank fusion damping; 60 is the value from the original RRF paper
+RRF_K = 60
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """Turn free text into an FTS5 MATCH expression (any token, exact terms)"""
+    tokens = dict.fromkeys(re.findall(r"\w+", query.lower()))
+    if not tokens:
+        return None
+    return " OR ".join(f'"{token}"' for token in tokens)
+
+
+def term_coverage(query: str, text: str) -> float:
+    """Fraction of the query's distinct tokens that appear in text"""
+    wanted = set(re.findall(r"\w+", query.lower()))
+    if not wanted:
+        return 0.0
+    return len(wanted & set(re.findall(r"\w+", text.lower()))) / len(wanted)
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = RRF_K) -> List[tuple]:
+    """
+    Fuse ranked ID lists: score(id) = sum over lists of 1 / (k + rank)
+
+    Args:
+        rankings: Best-first ID lists, one per retriever
+        k: Damping constant; larger values flatten the head of each list
+
+    Returns:
+        (id, score) pairs, best first; ties keep first-seen order
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class LexicalIndex:
+    """
+    BM25-ranked keyword index over documents grouped by collection
+
+    Document IDs match the Chroma IDs and, like Chroma adds, the first write
+    of an ID wins. Pass path=":memory:" for a throwaway index.
+    """
+
+    def __init__(self, path: str = DEFAULT_LEXICAL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS documents (
+                rowid INTEGER PRIMARY KEY,
+                id TEXT NOT NULL UNIQUE,
+                collection TEXT NOT NULL,
+                content TEXT NOT NULL,
+                metadata TEXT NOT NULL DEFAULT '{}'
+            );
+            CREATE INDEX IF NOT EXISTS idx_documents_collection ON documents (collection);
+
+            CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+                content, content = 'documents', content_rowid = 'rowid'
+            );
+
+            CREATE TRIGGER IF NOT EXISTS documents_fts_insert AFTER INSERT ON documents BEGIN
+                INSERT INTO documents_fts (rowid, content) VALUES (new.rowid, new.content);
+            END;
+            CREATE TRIGGER IF NOT EXISTS documents_fts_delete AFTER DELETE ON documents BEGIN
+                INSERT INTO documents_fts (documents_fts, rowid, content) VALUES ('delete', old.rowid, old.content);
+            END;
+        """)
+        self._conn.commit()
+
+    def add(self, collection: str, ids: List[str], documents: List[str], metadatas: Optional[List[Dict]] = None):
+        """Index documents; IDs already present are left as they are"""
+        metadatas = metadatas or [{}] * len(ids)
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO documents (id, collection, content, metadata) VALUES (?, ?, ?, ?)",
+                [(doc_id, collection, doc, json.dumps(meta)) for doc_id, doc, meta in zip(ids, documents, metadatas)]
+            )
+            self._conn.commit()
+
+    def update_metadata(self, collection: str, ids: List[str], metadatas: List[Dict]):
+        """Replace the stored metadata of indexed documents (the indexed text is unchanged)"""
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE documents SET metadata = ? WHERE collection = ? AND id = ?",
+                [(json.dumps(meta), collection, doc_id) for doc_id, meta in zip(ids, metadatas)]
+            )
+            self._conn.commit()
+
+    def delete(self, collection: str, ids: List[str]):
+        """Drop documents from the index"""
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM documents WHERE collection = ? AND id = ?", [(collection, doc_id) for doc_id in ids]
+            )
+            self._conn.commit()
+
+    def count(self, collection: str) -> int:
+        """Documents indexed for a collection"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM documents WHERE collection = ?", (collection,)
+            ).fetchone()[0]
+
+    def search(self, collection: str, query: str, limit: int = 50) -> List[Dict]:
+        """
+        BM25 keyword search within one collection
+
+        Args:
+            collection: Collection the documents were added under
+            query: Free text; any token may match, rarer tokens weigh more
+            limit: Maximum hits
+
+        Returns:
+            Hits best first, each with id, content, metadata and bm25 (lower is better)
+        """
+        match = build_match_query(query)
+        if match is None:
+            return []
+
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT d.id, d.content, d.metadata, bm25(documents_fts) AS score
+                FROM documents_fts
+                JOIN documents d ON d.rowid = documents_fts.rowid
+                WHERE documents_fts MATCH ? AND d.collection = ?
+                ORDER BY score
+                LIMIT ?
+            """, (match, collection, limit)).fetchall()
+
+        return [
+            {"id": doc_id, "content": content, "metadata": json.loads(metadata), "bm25": score}
+            for doc_id, content, metadata, score in rows
+        ]
+
+    def close(self):
+        """Close the index"""
+        self._conn.close()
@@ -7,6 +7,8 @@ import os
 from datetime import datetime, timedelta
 import random
 
+from crm_migrations import apply_migrations
+
 # Create data directory if it doesn't exist
 os.makedirs("data", exist_ok=True)
 
@@ -21,58 +23,10 @@ def init_database():
         os.remove(DB_PATH)
 
     conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
 
-    # Create schema
-    cursor.execute("""
-        CREATE TABLE accounts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            industry TEXT,
-            annual_revenue REAL,
-            employees INTEGER,
-            website TEXT,
-            created_date TEXT
-        )
-    """)
-
-    cursor.execute("""
-        CREATE TABLE contacts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            account_id INTEGER,
-            name TEXT NOT NULL,
-            title TEXT,
-            email TEXT,
-            phone TEXT,
-            is_primary BOOLEAN,
-            FOREIGN KEY (account_id) REFERENCES accounts (id)
-        )
-    """)
-
-    cursor.execute("""
-        CREATE TABLE deals (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            account_id INTEGER,
-            name TEXT NOT NULL,
-            amount REAL,
-            stage TEXT,
-            close_date TEXT,
-            probability INTEGER,
-            created_date TEXT,
-            FOREIGN KEY (account_id) REFERENCES accounts (id)
-        )
-    """)
-
-    cursor.execute("""
-        CREATE TABLE activities (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            account_id INTEGER,
-            activity_type TEXT,
-            description TEXT,
-            activity_date TEXT,
-            FOREIGN KEY (account_id) REFERENCES accounts (id)
-        )
-    """)
+    # Create schema (baseline tables plus indexes)
+    apply_migrations(conn)
+    cursor = conn.cursor()
 
     # Sample data
     accounts = [
@@ -146,18 +100,20 @@ def init_database():
 
     # Insert activities
     activity_types = ["Email", "Call", "Meeting", "Demo", "Proposal Sent", "Follow-up"]
+    sales_reps = ["Alex Morgan", "Jordan Lee", "Sam Patel"]
 
     for i in range(1, 11):  # For each account
         num_activities = random.randint(3, 8)
         for j in range(num_activities):
             cursor.execute("""
-                INSERT INTO activities (account_id, activity_type, description, activity_date)
-                VALUES (?, ?, ?, ?)
+                INSERT INTO activities (account_id, activity_type, description, activity_date, rep)
+                VALUES (?, ?, ?, ?, ?)
             """, (
                 i,
                 random.choice(activity_types),
                 f"Sales activity for {accounts[i-1][0]}",
-                (datetime.now() - timedelta(days=random.randint(0, 30))).strftime("%Y-%m-%d %H:%M:%S")
+                (datetime.now() - timedelta(days=random.randint(0, 30))).strftime("%Y-%m-%d %H:%M:%S"),
+                sales_reps[(i + j) % len(sales_reps)]
             ))
 
     conn.commit()
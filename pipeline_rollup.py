@@ -0,0 +1,95 @@
+"""
+Pipeline Rollup - Stage aggregates materialized on write for the CRM and Analytics servers
+Deal triggers (crm_migrations v6) keep pipeline_rollup current; reads never scan deals
+"""
+
+import sqlite3
+from typing import Dict, Optional
+
+from crm_migrations import PIPELINE_ROLLUP_ROWS
+
+CLOSED_STAGES = ("Closed Won", "Closed Lost")
+
+# Relative tolerance for REAL sums accumulated one deal at a time
+SUM_TOLERANCE = 1e-9
+
+
+def stage_totals(conn: sqlite3.Connection, created_since: Optional[str] = None) -> Dict[str, Dict]:
+    """
+    Deal aggregates by stage, optionally limited to deals created on or after a day
+
+    Args:
+        conn: Open connection to the CRM database
+        created_since: First created day to include (YYYY-MM-DD)
+
+    Returns:
+        {stage: {"deals", "total_value", "avg_amount", "avg_probability"}}, with None
+        averages when a stage has no non-NULL values (same as SQL AVG)
+    """
+    query = """
+        SELECT stage, SUM(deals), SUM(amount_sum), SUM(amount_count), SUM(probability_sum), SUM(probability_count)
+        FROM pipeline_rollup
+    """
+    params = []
+    if created_since:
+        query += " WHERE created_day >= ?"
+        params.append(created_since)
+    query += " GROUP BY stage"
+
+    totals = {}
+    for stage, deals, amount_sum, amount_count, probability_sum, probability_count in conn.execute(query, params):
+        totals[stage] = {
+            "deals": deals,
+            "total_value": amount_sum,
+            "avg_amount": amount_sum / amount_count if amount_count else None,
+            "avg_probability": probability_sum / probability_count if probability_count else None
+        }
+    return totals
+
+
+def open_stages(totals: Dict[str, Dict]) -> Dict[str, Dict]:
+    """Drop the closed stages from a stage_totals() result"""
+    return {stage: row for stage, row in totals.items() if stage not in CLOSED_STAGES}
+
+
+def check_pipeline_rollup(conn: sqlite3.Connection, rebuild: bool = False) -> Dict:
+    """
+    Compare pipeline_rollup with a from-scratch aggregate of deals
+
+    Args:
+        conn: Open connection to the CRM database
+        rebuild: Replace the rollup with the recomputed rows if they differ
+
+    Returns:
+        Consistency report with the mismatched (stage, created_day) cells
+    """
+    def cells(rows):
+        return {(row[0], row[1]): row[2:] for row in rows}
+
+    expected = cells(conn.execute(PIPELINE_ROLLUP_ROWS))
+    actual = cells(conn.execute("""
+        SELECT stage, created_day, deals, amount_sum, amount_count, probability_sum, probability_count
+        FROM pipeline_rollup
+    """))
+
+    mismatched = []
+    for key in sorted(expected.keys() | actual.keys()):
+        want, got = expected.get(key), actual.get(key)
+        if want is None or got is None or any(
+            abs(w - g) > SUM_TOLERANCE * max(1.0, abs(w)) for w, g in zip(want, got)
+        ):
+            mismatched.append({"stage": key[0], "created_day": key[1], "expected": want, "actual": got})
+
+    rebuilt = False
+    if mismatched and rebuild:
+        with conn:
+            conn.execute("DELETE FROM pipeline_rollup")
+            conn.execute(f"INSERT INTO pipeline_rollup {PIPELINE_ROLLUP_ROWS}")
+        rebuilt = True
+
+    return {
+        "consistent": not mismatched,
+        "cells_checked": len(expected.keys() | actual.keys()),
+        "mismatched": mismatched,
+        "rebuilt": rebuilt
+    }
@@ -0,0 +1,212 @@
+"""
+RAG Executor - Keeps blocking model and vector-store calls off the asyncio event loop
+Bounded thread pool with a concurrency limit, plus a micro-batcher for bursts of small requests
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+# Executor defaults (overridable per process through the environment)
+DEFAULT_WORKERS = int(os.environ.get("RAG_EXECUTOR_WORKERS", "4"))
+DEFAULT_MAX_QUEUE = int(os.environ.get("RAG_EXECUTOR_MAX_QUEUE", "256"))
+DEFAULT_BATCH_WINDOW_MS = float(os.environ.get("RAG_SEARCH_BATCH_WINDOW_MS", "3"))
+DEFAULT_MAX_BATCH = int(os.environ.get("RAG_SEARCH_MAX_BATCH", "32"))
+
+
+class ExecutorBusy(RuntimeError):
+    """Raised when the wait queue is full; callers should retry later"""
+
+
+class BlockingExecutor:
+    """
+    Runs blocking callables on a fixed-size thread pool
+
+    At most `workers` calls run at once; up to `max_queue` more wait their turn
+    on the event loop, and anything beyond that is rejected with ExecutorBusy
+    instead of piling up unbounded work.
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, max_queue: int = DEFAULT_MAX_QUEUE, name: str = "rag-worker"):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self._slots = None  # asyncio.Semaphore, bound to the running loop on first use
+        self._lock = threading.Lock()
+
+        self.queued = 0
+        self.in_flight = 0
+        self.stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "max_queue_depth": 0,
+            "max_in_flight": 0,
+            "wait_seconds": 0.0,
+            "run_seconds": 0.0
+        }
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Run func(*args, **kwargs) on the pool once a slot is free
+
+        Args:
+            func: Blocking callable (model inference, vector-store I/O)
+
+        Returns:
+            Whatever func returns; its exceptions propagate to the caller
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+
+        with self._lock:
+            if self.queued >= self.max_queue:
+                self.stats["rejected"] += 1
+                raise ExecutorBusy(f"RAG executor queue is full ({self.max_queue} waiting)")
+            self.queued += 1
+            self.stats["submitted"] += 1
+            self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], self.queued)
+
+        enqueued = time.perf_counter()
+        try:
+            await self._slots.acquire()
+        finally:
+            with self._lock:
+                self.queued -= 1
+
+        started = time.perf_counter()
+        with self._lock:
+            self.in_flight += 1
+            self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.in_flight)
+            self.stats["wait_seconds"] += started - enqueued
+
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._pool, lambda: func(*args, **kwargs))
+        except BaseException:
+            with self._lock:
+                self.stats["failed"] += 1
+            raise
+        else:
+            with self._lock:
+                self.stats["completed"] += 1
+            return result
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.stats["run_seconds"] += time.perf_counter() - started
+            self._slots.release()
+
+    def snapshot(self) -> Dict:
+        """Queue depth, in-flight work and cumulative timings"""
+        with self._lock:
+            finished = self.stats["completed"] + self.stats["failed"]
+            return {
+                **self.stats,
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "queue_depth": self.queued,
+                "in_flight": self.in_flight,
+                "avg_wait_ms": round(self.stats["wait_seconds"] / finished * 1000, 2) if finished else 0,
+                "avg_run_ms": round(self.stats["run_seconds"] / finished * 1000, 2) if finished else 0,
+                "wait_seconds": round(self.stats["wait_seconds"], 3),
+                "run_seconds": round(self.stats["run_seconds"], 3)
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker threads"""
+        self._pool.shutdown(wait=wait)
+
+
+class MicroBatcher:
+    """
+    Coalesces requests that arrive within a short window into one blocking call
+
+    process_batch receives the queued items in arrival order and must return one
+    result per item; a result that is an Exception is raised to that item's caller
+    only. A batch is flushed when the window closes or max_batch items are queued.
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[Any]], List[Any]],
+        executor: BlockingExecutor,
+        window_ms: float = DEFAULT_BATCH_WINDOW_MS,
+        max_batch: int = DEFAULT_MAX_BATCH
+    ):
+        self.process_batch = process_batch
+        self.executor = executor
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+
+        self._pending = []  # (item, future) in arrival order
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running = set()  # flush tasks, referenced until they finish
+
+        self.stats = {
+            "requests": 0,
+            "batches": 0,
+            "largest_batch": 0
+        }
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one item and wait for its share of the batch result"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        self.stats["requests"] += 1
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        """Hand everything queued so far to the executor as one batch"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        self.stats["batches"] += 1
+        self.stats["largest_batch"] = max(self.stats["largest_batch"], len(batch))
+        task = asyncio.ensure_future(self._run(batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List):
+        """Execute one batch and resolve each caller's future"""
+        try:
+            results = await self.executor.run(self.process_batch, [item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue  # caller went away
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def snapshot(self) -> Dict:
+        """Request and batch counts"""
+        return {
+            **self.stats,
+            "avg_batch": round(self.stats["requests"] / self.stats["batches"], 2) if self.stats["batches"] else 0,
+            "window_ms": self.window * 1000,
+            "max_batch": self.max_batch,
+            "pending": len(self._pending)
+        }
@@ -1,58 +1,218 @@
 #!/usr/bin/env python3
 """
 RAG MCP Server - Handles embeddings, vector search, and knowledge retrieval
+The embedding model and vector collections load on first use, so tool listing is immediate
 """
 
 import asyncio
 import json
 import os
+import sys
+import threading
 from datetime import datetime
 from typing import List, Dict, Any, Optional
-from mcp.server.models import InitializationOptions
+from mcp.server.lowlevel import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import Tool, TextContent
-import sqlite3
 import numpy as np
-from sentence_transformers import SentenceTransformer
-import chromadb
-from chromadb.config import Settings
-
-# Initialize ChromaDB
-CHROMA_PATH = "./chroma_db"
-chroma_client = chromadb.PersistentClient(
-    path=CHROMA_PATH,
-    settings=Settings(anonymized_telemetry=False)
-)
-
-# Initialize embedding model
-print("Loading embedding model...")
-embedder = SentenceTransformer('all-MiniLM-L6-v2')
-print("Model loaded successfully!")
-
-# Create collections
-try:
-    transcripts_collection = chroma_client.create_collection(
-        name="transcripts",
-        metadata={"description": "Sales call transcripts and extracted entities"}
-    )
-except:
-    transcripts_collection = chroma_client.get_collection("transcripts")
 
-try:
-    deals_collection = chroma_client.create_collection(
-        name="deals",
-        metadata={"description": "Historical deals and outcomes"}
-    )
-except:
-    deals_collection = chroma_client.get_collection("deals")
+from embedding_cache import EmbeddingCache
+from context_packing import DEFAULT_DEDUPE_THRESHOLD, pack_context
+from hybrid_search import LexicalIndex, reciprocal_rank_fusion, term_coverage
+from transcript_chunking import DEFAULT_CHUNK_OVERLAP, DEFAULT_CHUNK_TOKENS, chunk_transcript, collapse_to_transcripts
+from rag_executor import BlockingExecutor, MicroBatcher
+from vector_store import DEFAULT_BACKEND, VectorCollection, create_vector_store
+from entity_store import DEFAULT_ENTITY_DEDUPE_THRESHOLD, EntityStore, canonical_entity_id, entity_key
 
-try:
-    knowledge_collection = chroma_client.create_collection(
-        name="knowledge",
-        metadata={"description": "Sales knowledge and best practices"}
-    )
-except:
-    knowledge_collection = chroma_client.get_collection("knowledge")
+# Vector store: "chroma" (ChromaDB at CHROMA_PATH) or "mmap" (built-in memory-mapped store at VECTOR_STORE_PATH)
+VECTOR_BACKEND = DEFAULT_BACKEND
+CHROMA_PATH = os.environ.get("RAG_CHROMA_PATH", "./chroma_db")
+VECTOR_STORE_PATH = os.environ.get("RAG_VECTOR_PATH", "./vector_store")
+
+# Compact codes for the knowledge collection (one vector per extracted entity, so it grows fastest):
+# "none", "int8" (4x less scanned memory) or "pq" (product quantization); mmap backend only
+KNOWLEDGE_QUANTIZATION = os.environ.get("RAG_KNOWLEDGE_QUANTIZATION", "none")
+
+# Collections and their descriptions
+COLLECTIONS = {
+    "transcripts": "Sales call transcripts and extracted entities",
+    "deals": "Historical deals and outcomes",
+    "knowledge": "Sales knowledge and best practices",
+    "transcript_chunks": "Overlapping sentence windows of transcripts, for passage-level retrieval"
+}
+
+# Embedding model
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+# Optional cross-encoder for search_similar(rerank="cross-encoder")
+RERANK_MODEL = os.environ.get("RAG_RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+
+# Hybrid search: candidates pulled from each retriever, and how many of the fused list get reranked
+DEFAULT_CANDIDATES = int(os.environ.get("RAG_HYBRID_CANDIDATES", "50"))
+MAX_CANDIDATES = 200
+DEFAULT_RERANK_K = int(os.environ.get("RAG_RERANK_K", "20"))
+
+# Weight of exact query-term coverage against cosine similarity in the "lite" reranker
+LITE_RERANK_TERM_WEIGHT = 0.3
+
+# get_context_for_chat: token budget and nearest neighbours fetched per collection before packing
+DEFAULT_CONTEXT_TOKENS = int(os.environ.get("RAG_CONTEXT_TOKENS", "1500"))
+CONTEXT_CANDIDATES = int(os.environ.get("RAG_CONTEXT_CANDIDATES", "10"))
+
+# Item type reported by get_context_for_chat for each collection
+CONTEXT_ITEM_TYPES = {"transcripts": "transcript", "transcript_chunks": "transcript", "deals": "deal", "knowledge": "knowledge"}
+
+# Chunks embedded and written per flush while ingesting, which bounds peak memory on long calls
+CHUNK_FLUSH_SIZE = int(os.environ.get("RAG_CHUNK_FLUSH_SIZE", "256"))
+
+# Chunk matches fetched per requested transcript when collapsing chunk hits to transcripts
+COLLAPSE_OVERSAMPLE = 4
+
+# Knowledge entities: a new (type, value) whose name embedding is at least this cosine-similar to an
+# existing entity of the same type is recorded as an alias of it; ENTITY_CANDIDATES neighbours are checked
+ENTITY_DEDUPE_THRESHOLD = DEFAULT_ENTITY_DEDUPE_THRESHOLD
+ENTITY_CANDIDATES = 10
+
+# Model warm-up: "background" (after the handshake), "eager" (before serving) or "off" (first use)
+WARMUP_MODE = os.environ.get("RAG_WARMUP", "background")
+
+# Heavy dependencies, created on demand
+_embedder = None
+_embedding_cache = None
+_reranker = None
+_vector_store = None
+_collections = {}
+_lexical_index = None
+_lexical_synced = set()
+_entity_store = None
+_model_lock = threading.Lock()
+_store_lock = threading.Lock()
+_entity_lock = threading.Lock()
+model_ready = threading.Event()
+
+def get_embedder():
+    """The SentenceTransformer, loaded on first call (thread-safe)"""
+    global _embedder
+    if _embedder is None:
+        with _model_lock:
+            if _embedder is None:
+                # stdout carries the MCP protocol; log to stderr
+                print("Loading embedding model...", file=sys.stderr)
+                from sentence_transformers import SentenceTransformer
+                _embedder = SentenceTransformer(EMBEDDING_MODEL)
+                model_ready.set()
+                print("Model loaded successfully!", file=sys.stderr)
+    return _embedder
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Embeddings already computed (memory LRU + ./embedding_cache.db), opened on first use"""
+    global _embedding_cache
+    if _embedding_cache is None:
+        with _store_lock:
+            if _embedding_cache is None:
+                _embedding_cache = EmbeddingCache(EMBEDDING_MODEL)
+    return _embedding_cache
+
+def get_reranker():
+    """The cross-encoder, loaded on first rerank="cross-encoder" search"""
+    global _reranker
+    if _reranker is None:
+        with _model_lock:
+            if _reranker is None:
+                print("Loading rerank model...", file=sys.stderr)
+                from sentence_transformers import CrossEncoder
+                _reranker = CrossEncoder(RERANK_MODEL)
+    return _reranker
+
+def get_collection(name: str) -> VectorCollection:
+    """A collection by name, opening the vector store and collection on first use"""
+    if name not in _collections:
+        if name not in COLLECTIONS:
+            raise KeyError(f"Unknown collection: {name}")
+        with _store_lock:
+            if name not in _collections:
+                global _vector_store
+                if _vector_store is None:
+                    _vector_store = create_vector_store(
+                        VECTOR_BACKEND,
+                        CHROMA_PATH if VECTOR_BACKEND == "chroma" else VECTOR_STORE_PATH
+                    )
+                metadata = {"description": COLLECTIONS[name]}
+                if name == "knowledge" and VECTOR_BACKEND == "mmap":
+                    metadata["quantization"] = KNOWLEDGE_QUANTIZATION
+                _collections[name] = _vector_store.get_or_create_collection(name=name, metadata=metadata)
+    return _collections[name]
+
+def get_lexical_index() -> LexicalIndex:
+    """The BM25 keyword index mirroring the collections (./rag_lexical.db)"""
+    global _lexical_index
+    if _lexical_index is None:
+        with _store_lock:
+            if _lexical_index is None:
+                _lexical_index = LexicalIndex()
+    return _lexical_index
+
+def get_entity_store() -> EntityStore:
+    """The canonical entity registry behind the knowledge collection (./rag_entities.db)"""
+    global _entity_store
+    if _entity_store is None:
+        with _store_lock:
+            if _entity_store is None:
+                _entity_store = EntityStore()
+    return _entity_store
+
+def sync_lexical_index(name: str):
+    """Backfill the keyword index from the vector store once per process, e.g. for documents stored before it existed"""
+    if name in _lexical_synced:
+        return
+    collection = get_collection(name)
+    index = get_lexical_index()
+    if index.count(name) < collection.count():
+        existing = collection.get(include=["documents", "metadatas"])
+        index.add(name, existing["ids"], existing["documents"], existing["metadatas"])
+    _lexical_synced.add(name)
+
+def delete_documents(name: str, ids: List[str]) -> int:
+    """Remove documents from a collection and the keyword index; returns how many existed"""
+    collection = get_collection(name)
+    existing = len(collection.get(ids=ids, include=[])["ids"])
+    collection.delete(ids=ids)
+    get_lexical_index().delete(name, ids)
+    return existing
+
+def compact_collections() -> Dict:
+    """Reclaim tombstoned rows in every collection whose backend supports it"""
+    results = {}
+    for name in COLLECTIONS:
+        collection = get_collection(name)
+        if hasattr(collection, "compact"):
+            results[name] = collection.compact()
+        else:
+            results[name] = {"status": f"not supported by the {VECTOR_BACKEND} backend"}
+    return results
+
+def add_documents(name: str, ids: List[str], embeddings: List[List[float]], documents: List[str], metadatas: List[Dict]):
+    """Write documents to a vector collection and the keyword index"""
+    get_collection(name).add(embeddings=embeddings, documents=documents, metadatas=metadatas, ids=ids)
+    get_lexical_index().add(name, ids, documents, metadatas)
+
+def update_metadata(name: str, ids: List[str], metadatas: List[Dict]):
+    """Replace the metadata of stored documents in a vector collection and the keyword index"""
+    get_collection(name).update(ids=ids, metadatas=metadatas)
+    get_lexical_index().update_metadata(name, ids, metadatas)
+
+def warm_up():
+    """Load the model and open the embedding cache and every collection"""
+    get_embedder()
+    get_embedding_cache()
+    for name in COLLECTIONS:
+        get_collection(name)
+
+def start_warmup() -> threading.Thread:
+    """Warm up on a daemon thread; model_ready is set once the model is loaded"""
+    thread = threading.Thread(target=warm_up, name="rag-warmup", daemon=True)
+    thread.start()
+    return thread
 
 # Progressive autonomy configuration
 AUTONOMY_CONFIG = {
@@ -63,12 +223,444 @@ AUTONOMY_CONFIG = {
 }
 
 # MCP Server setup
-server = stdio_server()
+server = Server("rag-server")
+
+# Texts per forward pass when embedding many at once
+EMBEDDING_BATCH_SIZE = int(os.environ.get("RAG_EMBEDDING_BATCH_SIZE", "64"))
+
+def generate_embeddings(texts: List[str], batch_size: int = EMBEDDING_BATCH_SIZE) -> List[List[float]]:
+    """Generate embeddings for many texts; only uncached texts reach the model, in one batch"""
+    if not texts:
+        return []
+    embeddings = get_embedding_cache().embed(texts, lambda misses: get_embedder().encode(misses, batch_size=batch_size))
+    return embeddings.tolist()
 
 def generate_embedding(text: str) -> List[float]:
     """Generate embedding for text"""
-    embedding = embedder.encode(text)
-    return embedding.tolist()
+    return generate_embeddings([text])[0]
+
+def entity_document(entity: Dict) -> str:
+    """Text indexed for an extracted entity"""
+    return f"{entity['type']}: {entity['value']} (context: {entity.get('context', '')})"
+
+def entity_name(key: tuple) -> str:
+    """Text embedded to compare entity names when collapsing near-duplicates"""
+    return f"{key[0]}: {key[1]}"
+
+def find_near_duplicates(keys: List[tuple], created: List[tuple], search_collection: bool = True) -> Dict[tuple, str]:
+    """
+    Match new entity keys to existing entities of the same type by name-embedding similarity
+
+    Candidates are the nearest registered entities in the knowledge collection (when
+    search_collection) plus created, the (key, entity_id) pairs made earlier in this batch.
+
+    Returns:
+        key -> entity_id for keys at or above ENTITY_DEDUPE_THRESHOLD
+    """
+    vectors = np.asarray(generate_embeddings([entity_name(key) for key in keys]), dtype=np.float32)
+    neighbours = [[] for _ in keys]
+    if search_collection and get_collection("knowledge").count():
+        results = query_collection("knowledge", vectors.tolist(), ENTITY_CANDIDATES, include=["metadatas"])
+        registered = get_entity_store().known([doc_id for ids in results["ids"] for doc_id in ids])
+        for row, (ids, metadatas) in enumerate(zip(results["ids"], results["metadatas"])):
+            neighbours[row] = [
+                (doc_id, (meta["entity_type"], meta["entity_value"]))
+                for doc_id, meta in zip(ids, metadatas) if doc_id in registered
+            ]
+
+    matches = {}
+    for row, key in enumerate(keys):
+        candidates = [(entity_id, name) for entity_id, name in neighbours[row] + [(i, k) for k, i in created]
+                      if name[0] == key[0]]
+        if not candidates:
+            continue
+        names = np.asarray(generate_embeddings([entity_name(name) for _, name in candidates]), dtype=np.float32)
+        similarity = names @ vectors[row] / np.maximum(np.linalg.norm(names, axis=1) * np.linalg.norm(vectors[row]), 1e-12)
+        best = int(np.argmax(similarity))
+        if similarity[best] >= ENTITY_DEDUPE_THRESHOLD:
+            matches[key] = candidates[best][0]
+    return matches
+
+def upsert_entities(
+    mentions: List[tuple],
+    batch_size: int = EMBEDDING_BATCH_SIZE,
+    transcript_ids: Optional[List] = None
+) -> Dict[str, Dict]:
+    """
+    Record entity mentions against canonical knowledge entries, creating or updating them
+
+    Values are normalized into a (type, value) key. Known keys resolve through the
+    registry; a new key becomes an alias of a near-duplicate entity when one exists
+    (find_near_duplicates), otherwise a new canonical entry in the knowledge
+    collection. Entries that gain mentions get fresh mention counts and transcript
+    back-references in their metadata. Re-storing a transcript changes nothing.
+
+    Args:
+        mentions: (transcript_id, entity) pairs, entity with type, value and optional context/confidence
+        batch_size: Texts per forward pass
+        transcript_ids: Transcripts to report on even if they have no mentions
+
+    Returns:
+        Per transcript_id: entity_ids (distinct canonical entities mentioned) and new (entries created)
+    """
+    store = get_entity_store()
+    keyed = [(transcript_id, entity, entity_key(entity["type"], entity["value"])) for transcript_id, entity in mentions]
+    keyed = [(transcript_id, entity, key) for transcript_id, entity, key in keyed if key[1]]
+    report = {
+        transcript_id: {"entity_ids": [], "new": 0}
+        for transcript_id in list(transcript_ids or []) + [transcript_id for transcript_id, _ in mentions]
+    }
+
+    with _entity_lock, store.transaction():
+        # Registry writes commit only once the knowledge collection has the vectors they refer to
+        created = []
+        try:
+            resolved = store.resolve([key for _, _, key in keyed])
+            first_mention = {}
+            for transcript_id, entity, key in keyed:
+                if key not in resolved:
+                    first_mention.setdefault(key, (transcript_id, entity))
+
+            if first_mention:
+                matches = find_near_duplicates(list(first_mention), [])
+                for key, (transcript_id, entity) in first_mention.items():
+                    match = matches.get(key)
+                    if match is None and created:
+                        match = find_near_duplicates([key], created, search_collection=False).get(key)
+                    if match:
+                        store.add_alias(key, match, entity["value"])
+                        resolved[key] = match
+                    else:
+                        resolved[key] = canonical_entity_id(key)
+                        store.register(resolved[key], key, entity["value"])
+                        created.append((key, resolved[key]))
+                        report[transcript_id]["new"] += 1
+
+            changed = store.add_mentions([
+                (resolved[key], transcript_id, entity.get("confidence", 0.5)) for transcript_id, entity, key in keyed
+            ])
+            new_ids = {entity_id for _, entity_id in created}
+            summaries = store.summaries(sorted(changed | new_ids))
+
+            if created:
+                documents = [entity_document(first_mention[key][1]) for key, _ in created]
+                add_documents(
+                    "knowledge",
+                    ids=[entity_id for _, entity_id in created],
+                    embeddings=generate_embeddings(documents, batch_size=batch_size),
+                    documents=documents,
+                    metadatas=[summaries[entity_id] for _, entity_id in created]
+                )
+            updated = sorted(changed - new_ids)
+            if updated:
+                update_metadata("knowledge", updated, [summaries[entity_id] for entity_id in updated])
+        except Exception:
+            # Roll back (store.transaction) and drop vectors added before the failure
+            if created:
+                try:
+                    delete_documents("knowledge", [entity_id for _, entity_id in created])
+                except Exception as e:
+                    print(f"Could not remove entities after a failed upsert: {e}", file=sys.stderr)
+            raise
+
+    for transcript_id, _, key in keyed:
+        if resolved[key] not in report[transcript_id]["entity_ids"]:
+            report[transcript_id]["entity_ids"].append(resolved[key])
+    return report
+
+def store_transcript_chunks(
+    transcripts: List[Dict],
+    chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+    overlap_tokens: int = DEFAULT_CHUNK_OVERLAP,
+    batch_size: int = EMBEDDING_BATCH_SIZE
+) -> Dict:
+    """
+    Split transcripts into sentence windows and index them in transcript_chunks
+
+    Chunks are embedded and written CHUNK_FLUSH_SIZE at a time as the chunker
+    produces them, so memory stays flat however long the call was.
+
+    Args:
+        transcripts: Items with transcript_id, content and optional metadata
+        chunk_tokens: Window size (estimated tokens)
+        overlap_tokens: Tokens shared between neighbouring windows
+        batch_size: Texts per forward pass
+
+    Returns:
+        Chunk count per transcript_id
+    """
+    counts = {}
+    pending = []
+
+    def flush():
+        add_documents(
+            "transcript_chunks",
+            ids=[chunk_id for chunk_id, _, _ in pending],
+            embeddings=generate_embeddings([text for _, text, _ in pending], batch_size=batch_size),
+            documents=[text for _, text, _ in pending],
+            metadatas=[metadata for _, _, metadata in pending]
+        )
+        pending.clear()
+
+    for transcript in transcripts:
+        transcript_id = transcript["transcript_id"]
+        if transcript_id in counts:
+            continue  # chunk IDs must be unique within one add; the first copy wins
+        counts[transcript_id] = 0
+        for chunk in chunk_transcript(transcript["content"], chunk_tokens, overlap_tokens):
+            pending.append((f"transcript_{transcript_id}_chunk_{chunk['chunk_index']}", chunk["text"], {
+                **transcript.get("metadata", {}),
+                "transcript_id": transcript_id,
+                "parent_id": f"transcript_{transcript_id}",
+                "chunk_index": chunk["chunk_index"],
+                "start_char": chunk["start_char"],
+                "end_char": chunk["end_char"]
+            }))
+            counts[transcript_id] += 1
+            if len(pending) >= CHUNK_FLUSH_SIZE:
+                flush()
+
+    if pending:
+        flush()
+    return counts
+
+def store_transcripts(
+    transcripts: List[Dict],
+    batch_size: int = EMBEDDING_BATCH_SIZE,
+    chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+    overlap_tokens: int = DEFAULT_CHUNK_OVERLAP
+) -> List[Dict]:
+    """
+    Embed and store transcripts plus their entities and chunks
+
+    Whole transcripts go through one batched encode and a single add; entity
+    mentions are upserted into canonical knowledge entries by upsert_entities;
+    chunks are then streamed into transcript_chunks by store_transcript_chunks.
+
+    Args:
+        transcripts: Items with transcript_id, content and optional entities/metadata
+        batch_size: Texts per forward pass
+        chunk_tokens: Chunk window size (estimated tokens)
+        overlap_tokens: Tokens shared between neighbouring chunks
+
+    Returns:
+        Per-transcript status, in input order
+    """
+    transcript_records = {}
+    mentions = []
+
+    for transcript in transcripts:
+        transcript_id = transcript["transcript_id"]
+        entities = transcript.get("entities", [])
+        transcript_records[f"transcript_{transcript_id}"] = (transcript["content"], {
+            "transcript_id": transcript_id,
+            "entities": json.dumps(entities),
+            "timestamp": datetime.now().isoformat(),
+            **transcript.get("metadata", {})
+        })
+
+        mentions.extend((transcript_id, entity) for entity in entities)
+
+    if transcript_records:
+        add_documents(
+            "transcripts",
+            ids=list(transcript_records),
+            embeddings=generate_embeddings([doc for doc, _ in transcript_records.values()], batch_size=batch_size),
+            documents=[doc for doc, _ in transcript_records.values()],
+            metadatas=[metadata for _, metadata in transcript_records.values()]
+        )
+    entity_report = upsert_entities(mentions, batch_size, [transcript["transcript_id"] for transcript in transcripts])
+
+    chunks = store_transcript_chunks(transcripts, chunk_tokens, overlap_tokens, batch_size)
+
+    return [
+        {
+            "status": "stored",
+            "transcript_id": transcript["transcript_id"],
+            "entities_stored": len(entity_report[transcript["transcript_id"]]["entity_ids"]),
+            "entities_new": entity_report[transcript["transcript_id"]]["new"],
+            "chunks_stored": chunks[transcript["transcript_id"]]
+        }
+        for transcript in transcripts
+    ]
+
+def query_collection(name: str, query_embeddings: List[List[float]], n_results: int, include: Optional[List[str]] = None) -> Dict:
+    """Nearest neighbours for one or more query vectors in a collection"""
+    options = {"include": include} if include else {}
+    return get_collection(name).query(query_embeddings=query_embeddings, n_results=n_results, **options)
+
+def context_candidates(name: str, query_embedding: List[float], n_results: int) -> List[Dict]:
+    """
+    Nearest documents in one collection, with their vectors for near-duplicate checks
+
+    Returns:
+        Matches tagged with the context item type, each carrying its embedding
+    """
+    if name == "transcripts" and get_collection("transcript_chunks").count():
+        # Passages rather than whole calls once transcripts have been chunked
+        name = "transcript_chunks"
+
+    results = query_collection(
+        name, [query_embedding], n_results, include=["documents", "metadatas", "distances", "embeddings"]
+    )
+    matches = format_matches(results)
+    stored = results.get("embeddings")
+    if stored is not None and len(stored) and stored[0] is not None and len(stored[0]) == len(matches):
+        vectors = list(stored[0])
+    else:
+        # Stores that do not return vectors: re-derive them (embedding cache hits for ingested text)
+        vectors = generate_embeddings([match["content"] for match in matches])
+
+    return [
+        {**match, "type": CONTEXT_ITEM_TYPES[name], "embedding": vector}
+        for match, vector in zip(matches, vectors)
+    ]
+
+def format_matches(results: Dict, row: int = 0, limit: Optional[int] = None) -> List[Dict]:
+    """Documents, metadata and similarity for one query row of a (Chroma-shaped) query result"""
+    matches = []
+    if results["documents"] and results["documents"][row]:
+        for i, doc in enumerate(results["documents"][row][:limit]):
+            distance = results["distances"][row][i] if results["distances"] else 0
+            matches.append({
+                "id": results["ids"][row][i],
+                "content": doc,
+                "metadata": results["metadatas"][row][i] if results["metadatas"] else {},
+                "distance": distance,
+                "similarity": 1 - distance
+            })
+    return matches
+
+def rerank(query: str, query_embedding: Optional[List[float]], candidates: List[Dict], method: str) -> List[Dict]:
+    """
+    Reorder candidates by a finer relevance score
+
+    "lite" blends cosine similarity (document vectors come from the embedding
+    cache, so they are rarely recomputed) with exact query-term coverage;
+    "cross-encoder" scores each (query, document) pair with RERANK_MODEL.
+    """
+    if not candidates:
+        return candidates
+    documents = [candidate["content"] for candidate in candidates]
+
+    if method == "cross-encoder":
+        scores = get_reranker().predict([(query, doc) for doc in documents])
+    elif method == "lite":
+        vectors = np.asarray(generate_embeddings(documents), dtype=np.float32)
+        query_vector = np.asarray(query_embedding, dtype=np.float32)
+        cosine = vectors @ query_vector / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query_vector) + 1e-12)
+        scores = cosine + LITE_RERANK_TERM_WEIGHT * np.array([term_coverage(query, doc) for doc in documents])
+    else:
+        raise ValueError(f"Unknown rerank method: {method}")
+
+    for candidate, score in zip(candidates, scores):
+        candidate["rerank_score"] = round(float(score), 6)
+    return sorted(candidates, key=lambda candidate: candidate["rerank_score"], reverse=True)
+
+def hybrid_matches(request: Dict, vector_hits: List[Dict], query_embedding: Optional[List[float]]) -> List[Dict]:
+    """
+    Fuse keyword and vector candidates for one request, then optionally rerank
+
+    Args:
+        request: search_similar arguments (query, collection, mode, top_k, candidates, rerank, rerank_k)
+        vector_hits: Dense candidates, best first (empty in lexical mode)
+        query_embedding: Query vector, needed by the lite reranker
+
+    Returns:
+        Up to top_k matches with their fused score and per-retriever ranks
+    """
+    sync_lexical_index(request["collection"])
+    lexical_hits = get_lexical_index().search(request["collection"], request["query"], request["candidates"])
+
+    ranks = {"vector": {}, "lexical": {}}
+    hits = {}
+    for retriever, found in (("lexical", lexical_hits), ("vector", vector_hits)):
+        for rank, hit in enumerate(found, start=1):
+            ranks[retriever][hit["id"]] = rank
+            hits[hit["id"]] = {**hits.get(hit["id"], {}), **hit}
+
+    fused = reciprocal_rank_fusion([
+        [hit["id"] for hit in vector_hits],
+        [hit["id"] for hit in lexical_hits]
+    ])[:request["candidates"]]
+
+    matches = [
+        {
+            "id": doc_id,
+            "content": hits[doc_id]["content"],
+            "metadata": hits[doc_id]["metadata"],
+            "score": round(score, 6),
+            "vector_rank": ranks["vector"].get(doc_id),
+            "lexical_rank": ranks["lexical"].get(doc_id),
+            "similarity": hits[doc_id].get("similarity")
+        }
+        for doc_id, score in fused
+    ]
+
+    if request["rerank"] != "none":
+        head = min(request["rerank_k"], len(matches))
+        matches = rerank(request["query"], query_embedding, matches[:head], request["rerank"]) + matches[head:]
+
+    return matches[:request["top_k"]]
+
+def search_batch(requests: List[Dict]) -> List:
+    """
+    Answer several search_similar requests with one encode call
+
+    Requests against the same collection share a single multi-vector query,
+    sized for the largest candidate pool and trimmed per request afterwards.
+    Hybrid and lexical requests add a BM25 pass and rank fusion on top.
+
+    Args:
+        requests: Items with query, collection, mode, top_k, candidates, rerank and rerank_k
+
+    Returns:
+        Per-request matches in input order, or the exception that request raised
+    """
+    results = [None] * len(requests)
+    groups = {}
+    for i, request in enumerate(requests):
+        if request["collection"] in COLLECTIONS:
+            groups.setdefault(request["collection"], []).append(i)
+        else:
+            results[i] = KeyError(f"Unknown collection: {request['collection']}")
+
+    # Pure keyword searches only need the model when the lite reranker scores them
+    needs_vector = [
+        i for indices in groups.values() for i in indices
+        if requests[i]["mode"] != "lexical" or requests[i]["rerank"] == "lite"
+    ]
+    embeddings = dict(zip(needs_vector, generate_embeddings([requests[i]["query"] for i in needs_vector])))
+
+    for collection, indices in groups.items():
+        dense = [i for i in indices if requests[i]["mode"] != "lexical"]
+        try:
+            found = query_collection(
+                collection,
+                [embeddings[i] for i in dense],
+                max(requests[i]["top_k"] if requests[i]["mode"] == "vector" else requests[i]["candidates"] for i in dense)
+            ) if dense else None
+        except Exception as e:
+            for i in indices:
+                results[i] = e
+            continue
+
+        for i in indices:
+            request = requests[i]
+            limit = request["top_k"] if request["mode"] == "vector" else request["candidates"]
+            vector_hits = format_matches(found, dense.index(i), limit) if i in dense else []
+            try:
+                results[i] = vector_hits if request["mode"] == "vector" else hybrid_matches(request, vector_hits, embeddings.get(i))
+            except Exception as e:
+                results[i] = e
+
+    return results
+
+# Model inference and vector-store I/O run here, never on the event loop
+executor = BlockingExecutor()
+
+# Concurrent search_similar calls arriving within a few ms share one encode
+search_batcher = MicroBatcher(search_batch, executor)
 
 def calculate_confidence_with_context(base_confidence: float, similar_cases: List[Dict]) -> float:
     """Adjust confidence based on similar historical cases"""
@@ -94,11 +686,47 @@ async def handle_list_tools() -> List[Tool]:
                     "transcript_id": {"type": "integer"},
                     "content": {"type": "string"},
                     "entities": {"type": "array"},
-                    "metadata": {"type": "object"}
+                    "metadata": {"type": "object"},
+                    "chunk_tokens": {
+                        "type": "integer",
+                        "default": DEFAULT_CHUNK_TOKENS,
+                        "description": "Passage window size for transcript_chunks (estimated tokens)"
+                    },
+                    "chunk_overlap": {"type": "integer", "default": DEFAULT_CHUNK_OVERLAP}
                 },
                 "required": ["transcript_id", "content"]
             }
         ),
+        Tool(
+            name="store_transcripts_batch",
+            description="Store many transcripts at once with a single batched embedding pass",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "transcripts": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "transcript_id": {"type": "integer"},
+                                "content": {"type": "string"},
+                                "entities": {"type": "array"},
+                                "metadata": {"type": "object"}
+                            },
+                            "required": ["transcript_id", "content"]
+                        }
+                    },
+                    "batch_size": {"type": "integer", "default": 64},
+                    "chunk_tokens": {
+                        "type": "integer",
+                        "default": DEFAULT_CHUNK_TOKENS,
+                        "description": "Passage window size for transcript_chunks (estimated tokens)"
+                    },
+                    "chunk_overlap": {"type": "integer", "default": DEFAULT_CHUNK_OVERLAP}
+                },
+                "required": ["transcripts"]
+            }
+        ),
         Tool(
             name="search_similar",
             description="Search for similar transcripts or deals",
@@ -106,8 +734,32 @@ async def handle_list_tools() -> List[Tool]:
                 "type": "object",
                 "properties": {
                     "query": {"type": "string"},
-                    "collection": {"type": "string", "enum": ["transcripts", "deals", "knowledge"]},
-                    "top_k": {"type": "integer", "default": 5}
+                    "collection": {"type": "string", "enum": ["transcripts", "deals", "knowledge", "transcript_chunks"]},
+                    "top_k": {"type": "integer", "default": 5},
+                    "granularity": {
+                        "type": "string",
+                        "enum": ["document", "chunk", "transcript"],
+                        "default": "document",
+                        "description": "For transcripts: whole-transcript vectors, best matching chunks, or transcripts collapsed to their best chunk"
+                    },
+                    "mode": {
+                        "type": "string",
+                        "enum": ["vector", "hybrid", "lexical"],
+                        "default": "vector",
+                        "description": "hybrid fuses BM25 keyword and vector results with reciprocal rank fusion"
+                    },
+                    "candidates": {
+                        "type": "integer",
+                        "default": DEFAULT_CANDIDATES,
+                        "description": f"Candidates per retriever for hybrid/lexical mode (max {MAX_CANDIDATES})"
+                    },
+                    "rerank": {
+                        "type": "string",
+                        "enum": ["none", "lite", "cross-encoder"],
+                        "default": "none",
+                        "description": "Rerank the top rerank_k fused candidates (hybrid/lexical mode)"
+                    },
+                    "rerank_k": {"type": "integer", "default": DEFAULT_RERANK_K}
                 },
                 "required": ["query"]
             }
@@ -140,6 +792,42 @@ async def handle_list_tools() -> List[Tool]:
                 "required": ["action_id", "outcome"]
             }
         ),
+        Tool(
+            name="get_embedding_cache_stats",
+            description="Get embedding cache hit rates and occupancy",
+            inputSchema={
+                "type": "object",
+                "properties": {}
+            }
+        ),
+        Tool(
+            name="get_executor_stats",
+            description="Get worker pool queue depth, in-flight calls and search batching statistics",
+            inputSchema={
+                "type": "object",
+                "properties": {}
+            }
+        ),
+        Tool(
+            name="delete_documents",
+            description="Delete documents by ID from a collection and its keyword index",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "collection": {"type": "string", "enum": list(COLLECTIONS)},
+                    "ids": {"type": "array", "items": {"type": "string"}}
+                },
+                "required": ["collection", "ids"]
+            }
+        ),
+        Tool(
+            name="compact_vector_store",
+            description="Reclaim space left by deleted documents (built-in mmap backend)",
+            inputSchema={
+                "type": "object",
+                "properties": {}
+            }
+        ),
         Tool(
             name="get_context_for_chat",
             description="Get relevant context for AI chat responses",
@@ -148,7 +836,18 @@ async def handle_list_tools() -> List[Tool]:
                 "properties": {
                     "query": {"type": "string"},
                     "include_transcripts": {"type": "boolean", "default": True},
-                    "include_deals": {"type": "boolean", "default": True}
+                    "include_deals": {"type": "boolean", "default": True},
+                    "include_knowledge": {"type": "boolean", "default": False},
+                    "max_tokens": {
+                        "type": "integer",
+                        "default": DEFAULT_CONTEXT_TOKENS,
+                        "description": "Token budget for all returned context (approximate, ~4 characters per token)"
+                    },
+                    "dedupe_threshold": {
+                        "type": "number",
+                        "default": DEFAULT_DEDUPE_THRESHOLD,
+                        "description": "Cosine similarity at which two chunks count as duplicates"
+                    }
                 },
                 "required": ["query"]
             }
@@ -161,82 +860,81 @@ async def handle_call_tool(name: str, arguments: dict) -> List[TextContent]:
 
     try:
         if name == "store_transcript":
-            # Generate embedding for transcript
-            embedding = generate_embedding(arguments["content"])
+            # Transcript and entity embeddings in one batch, then its chunks
+            result = (await executor.run(
+                store_transcripts,
+                [arguments],
+                chunk_tokens=arguments.get("chunk_tokens", DEFAULT_CHUNK_TOKENS),
+                overlap_tokens=arguments.get("chunk_overlap", DEFAULT_CHUNK_OVERLAP)
+            ))[0]
 
-            # Store in ChromaDB
-            transcripts_collection.add(
-                embeddings=[embedding],
-                documents=[arguments["content"]],
-                metadatas=[{
-                    "transcript_id": arguments["transcript_id"],
-                    "entities": json.dumps(arguments.get("entities", [])),
-                    "timestamp": datetime.now().isoformat(),
-                    **arguments.get("metadata", {})
-                }],
-                ids=[f"transcript_{arguments['transcript_id']}"]
-            )
+            return [TextContent(
+                type="text",
+                text=json.dumps(result)
+            )]
 
-            # Extract and store individual entities
-            for entity in arguments.get("entities", []):
-                entity_text = f"{entity['type']}: {entity['value']} (context: {entity.get('context', '')})"
-                entity_embedding = generate_embedding(entity_text)
-
-                knowledge_collection.add(
-                    embeddings=[entity_embedding],
-                    documents=[entity_text],
-                    metadatas=[{
-                        "transcript_id": arguments["transcript_id"],
-                        "entity_type": entity["type"],
-                        "entity_value": entity["value"],
-                        "confidence": entity.get("confidence", 0.5)
-                    }],
-                    ids=[f"entity_{arguments['transcript_id']}_{entity['type']}_{entity['value']}"]
-                )
+        elif name == "store_transcripts_batch":
+            # A queue of transcripts, all texts embedded together
+            results = await executor.run(
+                store_transcripts,
+                arguments["transcripts"],
+                batch_size=arguments.get("batch_size", EMBEDDING_BATCH_SIZE),
+                chunk_tokens=arguments.get("chunk_tokens", DEFAULT_CHUNK_TOKENS),
+                overlap_tokens=arguments.get("chunk_overlap", DEFAULT_CHUNK_OVERLAP)
+            )
 
             return [TextContent(
                 type="text",
                 text=json.dumps({
                     "status": "stored",
-                    "transcript_id": arguments["transcript_id"],
-                    "entities_stored": len(arguments.get("entities", []))
+                    "transcripts_stored": len(results),
+                    "entities_stored": sum(r["entities_stored"] for r in results),
+                    "entities_new": sum(r["entities_new"] for r in results),
+                    "chunks_stored": sum(r["chunks_stored"] for r in results),
+                    "results": results
                 })
             )]
 
         elif name == "search_similar":
-            # Generate embedding for query
-            query_embedding = generate_embedding(arguments["query"])
-
-            # Search in specified collection
+            # Encoded together with any other searches queued in the same window
             collection_name = arguments.get("collection", "transcripts")
-            collection = {
-                "transcripts": transcripts_collection,
-                "deals": deals_collection,
-                "knowledge": knowledge_collection
-            }[collection_name]
-
-            # Perform similarity search
-            results = collection.query(
-                query_embeddings=[query_embedding],
-                n_results=arguments.get("top_k", 5)
-            )
+            top_k = arguments.get("top_k", 5)
+            mode = arguments.get("mode", "vector")
+            if mode not in ("vector", "hybrid", "lexical"):
+                raise ValueError(f"Unknown search mode: {mode}")
+            if arguments.get("rerank", "none") not in ("none", "lite", "cross-encoder"):
+                raise ValueError(f"Unknown rerank method: {arguments['rerank']}")
 
-            # Format results
-            similar_items = []
-            if results["documents"] and results["documents"][0]:
-                for i, doc in enumerate(results["documents"][0]):
-                    similar_items.append({
-                        "content": doc,
-                        "metadata": results["metadatas"][0][i] if results["metadatas"] else {},
-                        "distance": results["distances"][0][i] if results["distances"] else 0,
-                        "similarity": 1 - (results["distances"][0][i] if results["distances"] else 0)
-                    })
+            # Passage-level search over transcripts goes to their chunks
+            granularity = arguments.get("granularity", "document")
+            search_collection = collection_name
+            if granularity in ("chunk", "transcript"):
+                if collection_name != "transcripts":
+                    raise ValueError("granularity 'chunk'/'transcript' applies to the transcripts collection")
+                search_collection = "transcript_chunks"
+            elif granularity != "document":
+                raise ValueError(f"Unknown granularity: {granularity}")
+            fetch_k = top_k * COLLAPSE_OVERSAMPLE if granularity == "transcript" else top_k
+
+            similar_items = await search_batcher.submit({
+                "query": arguments["query"],
+                "collection": search_collection,
+                "top_k": fetch_k,
+                "mode": mode,
+                "candidates": max(fetch_k, min(arguments.get("candidates", DEFAULT_CANDIDATES), MAX_CANDIDATES)),
+                "rerank": arguments.get("rerank", "none"),
+                "rerank_k": arguments.get("rerank_k", DEFAULT_RERANK_K)
+            })
+            if granularity == "transcript":
+                similar_items = collapse_to_transcripts(similar_items, top_k)
 
             return [TextContent(
                 type="text",
                 text=json.dumps({
                     "query": arguments["query"],
                     "collection": collection_name,
+                    "mode": mode,
+                    "granularity": granularity,
                     "results": similar_items,
                     "count": len(similar_items)
                 })
@@ -284,9 +982,12 @@ async def handle_call_tool(name: str, arguments: dict) -> List[TextContent]:
         elif name == "store_outcome":
             # Store outcome for future learning
             outcome_text = f"Action: {arguments.get('action_type', 'unknown')} - Outcome: {arguments['outcome']}"
-            outcome_embedding = generate_embedding(outcome_text)
+            outcome_embedding = (await executor.run(generate_embeddings, [outcome_text]))[0]
 
-            knowledge_collection.add(
+            await executor.run(
+                add_documents,
+                "knowledge",
+                ids=[f"outcome_{arguments['action_id']}"],
                 embeddings=[outcome_embedding],
                 documents=[outcome_text],
                 metadatas=[{
@@ -295,8 +996,7 @@ async def handle_call_tool(name: str, arguments: dict) -> List[TextContent]:
                     "outcome": arguments["outcome"],
                     "feedback": arguments.get("feedback", ""),
                     "timestamp": datetime.now().isoformat()
-                }],
-                ids=[f"outcome_{arguments['action_id']}"]
+                }]
             )
 
             return [TextContent(
@@ -307,48 +1007,85 @@ async def handle_call_tool(name: str, arguments: dict) -> List[TextContent]:
                 })
             )]
 
-        elif name == "get_context_for_chat":
-            # Get relevant context for AI chat
-            query_embedding = generate_embedding(arguments["query"])
+        elif name == "get_embedding_cache_stats":
+            return [TextContent(
+                type="text",
+                text=json.dumps({**get_embedding_cache().snapshot(), "model_ready": model_ready.is_set()})
+            )]
+
+        elif name == "get_executor_stats":
+            return [TextContent(
+                type="text",
+                text=json.dumps({
+                    "executor": executor.snapshot(),
+                    "search_batching": search_batcher.snapshot()
+                })
+            )]
 
-            context_items = []
+        elif name == "delete_documents":
+            deleted = await executor.run(delete_documents, arguments["collection"], arguments["ids"])
 
-            # Search transcripts
-            if arguments.get("include_transcripts", True):
-                transcript_results = transcripts_collection.query(
-                    query_embeddings=[query_embedding],
-                    n_results=3
-                )
+            return [TextContent(
+                type="text",
+                text=json.dumps({
+                    "status": "deleted",
+                    "collection": arguments["collection"],
+                    "deleted": deleted
+                })
+            )]
 
-                if transcript_results["documents"] and transcript_results["documents"][0]:
-                    for i, doc in enumerate(transcript_results["documents"][0]):
-                        context_items.append({
-                            "type": "transcript",
-                            "content": doc[:500] + "..." if len(doc) > 500 else doc,
-                            "metadata": transcript_results["metadatas"][0][i] if transcript_results["metadatas"] else {}
-                        })
-
-            # Search deals
-            if arguments.get("include_deals", True):
-                deal_results = deals_collection.query(
-                    query_embeddings=[query_embedding],
-                    n_results=2
+        elif name == "compact_vector_store":
+            return [TextContent(
+                type="text",
+                text=json.dumps({
+                    "backend": VECTOR_BACKEND,
+                    "collections": await executor.run(compact_collections)
+                })
+            )]
+
+        elif name == "get_context_for_chat":
+            # One query embedding, then every requested collection searched concurrently
+            query_embedding = (await executor.run(generate_embeddings, [arguments["query"]]))[0]
+
+            names = [
+                name for name, flag, default in (
+                    ("transcripts", "include_transcripts", True),
+                    ("deals", "include_deals", True),
+                    ("knowledge", "include_knowledge", False)
                 )
+                if arguments.get(flag, default)
+            ]
+            found = await asyncio.gather(*(
+                executor.run(context_candidates, name, query_embedding, CONTEXT_CANDIDATES) for name in names
+            ))
+            candidates = [match for matches in found for match in matches]
+
+            # Most similar first, near-duplicates dropped, packed into the token budget
+            max_tokens = arguments.get("max_tokens", DEFAULT_CONTEXT_TOKENS)
+            packed = pack_context(candidates, max_tokens, arguments.get("dedupe_threshold", DEFAULT_DEDUPE_THRESHOLD))
 
-                if deal_results["documents"] and deal_results["documents"][0]:
-                    for i, doc in enumerate(deal_results["documents"][0]):
-                        context_items.append({
-                            "type": "deal",
-                            "content": doc,
-                            "metadata": deal_results["metadatas"][0][i] if deal_results["metadatas"] else {}
-                        })
+            context_items = [
+                {
+                    "type": item["type"],
+                    "content": item["content"],
+                    "metadata": item["metadata"],
+                    "similarity": item["similarity"],
+                    "tokens": item["tokens"],
+                    "truncated": item["truncated"]
+                }
+                for item in packed["items"]
+            ]
 
             return [TextContent(
                 type="text",
                 text=json.dumps({
                     "query": arguments["query"],
                     "context_items": context_items,
-                    "total_items": len(context_items)
+                    "total_items": len(context_items),
+                    "tokens_used": packed["tokens_used"],
+                    "max_tokens": max_tokens,
+                    "candidates_considered": len(candidates),
+                    "duplicates_skipped": packed["duplicates_skipped"]
                 })
             )]
 
@@ -363,12 +1100,13 @@ async def handle_call_tool(name: str, arguments: dict) -> List[TextContent]:
 
 async def main():
     """Run the RAG server"""
-    async with server:
-        init_options = InitializationOptions(
-            server_name="rag-server",
-            server_version="0.1.0"
-        )
-        await server.run(init_options)
+    if WARMUP_MODE == "eager":
+        warm_up()
+
+    async with stdio_server() as (read_stream, write_stream):
+        if WARMUP_MODE == "background":
+            start_warmup()
+        await server.run(read_stream, write_stream, server.create_initialization_options())
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,160 @@
+"""
+Analytics Result Cache - TTL + LRU cache for read-only analytics tools
+Entries are invalidated by a data version counter the CRM write tools bump
+"""
+
+import functools
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+# Cache defaults (overridable per process through the environment)
+DEFAULT_TTL = float(os.environ.get("ANALYTICS_CACHE_TTL", "60"))
+DEFAULT_MAX_ENTRIES = int(os.environ.get("ANALYTICS_CACHE_MAX_ENTRIES", "256"))
+DEFAULT_MAX_BYTES = int(os.environ.get("ANALYTICS_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+
+
+def get_data_version(conn: sqlite3.Connection) -> int:
+    """Current CRM data version (see crm_migrations v7)"""
+    return conn.execute("SELECT version FROM data_version WHERE id = 1").fetchone()[0]
+
+
+def bump_data_version(conn) -> None:
+    """Mark CRM data as changed; call inside the write's transaction"""
+    conn.execute("UPDATE data_version SET version = version + 1 WHERE id = 1")
+
+
+class ResultCache:
+    """
+    Bounded cache of JSON-serialized tool results
+
+    Results are stored as JSON text, which bounds memory by actual payload size
+    and hands every caller its own copy.
+    """
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_TTL,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._entries = OrderedDict()  # key -> (expires_at, payload), oldest first
+        self._bytes = 0
+        self._version = None
+        self._lock = threading.Lock()
+
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "evictions": 0,
+            "invalidations": 0
+        }
+
+    def get(self, key: str, version: int) -> Optional[str]:
+        """Return the cached payload for key, or None on a miss"""
+        with self._lock:
+            if version != self._version:
+                # Data changed since these entries were computed
+                if self._entries:
+                    self.stats["invalidations"] += len(self._entries)
+                self._entries.clear()
+                self._bytes = 0
+                self._version = version
+
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                self._remove(key)
+                self.stats["expired"] += 1
+                entry = None
+
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[1]
+
+    def put(self, key: str, version: int, payload: str):
+        """Store a payload computed at the given data version"""
+        size = len(payload)
+        with self._lock:
+            if version != self._version or size > self.max_bytes:
+                return
+
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, payload)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+
+    def _remove(self, key: str):
+        _, payload = self._entries.pop(key)
+        self._bytes -= len(payload)
+
+    def clear(self):
+        """Drop every entry (statistics are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def snapshot(self) -> Dict:
+        """Hit/miss statistics and current occupancy"""
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_rate": round(self.stats["hits"] / lookups * 100, 1) if lookups else 0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "data_version": self._version
+            }
+
+
+def cached(cache: ResultCache, get_db: Callable, bypass: Optional[Callable[[Dict], bool]] = None) -> Callable:
+    """
+    Decorate a read-only tool so identical calls are served from cache
+
+    The key is the tool name plus its arguments with defaults applied, so
+    f() and f(period="next_quarter") share an entry. Calls for which
+    bypass(arguments) is true (e.g. unseeded simulations) always run.
+    """
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            if bypass is not None and bypass(bound.arguments):
+                return func(*args, **kwargs)
+            key = json.dumps([func.__name__, bound.arguments], sort_keys=True, default=str)
+
+            with get_db() as conn:
+                version = get_data_version(conn)
+
+            payload = cache.get(key, version)
+            if payload is None:
+                payload = json.dumps(func(*args, **kwargs))
+                cache.put(key, version, payload)
+            return json.loads(payload)
+
+        return wrapper
+
+    return decorator
@@ -6,9 +6,22 @@ Provides account management, deal tracking, and pipeline analytics
 from mcp.server.fastmcp import FastMCP
 import sqlite3
 import json
+import re
+import base64
+import hashlib
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 import os
+import sys
+from pathlib import Path
+
+# Add project root to path so the shared modules import from any working directory
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from crm_migrations import apply_migrations
+from db_pool import ConnectionPool
+from pipeline_rollup import check_pipeline_rollup, open_stages, stage_totals
+from result_cache import bump_data_version
 
 # Initialize MCP server
 mcp = FastMCP("AI Sales CRM Server")
@@ -16,58 +29,274 @@ mcp = FastMCP("AI Sales CRM Server")
 # Database path
 DB_PATH = os.path.join("data", "sales_crm.db")
 
+# Persistent connections owned by this server process (schema migrated on first use)
+pool = ConnectionPool(DB_PATH, initializer=apply_migrations)
+
 def get_db():
-    """Get database connection"""
-    return sqlite3.connect(DB_PATH)
+    """Check out a pooled database connection (use as a context manager)"""
+    return pool.connection()
+
+# BM25 column weights for accounts_fts (name, industry, website, contact_names, contact_emails)
+SEARCH_WEIGHTS = (10.0, 2.0, 5.0, 3.0, 3.0)
+
+def build_fts_query(query: str) -> Optional[str]:
+    """Turn free text into an FTS5 MATCH expression (every token, prefix-matched)"""
+    tokens = re.findall(r"\w+", query.lower())
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+# Keyset ordering for account pages (backed by idx_accounts_keyset)
+ACCOUNT_SORT_KEY = "IFNULL(a.annual_revenue, 0)"
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+def _cursor_scope(*filters) -> str:
+    """Short fingerprint of the filters a cursor was issued for"""
+    return hashlib.sha1(json.dumps(filters).encode()).hexdigest()[:12]
+
+def encode_cursor(sort_value: float, account_id: int, scope: str) -> str:
+    """Encode the last row of a page as an opaque cursor token"""
+    payload = json.dumps([sort_value, account_id, scope]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_cursor(token: str, scope: str) -> Tuple[float, int]:
+    """Decode a cursor token, rejecting tokens issued for different filters"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        sort_value, account_id, token_scope = json.loads(base64.urlsafe_b64decode(padded))
+        sort_value, account_id = float(sort_value), int(account_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if token_scope != scope:
+        raise ValueError("Cursor does not match the current filters")
+    return sort_value, account_id
+
+def _account_filters(
+    query: Optional[str],
+    industry: Optional[str],
+    min_revenue: Optional[float]
+) -> Tuple[str, List, Optional[str]]:
+    """Build the FROM/WHERE clause for account searches"""
+    match = build_fts_query(query) if query else None
+    params = []
+
+    if match:
+        sql = """
+            FROM accounts_fts
+            JOIN accounts a ON a.id = accounts_fts.rowid
+            WHERE accounts_fts MATCH ?
+        """
+        params.append(match)
+    else:
+        sql = "FROM accounts a WHERE 1=1"
+        if query:
+            # No searchable tokens (e.g. punctuation only) - plain substring match
+            sql += " AND a.name LIKE ?"
+            params.append(f"%{query}%")
+
+    if industry:
+        sql += " AND a.industry = ?"
+        params.append(industry)
+
+    if min_revenue:
+        sql += " AND a.annual_revenue >= ?"
+        params.append(min_revenue)
+
+    return sql, params, match
+
+def _fetch_account_page(
+    conn: sqlite3.Connection,
+    from_sql: str,
+    params: List,
+    page_size: int,
+    after: Optional[Tuple[float, int]] = None,
+    with_deal_totals: bool = False
+) -> Tuple[List[Dict], bool]:
+    """Fetch one keyset page ordered by (annual_revenue, id) descending"""
+    sql = f"SELECT a.* {from_sql}"
+    params = list(params)
+
+    if after:
+        sql += f" AND {ACCOUNT_SORT_KEY} <= ? AND ({ACCOUNT_SORT_KEY} < ? OR a.id < ?)"
+        params.extend([after[0], after[0], after[1]])
+
+    # One extra row tells us whether another page exists
+    sql += f" ORDER BY {ACCOUNT_SORT_KEY} DESC, a.id DESC LIMIT ?"
+    params.append(page_size + 1)
+
+    if with_deal_totals:
+        sql = f"""
+            SELECT a.*, COUNT(d.id) as deal_count, SUM(d.amount) as total_deal_value
+            FROM ({sql}) a
+            LEFT JOIN deals d ON a.id = d.account_id
+            GROUP BY a.id
+            ORDER BY {ACCOUNT_SORT_KEY} DESC, a.id DESC
+        """
+
+    cursor = conn.execute(sql, params)
+    columns = [desc[0] for desc in cursor.description]
+    rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    return rows[:page_size], len(rows) > page_size
+
+def _account_page_response(
+    from_sql: str,
+    params: List,
+    scope: str,
+    page_size: Optional[int],
+    cursor: Optional[str],
+    with_deal_totals: bool = False
+) -> Dict:
+    """Serve one page of accounts with an opaque cursor for the next"""
+    page_size = max(1, min(page_size or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+    try:
+        after = decode_cursor(cursor, scope) if cursor else None
+    except ValueError as e:
+        return {"error": str(e)}
+
+    with get_db() as conn:
+        accounts, has_more = _fetch_account_page(conn, from_sql, params, page_size, after, with_deal_totals)
+
+    next_cursor = None
+    if has_more:
+        last = accounts[-1]
+        next_cursor = encode_cursor(last["annual_revenue"] or 0, last["id"], scope)
+
+    return {
+        "accounts": accounts,
+        "count": len(accounts),
+        "has_more": has_more,
+        "next_cursor": next_cursor
+    }
+
+def stream_accounts(
+    query: Optional[str] = None,
+    industry: Optional[str] = None,
+    min_revenue: Optional[float] = None,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    with_deal_totals: bool = False
+) -> Iterator[List[Dict]]:
+    """
+    Yield account pages in (annual_revenue, id) descending order
+
+    Only one page is held in memory at a time, and a pooled connection is
+    checked out per page rather than for the life of the generator.
+    """
+    from_sql, params, _ = _account_filters(query, industry, min_revenue)
+    after = None
+
+    while True:
+        with get_db() as conn:
+            accounts, has_more = _fetch_account_page(conn, from_sql, params, page_size, after, with_deal_totals)
+
+        if accounts:
+            yield accounts
+        if not has_more:
+            return
+
+        last = accounts[-1]
+        after = (last["annual_revenue"] or 0, last["id"])
 
 @mcp.tool()
 def search_accounts(
     query: Optional[str] = None,
     industry: Optional[str] = None,
     min_revenue: Optional[float] = None,
-    limit: int = 10
+    limit: int = 10,
+    page_size: Optional[int] = None,
+    cursor: Optional[str] = None
 ) -> List[Dict]:
     """
     Search for customer accounts with filters
 
     Args:
-        query: Search term for account name
+        query: Search terms matched (by token and prefix) against account name,
+            industry, website and contact names/emails; results ranked by relevance
         industry: Filter by industry
         min_revenue: Minimum annual revenue
         limit: Maximum results to return
+        page_size: Return a page of results ordered by annual revenue instead,
+            as {"accounts", "has_more", "next_cursor"}
+        cursor: next_cursor from the previous page
 
     Returns:
-        List of matching accounts
+        List of matching accounts (or one page of them when paginating)
     """
-    conn = get_db()
-    cursor = conn.cursor()
+    from_sql, params, match = _account_filters(query, industry, min_revenue)
 
-    sql = "SELECT * FROM accounts WHERE 1=1"
-    params = []
+    if page_size is not None or cursor is not None:
+        scope = _cursor_scope("search", query, industry, min_revenue)
+        return _account_page_response(from_sql, params, scope, page_size, cursor)
 
-    if query:
-        sql += " AND name LIKE ?"
-        params.append(f"%{query}%")
+    if match:
+        weights = ", ".join(str(w) for w in SEARCH_WEIGHTS)
+        order_by = f"bm25(accounts_fts, {weights}), {ACCOUNT_SORT_KEY} DESC"
+    else:
+        order_by = f"{ACCOUNT_SORT_KEY} DESC, a.id DESC"
 
-    if industry:
-        sql += " AND industry = ?"
-        params.append(industry)
+    with get_db() as conn:
+        rows = conn.execute(f"SELECT a.* {from_sql} ORDER BY {order_by} LIMIT ?", params + [limit])
+        columns = [desc[0] for desc in rows.description]
+        results = [dict(zip(columns, row)) for row in rows.fetchall()]
 
-    if min_revenue:
-        sql += " AND annual_revenue >= ?"
-        params.append(min_revenue)
+    return results
 
-    sql += f" ORDER BY annual_revenue DESC LIMIT {limit}"
+# Default win probability for each pipeline stage
+STAGE_PROBABILITIES = {
+    "Prospecting": 10,
+    "Qualification": 20,
+    "Proposal": 40,
+    "Negotiation": 60,
+    "Closed Won": 100,
+    "Closed Lost": 0
+}
+
+# Column lists for the JSON-aggregated account 360 query
+ACCOUNT_COLUMNS = ["id", "name", "industry", "annual_revenue", "employees", "website", "created_date"]
+CONTACT_COLUMNS = ["id", "account_id", "name", "title", "email", "phone", "is_primary"]
+DEAL_COLUMNS = ["id", "account_id", "name", "amount", "stage", "close_date", "probability", "created_date"]
+ACTIVITY_COLUMNS = ["id", "account_id", "activity_type", "description", "activity_date", "rep"]
+MAX_BATCH_ACCOUNTS = 500
+
+def _json_rows(columns: List[str], source: str) -> str:
+    """SQL expression aggregating the rows of `source` into a JSON array of objects"""
+    fields = ", ".join(f"'{col}', {col}" for col in columns)
+    return f"(SELECT json_group_array(json_object({fields})) FROM ({source}))"
+
+ACCOUNT_DETAILS_SQL = f"""
+    SELECT {", ".join("a." + col for col in ACCOUNT_COLUMNS)},
+        {_json_rows(CONTACT_COLUMNS, "SELECT * FROM contacts WHERE account_id = a.id ORDER BY id")} AS contacts,
+        {_json_rows(DEAL_COLUMNS, "SELECT * FROM deals WHERE account_id = a.id ORDER BY id")} AS deals,
+        {_json_rows(ACTIVITY_COLUMNS, "SELECT * FROM activities WHERE account_id = a.id ORDER BY activity_date DESC, id DESC LIMIT 10")} AS activities,
+        (SELECT IFNULL(SUM(amount), 0) FROM deals WHERE account_id = a.id) AS total_deal_value,
+        (SELECT COUNT(*) FROM deals WHERE account_id = a.id
+            AND stage NOT IN ('Closed Won', 'Closed Lost')) AS open_deals
+    FROM accounts a
+    WHERE a.id IN ({{placeholders}})
+"""
 
-    cursor.execute(sql, params)
-    columns = [desc[0] for desc in cursor.description]
-    results = []
+def _load_account_details(conn: sqlite3.Connection, account_ids: List[int]) -> Dict[int, Dict]:
+    """Fetch account 360 views for a set of accounts in one statement per chunk"""
+    details = {}
+    n = len(ACCOUNT_COLUMNS)
 
-    for row in cursor.fetchall():
-        results.append(dict(zip(columns, row)))
+    for start in range(0, len(account_ids), MAX_BATCH_ACCOUNTS):
+        chunk = account_ids[start:start + MAX_BATCH_ACCOUNTS]
+        sql = ACCOUNT_DETAILS_SQL.format(placeholders=", ".join("?" * len(chunk)))
 
-    conn.close()
-    return results
+        for row in conn.execute(sql, chunk):
+            account = dict(zip(ACCOUNT_COLUMNS, row[:n]))
+            details[account["id"]] = {
+                "account": account,
+                "contacts": json.loads(row[n]),
+                "deals": json.loads(row[n + 1]),
+                "recent_activities": json.loads(row[n + 2]),
+                "total_deal_value": row[n + 3],
+                "open_deals": row[n + 4]
+            }
+
+    return details
 
 @mcp.tool()
 def get_account_details(account_id: int) -> Dict:
@@ -80,51 +309,33 @@ def get_account_details(account_id: int) -> Dict:
     Returns:
         Account details including contacts and deals
     """
-    conn = get_db()
-    cursor = conn.cursor()
+    with get_db() as conn:
+        details = _load_account_details(conn, [account_id])
 
-    # Get account info
-    cursor.execute("SELECT * FROM accounts WHERE id = ?", (account_id,))
-    account_row = cursor.fetchone()
-    if not account_row:
+    if account_id not in details:
         return {"error": "Account not found"}
 
-    columns = [desc[0] for desc in cursor.description]
-    account = dict(zip(columns, account_row))
-
-    # Get contacts
-    cursor.execute("SELECT * FROM contacts WHERE account_id = ?", (account_id,))
-    contacts = []
-    contact_columns = [desc[0] for desc in cursor.description]
-    for row in cursor.fetchall():
-        contacts.append(dict(zip(contact_columns, row)))
-
-    # Get deals
-    cursor.execute("SELECT * FROM deals WHERE account_id = ?", (account_id,))
-    deals = []
-    deal_columns = [desc[0] for desc in cursor.description]
-    for row in cursor.fetchall():
-        deals.append(dict(zip(deal_columns, row)))
-
-    # Get activities
-    cursor.execute(
-        "SELECT * FROM activities WHERE account_id = ? ORDER BY activity_date DESC LIMIT 10",
-        (account_id,)
-    )
-    activities = []
-    activity_columns = [desc[0] for desc in cursor.description]
-    for row in cursor.fetchall():
-        activities.append(dict(zip(activity_columns, row)))
-
-    conn.close()
+    return details[account_id]
+
+@mcp.tool()
+def get_account_details_many(account_ids: List[int]) -> Dict:
+    """
+    Get detailed information about several accounts in one call
+
+    Args:
+        account_ids: Account IDs to load (e.g. every account on a dashboard)
+
+    Returns:
+        Account details in the order requested, plus any IDs not found
+    """
+    unique_ids = list(dict.fromkeys(account_ids))
+
+    with get_db() as conn:
+        details = _load_account_details(conn, unique_ids)
 
     return {
-        "account": account,
-        "contacts": contacts,
-        "deals": deals,
-        "recent_activities": activities,
-        "total_deal_value": sum(d["amount"] for d in deals),
-        "open_deals": len([d for d in deals if d["stage"] != "Closed Won" and d["stage"] != "Closed Lost"])
+        "accounts": [details[account_id] for account_id in unique_ids if account_id in details],
+        "not_found": [account_id for account_id in unique_ids if account_id not in details]
     }
 
 @mcp.tool()
@@ -150,27 +361,27 @@ def create_deal(
     Returns:
         Created deal information
     """
-    conn = get_db()
-    cursor = conn.cursor()
+    with get_db() as conn:
+        cursor = conn.cursor()
 
-    if not close_date:
-        close_date = (datetime.now() + timedelta(days=90)).strftime("%Y-%m-%d")
+        if not close_date:
+            close_date = (datetime.now() + timedelta(days=90)).strftime("%Y-%m-%d")
 
-    cursor.execute("""
-        INSERT INTO deals (account_id, name, amount, stage, close_date, probability, created_date)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (account_id, deal_name, amount, stage, close_date, probability, datetime.now().strftime("%Y-%m-%d")))
+        cursor.execute("""
+            INSERT INTO deals (account_id, name, amount, stage, close_date, probability, created_date)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (account_id, deal_name, amount, stage, close_date, probability, datetime.now().strftime("%Y-%m-%d")))
 
-    deal_id = cursor.lastrowid
+        deal_id = cursor.lastrowid
 
-    # Log activity
-    cursor.execute("""
-        INSERT INTO activities (account_id, activity_type, description, activity_date)
-        VALUES (?, ?, ?, ?)
-    """, (account_id, "Deal Created", f"New deal '{deal_name}' created for ${amount:,.2f}", datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+        # Log activity
+        cursor.execute("""
+            INSERT INTO activities (account_id, activity_type, description, activity_date)
+            VALUES (?, ?, ?, ?)
+        """, (account_id, "Deal Created", f"New deal '{deal_name}' created for ${amount:,.2f}", datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
 
-    conn.commit()
-    conn.close()
+        bump_data_version(conn)
+        conn.commit()
 
     return {
         "deal_id": deal_id,
@@ -183,6 +394,179 @@ def create_deal(
         "message": "Deal created successfully"
     }
 
+DEFAULT_BULK_BATCH_SIZE = 500
+
+def _parse_ndjson(ndjson: str, first_row: int = 0) -> Tuple[List[Tuple[int, Dict]], List[Dict]]:
+    """Parse newline-delimited JSON deals, collecting per-line errors"""
+    records = []
+    errors = []
+    row = first_row
+    for line in ndjson.splitlines():
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("expected a JSON object")
+            records.append((row, record))
+        except ValueError as e:
+            errors.append({"row": row, "error": f"Invalid JSON: {e}"})
+        row += 1
+    return records, errors
+
+def _validate_deals(
+    conn: sqlite3.Connection,
+    records: List[Tuple[int, Dict]]
+) -> Tuple[List[Tuple[int, tuple]], List[Dict]]:
+    """
+    Validate and normalize deal records in one pass over the batch
+
+    Returns:
+        (row number, deals INSERT tuple) for valid rows, and per-row errors
+    """
+    today = datetime.now().strftime("%Y-%m-%d")
+    default_close = (datetime.now() + timedelta(days=90)).strftime("%Y-%m-%d")
+    valid = []
+    errors = []
+
+    # Account existence is checked with one query per chunk, not per row
+    account_ids = list({
+        r.get("account_id") for _, r in records
+        if isinstance(r.get("account_id"), int) and not isinstance(r.get("account_id"), bool)
+    })
+    known_accounts = set()
+    for start in range(0, len(account_ids), MAX_BATCH_ACCOUNTS):
+        chunk = account_ids[start:start + MAX_BATCH_ACCOUNTS]
+        placeholders = ", ".join("?" * len(chunk))
+        known_accounts.update(
+            row[0] for row in conn.execute(f"SELECT id FROM accounts WHERE id IN ({placeholders})", chunk)
+        )
+
+    for row, record in records:
+        problems = []
+        account_id = record.get("account_id")
+        name = record.get("deal_name", record.get("name"))
+        amount = record.get("amount")
+        stage = record.get("stage", "Prospecting")
+        close_date = record.get("close_date") or default_close
+        probability = record.get("probability")
+
+        if not isinstance(account_id, int) or isinstance(account_id, bool):
+            problems.append("account_id must be an integer")
+        elif account_id not in known_accounts:
+            problems.append(f"account {account_id} not found")
+        if not isinstance(name, str) or not name.strip():
+            problems.append("deal_name is required")
+        if not isinstance(amount, (int, float)) or isinstance(amount, bool) or amount < 0:
+            problems.append("amount must be a non-negative number")
+        if stage not in STAGE_PROBABILITIES:
+            problems.append(f"unknown stage '{stage}'")
+        try:
+            datetime.strptime(close_date, "%Y-%m-%d")
+        except (TypeError, ValueError):
+            problems.append("close_date must be YYYY-MM-DD")
+        if probability is None:
+            probability = STAGE_PROBABILITIES.get(stage, 50)
+        elif not isinstance(probability, int) or not 0 <= probability <= 100:
+            problems.append("probability must be an integer from 0 to 100")
+
+        if problems:
+            errors.append({"row": row, "error": "; ".join(problems)})
+        else:
+            valid.append((row, (account_id, name.strip(), float(amount), stage, close_date, probability, today)))
+
+    return valid, errors
+
+def _insert_deal_batch(cursor: sqlite3.Cursor, deals: List[tuple]) -> List[int]:
+    """Insert deals plus their "Deal Created" activities; caller owns the transaction"""
+    cursor.executemany("""
+        INSERT INTO deals (account_id, name, amount, stage, close_date, probability, created_date)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, deals)
+
+    # Single writer inside the transaction, so AUTOINCREMENT ids are contiguous
+    last_id = cursor.execute("SELECT last_insert_rowid()").fetchone()[0]
+    deal_ids = list(range(last_id - len(deals) + 1, last_id + 1))
+
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    cursor.executemany("""
+        INSERT INTO activities (account_id, activity_type, description, activity_date)
+        VALUES (?, ?, ?, ?)
+    """, [
+        (deal[0], "Deal Created", f"New deal '{deal[1]}' created for ${deal[2]:,.2f}", now)
+        for deal in deals
+    ])
+
+    bump_data_version(cursor)
+    return deal_ids
+
+@mcp.tool()
+def bulk_create_deals(
+    deals: Optional[List[Dict]] = None,
+    ndjson: Optional[str] = None,
+    batch_size: int = DEFAULT_BULK_BATCH_SIZE
+) -> Dict:
+    """
+    Create many deals at once (e.g. importing a pipeline from another CRM)
+
+    Args:
+        deals: Deal records with account_id, deal_name (or name), amount and
+            optional stage, close_date and probability
+        ndjson: Alternatively (or additionally), records as newline-delimited JSON
+        batch_size: Deals written per transaction
+
+    Returns:
+        Created deal IDs (in input order) and per-row errors; invalid rows are
+        skipped without aborting the rest of the import
+    """
+    records = list(enumerate(deals or []))
+    errors = []
+    if ndjson:
+        parsed, errors = _parse_ndjson(ndjson, first_row=len(records))
+        records.extend(parsed)
+    total_rows = len(records) + len(errors)
+
+    batch_size = max(1, batch_size)
+    created = []
+    batches = 0
+
+    with get_db() as conn:
+        valid, validation_errors = _validate_deals(conn, records)
+        errors.extend(validation_errors)
+        cursor = conn.cursor()
+
+        for start in range(0, len(valid), batch_size):
+            batch = valid[start:start + batch_size]
+            batches += 1
+            try:
+                cursor.execute("BEGIN IMMEDIATE")
+                deal_ids = _insert_deal_batch(cursor, [deal for _, deal in batch])
+                conn.commit()
+                created.extend(zip((row for row, _ in batch), deal_ids))
+            except sqlite3.Error:
+                conn.rollback()
+                # Isolate the failing rows instead of dropping the whole batch
+                for row, deal in batch:
+                    try:
+                        cursor.execute("BEGIN IMMEDIATE")
+                        deal_ids = _insert_deal_batch(cursor, [deal])
+                        conn.commit()
+                        created.append((row, deal_ids[0]))
+                    except sqlite3.Error as e:
+                        conn.rollback()
+                        errors.append({"row": row, "error": str(e)})
+
+    errors.sort(key=lambda e: e["row"])
+
+    return {
+        "created": len(created),
+        "failed": len(errors),
+        "deal_ids": [deal_id for _, deal_id in created],
+        "errors": errors,
+        "batches": batches,
+        "message": f"Created {len(created)} of {total_rows} deals"
+    }
+
 @mcp.tool()
 def update_deal_stage(
     deal_id: int,
@@ -202,44 +586,36 @@ def update_deal_stage(
     Returns:
         Updated deal information
     """
-    conn = get_db()
-    cursor = conn.cursor()
-
-    # Get current deal
-    cursor.execute("SELECT * FROM deals WHERE id = ?", (deal_id,))
-    deal = cursor.fetchone()
-    if not deal:
-        return {"error": "Deal not found"}
-
-    # Update deal
-    if probability is None:
-        stage_probabilities = {
-            "Prospecting": 10,
-            "Qualification": 20,
-            "Proposal": 40,
-            "Negotiation": 60,
-            "Closed Won": 100,
-            "Closed Lost": 0
-        }
-        probability = stage_probabilities.get(new_stage, 50)
-
-    cursor.execute("""
-        UPDATE deals SET stage = ?, probability = ? WHERE id = ?
-    """, (new_stage, probability, deal_id))
-
-    # Log activity
-    cursor.execute("""
-        INSERT INTO activities (account_id, activity_type, description, activity_date)
-        VALUES (?, ?, ?, ?)
-    """, (
-        deal[1],  # account_id
-        "Deal Updated",
-        f"Deal moved to {new_stage} stage. {notes or ''}",
-        datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    ))
-
-    conn.commit()
-    conn.close()
+    with get_db() as conn:
+        cursor = conn.cursor()
+
+        # Get current deal
+        cursor.execute("SELECT * FROM deals WHERE id = ?", (deal_id,))
+        deal = cursor.fetchone()
+        if not deal:
+            return {"error": "Deal not found"}
+
+        # Update deal
+        if probability is None:
+            probability = STAGE_PROBABILITIES.get(new_stage, 50)
+
+        cursor.execute("""
+            UPDATE deals SET stage = ?, probability = ? WHERE id = ?
+        """, (new_stage, probability, deal_id))
+
+        # Log activity
+        cursor.execute("""
+            INSERT INTO activities (account_id, activity_type, description, activity_date)
+            VALUES (?, ?, ?, ?)
+        """, (
+            deal[1],  # account_id
+            "Deal Updated",
+            f"Deal moved to {new_stage} stage. {notes or ''}",
+            datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        ))
+
+        bump_data_version(conn)
+        conn.commit()
 
     return {
         "deal_id": deal_id,
@@ -261,59 +637,44 @@ def get_pipeline_summary(
     Returns:
         Pipeline summary with metrics by stage
     """
-    conn = get_db()
-    cursor = conn.cursor()
-
-    # Pipeline by stage
-    cursor.execute("""
-        SELECT stage, COUNT(*) as count, SUM(amount) as total_value, AVG(probability) as avg_probability
-        FROM deals
-        WHERE stage NOT IN ('Closed Won', 'Closed Lost')
-        GROUP BY stage
-    """)
-
-    pipeline_stages = []
-    for row in cursor.fetchall():
-        pipeline_stages.append({
-            "stage": row[0],
-            "deal_count": row[1],
-            "total_value": row[2] or 0,
-            "avg_probability": row[3] or 0,
-            "weighted_value": (row[2] or 0) * (row[3] or 0) / 100
-        })
-
-    # Closed deals
-    cursor.execute("""
-        SELECT 
-            COUNT(CASE WHEN stage = 'Closed Won' THEN 1 END) as won_count,
-            COUNT(CASE WHEN stage = 'Closed Lost' THEN 1 END) as lost_count,
-            SUM(CASE WHEN stage = 'Closed Won' THEN amount ELSE 0 END) as won_value
-        FROM deals
-        WHERE created_date >= date('now', '-90 days')
-    """)
-
-    closed = cursor.fetchone()
-
-    # Top accounts by pipeline value
-    cursor.execute("""
-        SELECT a.name, COUNT(d.id) as deal_count, SUM(d.amount) as total_pipeline
-        FROM accounts a
-        JOIN deals d ON a.id = d.account_id
-        WHERE d.stage NOT IN ('Closed Won', 'Closed Lost')
-        GROUP BY a.id
-        ORDER BY total_pipeline DESC
-        LIMIT 5
-    """)
-
-    top_accounts = []
-    for row in cursor.fetchall():
-        top_accounts.append({
-            "account": row[0],
-            "deal_count": row[1],
-            "pipeline_value": row[2]
-        })
-
-    conn.close()
+    with get_db() as conn:
+        cursor = conn.cursor()
+
+        # Pipeline by stage, from the write-maintained rollup
+        pipeline_stages = []
+        for stage, row in open_stages(stage_totals(conn)).items():
+            pipeline_stages.append({
+                "stage": stage,
+                "deal_count": row["deals"],
+                "total_value": row["total_value"],
+                "avg_probability": row["avg_probability"] or 0,
+                "weighted_value": row["total_value"] * (row["avg_probability"] or 0) / 100
+            })
+
+        # Closed deals created in the last 90 days
+        recent = stage_totals(conn, created_since=(datetime.now() - timedelta(days=90)).strftime("%Y-%m-%d"))
+        won = recent.get("Closed Won", {"deals": 0, "total_value": 0})
+        lost = recent.get("Closed Lost", {"deals": 0})
+        closed = (won["deals"], lost["deals"], won["total_value"])
+
+        # Top accounts by pipeline value
+        cursor.execute("""
+            SELECT a.name, COUNT(d.id) as deal_count, SUM(d.amount) as total_pipeline
+            FROM accounts a
+            JOIN deals d ON a.id = d.account_id
+            WHERE d.stage NOT IN ('Closed Won', 'Closed Lost')
+            GROUP BY a.id
+            ORDER BY total_pipeline DESC
+            LIMIT 5
+        """)
+
+        top_accounts = []
+        for row in cursor.fetchall():
+            top_accounts.append({
+                "account": row[0],
+                "deal_count": row[1],
+                "pipeline_value": row[2]
+            })
 
     total_pipeline = sum(s["total_value"] for s in pipeline_stages)
     weighted_pipeline = sum(s["weighted_value"] for s in pipeline_stages)
@@ -330,31 +691,45 @@ def get_pipeline_summary(
     }
 
 @mcp.tool()
-def list_all_accounts() -> List[Dict]:
+def verify_pipeline_rollup(rebuild: bool = False) -> Dict:
+    """
+    Check the materialized pipeline aggregates against the deals table
+
+    Args:
+        rebuild: Rebuild the rollup from scratch if any cell is inconsistent
+
+    Returns:
+        Consistency report (cells checked, mismatches, whether it was rebuilt)
+    """
+    with get_db() as conn:
+        return check_pipeline_rollup(conn, rebuild=rebuild)
+
+@mcp.tool()
+def list_all_accounts(
+    page_size: Optional[int] = None,
+    cursor: Optional[str] = None
+) -> List[Dict]:
     """
     List all accounts in the CRM
 
+    Args:
+        page_size: Return one page as {"accounts", "has_more", "next_cursor"}
+            instead of the full list
+        cursor: next_cursor from the previous page
+
     Returns:
-        List of all accounts with basic information
+        List of all accounts with basic information (or one page of them)
     """
-    conn = get_db()
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        SELECT a.*, COUNT(d.id) as deal_count, SUM(d.amount) as total_deal_value
-        FROM accounts a
-        LEFT JOIN deals d ON a.id = d.account_id
-        GROUP BY a.id
-        ORDER BY a.annual_revenue DESC
-    """)
-
-    columns = ["id", "name", "industry", "annual_revenue", "employees", "website", "created_date", "deal_count", "total_deal_value"]
-    results = []
+    from_sql, params, _ = _account_filters(None, None, None)
+
+    if page_size is not None or cursor is not None:
+        scope = _cursor_scope("list")
+        return _account_page_response(from_sql, params, scope, page_size, cursor, with_deal_totals=True)
 
-    for row in cursor.fetchall():
-        results.append(dict(zip(columns, row)))
+    results = []
+    for page in stream_accounts(page_size=MAX_PAGE_SIZE, with_deal_totals=True):
+        results.extend(page)
 
-    conn.close()
     return results
 
 # Run the server
@@ -363,12 +738,15 @@ if __name__ == "__main__":
     print("📍 Server: AI Sales CRM Server")
     print("💾 Database: data/sales_crm.db")
     print("🛠️  Tools available:")
-    print("   - search_accounts(query, industry, min_revenue)")
+    print("   - search_accounts(query, industry, min_revenue, page_size, cursor)")
     print("   - get_account_details(account_id)")
+    print("   - get_account_details_many(account_ids)")
     print("   - create_deal(account_id, name, amount)")
+    print("   - bulk_create_deals(deals | ndjson, batch_size)")
     print("   - update_deal_stage(deal_id, new_stage)")
     print("   - get_pipeline_summary()")
-    print("   - list_all_accounts()")
+    print("   - verify_pipeline_rollup(rebuild)")
+    print("   - list_all_accounts(page_size, cursor)")
     print()
     print("Ready for MCP connections!")
 
@@ -0,0 +1,26 @@
+"""
+Shared pytest fixtures - builds a throwaway CRM database for server tests
+"""
+
+import random
+
+import pytest
+
+import init_crm_db
+from db_pool import ConnectionPool
+from servers import analytics_server, crm_server
+
+
+@pytest.fixture
+def crm_db(tmp_path, monkeypatch):
+    """Fresh sample CRM database wired into the CRM and Analytics servers"""
+    db_path = str(tmp_path / "sales_crm.db")
+    random.seed(42)
+    monkeypatch.setattr(init_crm_db, "DB_PATH", db_path)
+    init_crm_db.init_database()
+
+    pool = ConnectionPool(db_path, size=2)
+    monkeypatch.setattr(crm_server, "pool", pool)
+    monkeypatch.setattr(analytics_server, "pool", pool)
+    yield db_path
+    pool.close()
@@ -0,0 +1,72 @@
+"""
+Tests for the consolidated account 360 query
+"""
+
+import sqlite3
+
+from servers import crm_server
+
+
+def legacy_account_details(db_path, account_id):
+    """Reference result built the original way: four queries plus Python aggregation
+
+    Child rows get an explicit id order (the original queries left it unspecified).
+    """
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+
+    def rows(sql):
+        return [dict(row) for row in conn.execute(sql, (account_id,)).fetchall()]
+
+    account = rows("SELECT * FROM accounts WHERE id = ?")[0]
+    contacts = rows("SELECT * FROM contacts WHERE account_id = ? ORDER BY id")
+    deals = rows("SELECT * FROM deals WHERE account_id = ? ORDER BY id")
+    activities = rows("SELECT * FROM activities WHERE account_id = ? ORDER BY activity_date DESC, id DESC LIMIT 10")
+    conn.close()
+
+    return {
+        "account": account,
+        "contacts": contacts,
+        "deals": deals,
+        "recent_activities": activities,
+        "total_deal_value": sum(d["amount"] for d in deals),
+        "open_deals": len([d for d in deals if d["stage"] not in ("Closed Won", "Closed Lost")])
+    }
+
+
+def test_matches_legacy_queries(crm_db):
+    for account_id in range(1, 11):
+        assert crm_server.get_account_details(account_id) == legacy_account_details(crm_db, account_id)
+
+
+def test_account_without_children(crm_db):
+    conn = sqlite3.connect(crm_db)
+    account_id = conn.execute("INSERT INTO accounts (name) VALUES ('Empty Co')").lastrowid
+    conn.commit()
+    conn.close()
+
+    details = crm_server.get_account_details(account_id)
+
+    assert details["contacts"] == [] and details["deals"] == [] and details["recent_activities"] == []
+    assert details["total_deal_value"] == 0
+    assert details["open_deals"] == 0
+
+
+def test_missing_account(crm_db):
+    assert crm_server.get_account_details(999) == {"error": "Account not found"}
+
+
+def test_batch_preserves_order_and_reports_missing(crm_db):
+    result = crm_server.get_account_details_many([3, 999, 1, 3])
+
+    assert [d["account"]["id"] for d in result["accounts"]] == [3, 1]
+    assert result["not_found"] == [999]
+    assert result["accounts"][0] == crm_server.get_account_details(3)
+
+
+def test_batch_larger_than_chunk(crm_db, monkeypatch):
+    monkeypatch.setattr(crm_server, "MAX_BATCH_ACCOUNTS", 3)
+
+    result = crm_server.get_account_details_many(list(range(1, 11)))
+
+    assert [d["account"]["id"] for d in result["accounts"]] == list(range(1, 11))
@@ -0,0 +1,92 @@
+"""
+Tests for keyset pagination and streaming of CRM accounts
+"""
+
+import sqlite3
+
+from servers import crm_server
+
+
+def add_accounts(db_path, rows):
+    conn = sqlite3.connect(db_path)
+    conn.executemany("INSERT INTO accounts (name, industry, annual_revenue) VALUES (?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def collect_pages(call, **kwargs):
+    pages = []
+    page = call(**kwargs)
+    while True:
+        pages.append(page)
+        if not page["has_more"]:
+            return pages
+        page = call(cursor=page["next_cursor"], **kwargs)
+
+
+def test_list_pages_cover_every_account_once(crm_db):
+    # Ties on revenue and a NULL revenue exercise the id tie-breaker
+    add_accounts(crm_db, [(f"Tie {i}", "Retail", 25000000) for i in range(5)] + [("No Revenue", "Retail", None)])
+    full = crm_server.list_all_accounts()
+
+    pages = collect_pages(crm_server.list_all_accounts, page_size=4)
+    paged = [account for page in pages for account in page["accounts"]]
+
+    assert [a["id"] for a in paged] == [a["id"] for a in full]
+    assert len({a["id"] for a in paged}) == 16
+    assert paged[-1]["name"] == "No Revenue"
+    assert all(len(page["accounts"]) == 4 for page in pages[:-1])
+    assert pages[-1]["next_cursor"] is None
+
+
+def test_list_pages_keep_deal_totals(crm_db):
+    full = {a["id"]: a for a in crm_server.list_all_accounts()}
+
+    page = crm_server.list_all_accounts(page_size=3)
+
+    for account in page["accounts"]:
+        assert account["deal_count"] == full[account["id"]]["deal_count"]
+        assert account["total_deal_value"] == full[account["id"]]["total_deal_value"]
+
+
+def test_search_pages_respect_filters(crm_db):
+    add_accounts(crm_db, [(f"Retail Co {i}", "Retail", 1000000 * i) for i in range(1, 8)])
+
+    pages = collect_pages(crm_server.search_accounts, industry="Retail", page_size=3)
+    names = [a["name"] for page in pages for a in page["accounts"]]
+
+    assert names == [f"Retail Co {i}" for i in range(7, 0, -1)]
+    assert len(pages) == 3
+
+
+def test_cursor_is_bound_to_its_filters(crm_db):
+    page = crm_server.search_accounts(industry="Technology", page_size=1)
+    other = crm_server.list_all_accounts(page_size=1)
+
+    assert "error" in crm_server.search_accounts(industry="Software", cursor=other["next_cursor"])
+    assert crm_server.search_accounts(cursor="not-a-cursor") == {"error": "Invalid cursor"}
+    assert page["has_more"] is False
+
+
+def test_stream_accounts_yields_bounded_pages(crm_db):
+    add_accounts(crm_db, [(f"Bulk {i}", "Retail", i) for i in range(250)])
+
+    pages = list(crm_server.stream_accounts(page_size=100))
+
+    assert [len(page) for page in pages] == [100, 100, 60]
+    ids = [a["id"] for page in pages for a in page]
+    assert len(set(ids)) == 260
+    assert len(crm_server.pool._idle) == 1  # connection returned between pages
+
+
+def test_later_pages_seek_instead_of_scanning(crm_db):
+    sql = (
+        f"SELECT a.* FROM accounts a WHERE 1=1 AND {crm_server.ACCOUNT_SORT_KEY} <= ? "
+        f"AND ({crm_server.ACCOUNT_SORT_KEY} < ? OR a.id < ?) "
+        f"ORDER BY {crm_server.ACCOUNT_SORT_KEY} DESC, a.id DESC LIMIT ?"
+    )
+    conn = sqlite3.connect(crm_db)
+    plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, (1, 1, 1, 10))]
+    conn.close()
+
+    assert plan == ["SEARCH a USING INDEX idx_accounts_keyset (<expr><?)"]
@@ -0,0 +1,72 @@
+"""
+Tests for FTS5-backed account search in the CRM server
+"""
+
+import sqlite3
+
+from servers import crm_server
+
+
+def names(results):
+    return [account["name"] for account in results]
+
+
+def test_prefix_and_token_matching(crm_db):
+    assert names(crm_server.search_accounts(query="acm")) == ["Acme Corporation"]
+    assert names(crm_server.search_accounts(query="enterprise sol")) == ["Enterprise Solutions"]
+    assert set(names(crm_server.search_accounts(query="solutions"))) == {
+        "Enterprise Solutions", "HealthTech Solutions"
+    }
+
+
+def test_matches_website_industry_and_contacts(crm_db):
+    assert names(crm_server.search_accounts(query="globaldynamics.com")) == ["Global Dynamics"]
+    assert names(crm_server.search_accounts(query="cybersecurity")) == ["SecureNet"]
+    # Contacts are named "Contact <account>-<n>" with emails at the account domain
+    assert "CloudFirst" in names(crm_server.search_accounts(query="contact5"))
+
+
+def test_filters_still_apply(crm_db):
+    results = crm_server.search_accounts(query="solutions", industry="Consulting")
+    assert names(results) == ["Enterprise Solutions"]
+
+    results = crm_server.search_accounts(query="com", min_revenue=60000000)
+    assert all(account["annual_revenue"] >= 60000000 for account in results)
+    assert "Global Dynamics" in names(results)
+
+
+def test_name_hits_rank_above_other_fields(crm_db):
+    conn = sqlite3.connect(crm_db)
+    conn.execute(
+        "INSERT INTO accounts (name, industry, annual_revenue, website) VALUES (?, ?, ?, ?)",
+        ("Zenith Partners", "Consulting", 1000, "zenith.io")
+    )
+    conn.execute(
+        "INSERT INTO contacts (account_id, name, email) VALUES (?, ?, ?)",
+        (2, "Zenith Liaison", "liaison@globaldynamics.com")
+    )
+    conn.commit()
+    conn.close()
+
+    assert names(crm_server.search_accounts(query="zenith")) == ["Zenith Partners", "Global Dynamics"]
+
+
+def test_index_follows_account_and_contact_changes(crm_db):
+    conn = sqlite3.connect(crm_db)
+    conn.execute("UPDATE accounts SET name = 'Acme Holdings' WHERE id = 1")
+    conn.execute("UPDATE contacts SET email = 'buyer@wile-e.com' WHERE account_id = 3")
+    conn.execute("DELETE FROM accounts WHERE id = 4")
+    conn.commit()
+    conn.close()
+
+    assert names(crm_server.search_accounts(query="holdings")) == ["Acme Holdings"]
+    assert names(crm_server.search_accounts(query="corporation")) == []
+    assert names(crm_server.search_accounts(query="wile")) == ["TechStart Inc"]
+    assert "Enterprise Solutions" not in names(crm_server.search_accounts(query="solutions"))
+
+
+def test_no_query_keeps_revenue_order(crm_db):
+    results = crm_server.search_accounts(limit=3)
+    revenues = [account["annual_revenue"] for account in results]
+    assert revenues == sorted(revenues, reverse=True)
+    assert len(results) == 3
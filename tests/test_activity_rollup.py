@@ -0,0 +1,95 @@
+"""
+Tests for the activity rollup cube behind get_activity_analytics
+"""
+
+import sqlite3
+
+import pytest
+
+from crm_migrations import ACTIVITY_ROLLUP_ROWS
+from servers import analytics_server, crm_server
+
+PERIODS = {
+    "last_7_days": "date('now', '-7 days')",
+    "last_30_days": "date('now', '-30 days')",
+    "last_quarter": "date('now', '-90 days')"
+}
+
+
+def scan(db_path, sql):
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(sql).fetchall()
+    conn.close()
+    return rows
+
+
+def legacy_grouping(db_path, group_by, since):
+    """The raw-activities queries the tool used to run"""
+    if group_by == "activity_type":
+        sql = f"""
+            SELECT activity_type, COUNT(*) FROM activities WHERE activity_date >= {since}
+            GROUP BY activity_type ORDER BY COUNT(*) DESC, activity_type
+        """
+    elif group_by == "day_of_week":
+        sql = f"""
+            SELECT strftime('%w', activity_date), COUNT(*) FROM activities WHERE activity_date >= {since}
+            GROUP BY 1 ORDER BY 1
+        """
+    else:
+        sql = f"""
+            SELECT a.name, COUNT(act.id) FROM accounts a
+            LEFT JOIN activities act ON a.id = act.account_id AND act.activity_date >= {since}
+            GROUP BY a.id ORDER BY COUNT(act.id) DESC, a.id LIMIT 10
+        """
+    return [row[1] for row in scan(db_path, sql)]
+
+
+@pytest.mark.parametrize("time_period", sorted(PERIODS))
+@pytest.mark.parametrize("group_by", ["activity_type", "day_of_week", "account"])
+def test_matches_raw_activity_queries(crm_db, time_period, group_by):
+    since = PERIODS[time_period]
+    result = analytics_server.get_activity_analytics(time_period=time_period, group_by=group_by)
+
+    total, accounts, days = scan(crm_db, f"""
+        SELECT COUNT(*), COUNT(DISTINCT account_id), COUNT(DISTINCT DATE(activity_date))
+        FROM activities WHERE activity_date >= {since}
+    """)[0]
+    assert result["summary"]["total_activities"] == total
+    assert result["summary"]["accounts_touched"] == accounts
+    assert result["summary"]["active_days"] == days
+
+    counts = [row.get("count", row.get("activities")) for row in result["grouped_analysis"]["data"]]
+    assert counts == legacy_grouping(crm_db, group_by, since)
+
+    influenced = scan(crm_db, f"""
+        SELECT COUNT(DISTINCT d.id) FROM activities a JOIN deals d ON a.account_id = d.account_id
+        WHERE a.activity_date >= {since} AND d.created_date >= {since}
+    """)[0][0]
+    assert result["effectiveness"]["deals_influenced"] == influenced
+
+
+@pytest.mark.parametrize("group_by, key", [("week", "week_start"), ("month", "month"), ("rep", "rep")])
+def test_new_groupings_cover_every_activity(crm_db, group_by, key):
+    result = analytics_server.get_activity_analytics(time_period="last_quarter", group_by=group_by)
+    data = result["grouped_analysis"]["data"]
+
+    assert sum(row["count"] for row in data) == result["summary"]["total_activities"]
+    assert len({row[key] for row in data}) == len(data)
+    if group_by == "week":
+        assert {scan(crm_db, f"SELECT strftime('%w', '{row[key]}')")[0][0] for row in data} == {"1"}
+
+
+def test_cube_tracks_every_write(crm_db):
+    deal = crm_server.create_deal(1, "Expansion", 50000)
+    crm_server.update_deal_stage(deal["deal_id"], "Qualification")
+
+    conn = sqlite3.connect(crm_db)
+    conn.execute("INSERT INTO activities (account_id, activity_type, activity_date, rep) VALUES (NULL, NULL, NULL, 'Jordan Lee')")
+    conn.execute("UPDATE activities SET activity_type = 'Call', rep = 'Sam Patel' WHERE id IN (1, 2, 3)")
+    conn.execute("UPDATE activities SET activity_date = date('now', '-40 days') WHERE id = 4")
+    conn.execute("DELETE FROM activities WHERE id IN (5, 6)")
+    conn.commit()
+
+    cube = conn.execute("SELECT day, activity_type, account_id, rep, activities FROM activity_rollup ORDER BY 1, 2, 3, 4")
+    assert cube.fetchall() == conn.execute(ACTIVITY_ROLLUP_ROWS + " ORDER BY 1, 2, 3, 4").fetchall()
+    conn.close()
@@ -0,0 +1,87 @@
+"""
+Tests for bulk deal ingestion in the CRM server
+"""
+
+import json
+import sqlite3
+
+from servers import crm_server
+
+
+def count(db_path, sql, *params):
+    conn = sqlite3.connect(db_path)
+    value = conn.execute(sql, params).fetchone()[0]
+    conn.close()
+    return value
+
+
+def test_bulk_insert_creates_deals_and_activities(crm_db):
+    deals_before = count(crm_db, "SELECT COUNT(*) FROM deals")
+    records = [
+        {"account_id": 1 + i % 10, "deal_name": f"Imported {i}", "amount": 1000 * i, "stage": "Proposal"}
+        for i in range(25)
+    ]
+
+    result = crm_server.bulk_create_deals(deals=records, batch_size=10)
+
+    assert result["created"] == 25 and result["failed"] == 0
+    assert result["batches"] == 3
+    assert count(crm_db, "SELECT COUNT(*) FROM deals") == deals_before + 25
+    assert count(crm_db, "SELECT COUNT(*) FROM activities WHERE activity_type = 'Deal Created'") == 25
+
+    conn = sqlite3.connect(crm_db)
+    rows = conn.execute(
+        f"SELECT name, probability FROM deals WHERE id IN ({','.join('?' * 25)}) ORDER BY id",
+        result["deal_ids"]
+    ).fetchall()
+    conn.close()
+    assert [name for name, _ in rows] == [f"Imported {i}" for i in range(25)]
+    assert {probability for _, probability in rows} == {crm_server.STAGE_PROBABILITIES["Proposal"]}
+
+
+def test_invalid_rows_reported_without_aborting(crm_db):
+    records = [
+        {"account_id": 1, "deal_name": "Good", "amount": 5000},
+        {"account_id": 999, "deal_name": "No account", "amount": 5000},
+        {"account_id": 2, "deal_name": "", "amount": -1, "stage": "Maybe"},
+        {"account_id": 3, "name": "Also good", "amount": 7500.5, "close_date": "2027-01-31"},
+        {"account_id": 4, "deal_name": "Bad date", "amount": 1, "close_date": "31/01/2027"},
+    ]
+
+    result = crm_server.bulk_create_deals(deals=records)
+
+    assert result["created"] == 2
+    assert [e["row"] for e in result["errors"]] == [1, 2, 4]
+    assert "account 999 not found" in result["errors"][0]["error"]
+    assert "unknown stage 'Maybe'" in result["errors"][1]["error"]
+    assert "close_date" in result["errors"][2]["error"]
+
+
+def test_ndjson_stream(crm_db):
+    lines = [json.dumps({"account_id": 5, "deal_name": f"Stream {i}", "amount": 100}) for i in range(3)]
+    lines.insert(1, "{not json")
+
+    result = crm_server.bulk_create_deals(ndjson="\n".join(lines) + "\n")
+
+    assert result["created"] == 3
+    assert result["errors"][0]["row"] == 1
+    assert result["errors"][0]["error"].startswith("Invalid JSON")
+    assert result["message"] == "Created 3 of 4 deals"
+
+
+def test_database_error_only_drops_offending_row(crm_db):
+    conn = sqlite3.connect(crm_db)
+    conn.execute("""
+        CREATE TRIGGER reject_poison BEFORE INSERT ON deals
+        WHEN new.name = 'Poison' BEGIN SELECT RAISE(ABORT, 'rejected'); END
+    """)
+    conn.commit()
+    conn.close()
+    records = [{"account_id": 1, "deal_name": name, "amount": 10} for name in ["A", "Poison", "B"]]
+
+    result = crm_server.bulk_create_deals(deals=records, batch_size=3)
+
+    assert result["created"] == 2
+    assert result["errors"] == [{"row": 1, "error": "rejected"}]
+    assert count(crm_db, "SELECT COUNT(*) FROM deals WHERE name IN ('A', 'B')") == 2
+    assert count(crm_db, "SELECT COUNT(*) FROM activities WHERE description LIKE '%Poison%'") == 0
@@ -0,0 +1,57 @@
+"""
+Tests for token-budgeted context packing in get_context_for_chat
+"""
+
+from context_packing import MIN_PARTIAL_TOKENS, estimate_tokens, pack_context, truncate_to_tokens
+
+
+def chunk(content, similarity, embedding=None, **extra):
+    return {"content": content, "similarity": similarity, "embedding": embedding, **extra}
+
+
+def test_packs_by_similarity_and_drops_near_duplicates():
+    candidates = [
+        chunk("Deal: Acme expansion, $120k, Negotiation", 0.71, [0.0, 1.0], type="deal"),
+        chunk("Acme raised a pricing objection on seats", 0.93, [1.0, 0.0], type="transcript"),
+        chunk("acme raised a  pricing objection on SEATS", 0.90, [0.0, -1.0], type="transcript"),
+        chunk("Acme pushed back on seat pricing again", 0.88, [0.99, 0.05], type="transcript")
+    ]
+
+    packed = pack_context(candidates, max_tokens=1000)
+
+    assert [item["similarity"] for item in packed["items"]] == [0.93, 0.71]
+    assert packed["duplicates_skipped"] == 2  # same text, then same direction
+    assert all("embedding" not in item and item["truncated"] is False for item in packed["items"])
+    assert packed["tokens_used"] == sum(item["tokens"] for item in packed["items"])
+
+
+def test_budget_truncates_once_then_fills_with_smaller_chunks():
+    long_text = " ".join(f"Sentence {i} covers renewal timing." for i in range(100))
+    candidates = [
+        chunk("Short top hit.", 0.95),
+        chunk(long_text, 0.90),
+        chunk("Another short hit about the champion.", 0.80)
+    ]
+
+    packed = pack_context(candidates, max_tokens=120)
+    short, partial = packed["items"]
+
+    assert short["content"] == "Short top hit."
+    assert partial["truncated"] and partial["content"].endswith("covers renewal timing....")
+    assert packed["tokens_used"] <= 120 and packed["over_budget_skipped"] == 1
+
+
+def test_small_remainders_are_not_filled_with_fragments():
+    packed = pack_context([chunk("x" * 400, 0.9), chunk("y" * 4000, 0.8)], max_tokens=100 + MIN_PARTIAL_TOKENS - 1)
+
+    assert [item["content"][0] for item in packed["items"]] == ["x"]
+    assert packed["over_budget_skipped"] == 1
+
+
+def test_truncation_respects_budget_and_word_boundaries():
+    text = "alpha beta gamma delta " * 50
+    cut = truncate_to_tokens(text, 20)
+
+    assert estimate_tokens(cut) <= 20 and cut.endswith("...")
+    assert cut[:-3].split()[-1] in {"alpha", "beta", "gamma", "delta"}
+    assert truncate_to_tokens("short", 20) == "short"
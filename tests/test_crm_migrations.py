@@ -0,0 +1,201 @@
+"""
+Tests for the CRM migration runner and the hot-query index set
+"""
+
+import random
+import sqlite3
+import threading
+
+import pytest
+
+from crm_migrations import MIGRATIONS, apply_migrations, get_schema_version
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# Hot queries issued by the CRM and Analytics servers on every call
+HOT_QUERIES = {
+    "pipeline_by_stage": """
+        SELECT stage, COUNT(*), SUM(amount), AVG(probability)
+        FROM deals
+        WHERE stage NOT IN ('Closed Won', 'Closed Lost')
+        GROUP BY stage
+    """,
+    "recent_closed_deals": """
+        SELECT COUNT(CASE WHEN stage = 'Closed Won' THEN 1 END),
+               COUNT(CASE WHEN stage = 'Closed Lost' THEN 1 END)
+        FROM deals
+        WHERE created_date >= date('now', '-90 days')
+    """,
+    "top_accounts_by_pipeline": """
+        SELECT a.name, COUNT(d.id), SUM(d.amount) as total_pipeline
+        FROM accounts a
+        JOIN deals d ON a.id = d.account_id
+        WHERE d.stage NOT IN ('Closed Won', 'Closed Lost')
+        GROUP BY a.id
+        ORDER BY total_pipeline DESC
+        LIMIT 5
+    """,
+    "account_contacts": "SELECT * FROM contacts WHERE account_id = 1",
+    "account_deals": "SELECT * FROM deals WHERE account_id = 1",
+    "account_recent_activities": """
+        SELECT * FROM activities WHERE account_id = 1 ORDER BY activity_date DESC LIMIT 10
+    """,
+    "historical_won_deals": """
+        SELECT amount, close_date FROM deals
+        WHERE stage = 'Closed Won' AND close_date >= date('now', '-180 days')
+        ORDER BY close_date
+    """,
+    "stage_count_in_window": """
+        SELECT COUNT(*) FROM deals WHERE stage = 'Proposal' AND created_date >= date('now', '-90 days')
+    """,
+    "deal_scoring_candidates": """
+        SELECT d.*, a.annual_revenue, a.industry,
+               (SELECT COUNT(*) FROM activities WHERE account_id = d.account_id
+                AND activity_date >= date('now', '-30 days')) as recent_activities
+        FROM deals d
+        JOIN accounts a ON d.account_id = a.id
+        WHERE d.stage NOT IN ('Closed Won', 'Closed Lost')
+    """,
+    "activity_window": """
+        SELECT COUNT(*), COUNT(DISTINCT account_id) FROM activities
+        WHERE activity_date >= date('now', '-30 days')
+    """,
+    "quarter_revenue": """
+        SELECT SUM(CASE WHEN stage = 'Closed Won' THEN amount ELSE 0 END)
+        FROM deals WHERE created_date >= '2026-01-01'
+    """,
+}
+
+INDEXED_TABLES = {"deals", "activities", "contacts"}
+
+
+def build_legacy_db(path: str, deals: int = 2000):
+    """Create a pre-migration database (tables only, no indexes, user_version 0)"""
+    conn = sqlite3.connect(path)
+    for statement in MIGRATIONS[0][2]:
+        conn.execute(statement.replace("IF NOT EXISTS ", ""))
+
+    rng = random.Random(7)
+    stages = ["Prospecting", "Qualification", "Proposal", "Negotiation", "Closed Won", "Closed Lost"]
+    conn.executemany(
+        "INSERT INTO accounts (name, industry, annual_revenue) VALUES (?, ?, ?)",
+        [(f"Account {i}", "Software", rng.randint(1, 100) * 1e6) for i in range(200)]
+    )
+    conn.executemany(
+        "INSERT INTO contacts (account_id, name, email) VALUES (?, ?, ?)",
+        [(1 + i % 200, f"Contact {i}", f"c{i}@example.com") for i in range(600)]
+    )
+    conn.executemany(
+        "INSERT INTO deals (account_id, name, amount, stage, close_date, probability, created_date) "
+        "VALUES (?, ?, ?, ?, date('now', ?), ?, date('now', ?))",
+        [
+            (1 + i % 200, f"Deal {i}", rng.randint(1, 500) * 1000, rng.choice(stages),
+             f"+{rng.randint(-180, 180)} days", 50, f"-{rng.randint(0, 365)} days")
+            for i in range(deals)
+        ]
+    )
+    conn.executemany(
+        "INSERT INTO activities (account_id, activity_type, activity_date) VALUES (?, ?, datetime('now', ?))",
+        [(1 + i % 200, "Call", f"-{rng.randint(0, 365)} days") for i in range(deals * 3)]
+    )
+    conn.commit()
+    return conn
+
+
+def table_aliases(sql: str) -> dict:
+    """Map alias (or bare table name) to table for the tables we expect indexed"""
+    aliases = {}
+    tokens = sql.replace(",", " ").split()
+    for i, token in enumerate(tokens):
+        if token in INDEXED_TABLES:
+            aliases[token] = token
+            if i + 1 < len(tokens) and tokens[i + 1].isidentifier() and tokens[i + 1].upper() not in {
+                "WHERE", "JOIN", "ON", "GROUP", "ORDER", "LIMIT", "AS"
+            }:
+                aliases[tokens[i + 1]] = token
+    return aliases
+
+
+def full_scans(conn: sqlite3.Connection, sql: str) -> list:
+    """Return plan lines that scan an indexed table without using any index"""
+    aliases = table_aliases(sql)
+    offenders = []
+    for row in conn.execute("EXPLAIN QUERY PLAN " + sql):
+        detail = row[3]
+        parts = detail.split()
+        if parts[0] == "SCAN" and parts[1] in aliases and "INDEX" not in detail:
+            offenders.append(detail)
+    return offenders
+
+
+def test_fresh_database_gets_full_schema(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "fresh.db"))
+
+    assert apply_migrations(conn) == [version for version, _, _ in MIGRATIONS]
+    assert get_schema_version(conn) == LATEST_VERSION
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert {"accounts", "contacts", "deals", "activities"} <= tables
+
+
+def test_existing_database_migrates_without_data_loss(tmp_path):
+    conn = build_legacy_db(str(tmp_path / "legacy.db"))
+    deals_before = conn.execute("SELECT COUNT(*) FROM deals").fetchone()[0]
+
+    applied = apply_migrations(conn)
+
+    assert applied[0] == 1 and applied[-1] == LATEST_VERSION
+    assert conn.execute("SELECT COUNT(*) FROM deals").fetchone()[0] == deals_before
+    assert apply_migrations(conn) == []  # idempotent
+
+
+def test_failed_migration_rolls_back(tmp_path, monkeypatch):
+    conn = sqlite3.connect(str(tmp_path / "broken.db"))
+    apply_migrations(conn)
+    monkeypatch.setattr(
+        "crm_migrations.MIGRATIONS",
+        MIGRATIONS + [(LATEST_VERSION + 1, "broken", ["CREATE TABLE ok_table (x)", "NOT SQL"])]
+    )
+
+    with pytest.raises(sqlite3.OperationalError):
+        apply_migrations(conn)
+
+    assert get_schema_version(conn) == LATEST_VERSION
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'ok_table'").fetchone() is None
+
+
+def test_concurrent_connections_apply_each_migration_once(tmp_path):
+    path = str(tmp_path / "shared.db")
+    build_legacy_db(path).close()
+    barrier = threading.Barrier(2)
+    applied, errors = [], []
+
+    def migrate():
+        conn = sqlite3.connect(path, timeout=30)
+        try:
+            barrier.wait()
+            applied.append(apply_migrations(conn))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            conn.close()
+
+    threads = [threading.Thread(target=migrate) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert sorted(applied[0] + applied[1]) == [version for version, _, _ in MIGRATIONS]
+    conn = sqlite3.connect(path)
+    assert get_schema_version(conn) == LATEST_VERSION
+    assert conn.execute("SELECT COUNT(*) FROM accounts_fts").fetchone()[0] == 200
+
+
+@pytest.mark.parametrize("query_name", sorted(HOT_QUERIES))
+def test_hot_queries_use_indexes(tmp_path, query_name):
+    conn = build_legacy_db(str(tmp_path / "plan.db"))
+    apply_migrations(conn)
+    conn.execute("ANALYZE")
+
+    assert full_scans(conn, HOT_QUERIES[query_name]) == []
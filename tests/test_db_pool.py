@@ -0,0 +1,134 @@
+"""
+Tests for the shared SQLite connection pool
+"""
+
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from db_pool import ConnectionPool, PoolTimeout
+from servers import crm_server
+
+
+def test_connections_are_reused(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), size=2)
+
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        pass
+
+    assert first is second
+    assert pool.stats["connections_opened"] == 1
+    pool.close()
+
+
+def test_pragmas_applied(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), size=1)
+
+    with pool.connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert conn.execute("PRAGMA cache_size").fetchone()[0] == -65536
+    pool.close()
+
+
+def test_uncommitted_work_rolled_back_on_release(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), size=1)
+
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.commit()
+        conn.execute("INSERT INTO t VALUES (1)")
+
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    pool.close()
+
+
+def test_pool_size_is_bounded(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), size=1, timeout=0.05)
+
+    with pool.connection():
+        with pytest.raises(PoolTimeout):
+            pool.acquire()
+    pool.close()
+
+
+def test_waiting_thread_gets_released_connection(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), size=1, timeout=5)
+    conn = pool.acquire()
+    got = []
+
+    worker = threading.Thread(target=lambda: got.append(pool.acquire()))
+    worker.start()
+    pool.release(conn)
+    worker.join()
+
+    assert got == [conn]
+    assert pool.stats["waits"] == 1
+    pool.close()
+
+
+def test_waiting_thread_woken_when_broken_connection_discarded(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), size=1, timeout=5)
+    conn = pool.acquire()
+    got = []
+
+    worker = threading.Thread(target=lambda: got.append(pool.acquire()))
+    worker.start()
+    while pool.stats["waits"] == 0:
+        time.sleep(0.001)
+    conn.close()  # rollback on release fails, so the connection is discarded
+    pool.release(conn)
+    worker.join()
+
+    assert len(got) == 1 and got[0] is not conn
+    assert got[0].execute("SELECT 1").fetchone() == (1,)
+    assert pool.stats["connections_opened"] == 2
+    pool.close()
+
+
+def test_stats_count_every_checkout_across_threads(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), size=4, timeout=5)
+
+    def work():
+        for _ in range(500):
+            with pool.connection():
+                pass
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert pool.stats["checkouts"] == 4000 and pool.stats["connections_opened"] <= 4
+    pool.close()
+
+
+def test_health_check_replaces_broken_connection(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), size=1)
+    with pool.connection() as conn:
+        pass
+    conn.close()  # simulate a connection that died while idle
+
+    report = pool.health_check()
+
+    assert report["checked"] == 1
+    assert report["replaced"] == 1
+    with pool.connection() as fresh:
+        assert fresh is not conn
+        assert fresh.execute("SELECT 1").fetchone() == (1,)
+    pool.close()
+
+
+def test_crm_tools_return_connections(crm_db):
+    for _ in range(5):
+        crm_server.search_accounts(limit=3)
+        crm_server.get_account_details(999)  # early "not found" return
+
+    assert crm_server.pool.stats["connections_opened"] == 1
+    assert len(crm_server.pool._idle) == 1
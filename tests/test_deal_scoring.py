@@ -0,0 +1,55 @@
+"""
+Tests for the vectorized deal scoring engine against the original per-deal loop
+"""
+
+import sqlite3
+
+import numpy as np
+import pytest
+
+from benchmarks.bench_deal_scoring import legacy_score_deals
+from servers import analytics_server
+
+LEGACY_QUERY = """
+    SELECT d.*, a.annual_revenue, a.industry,
+           (SELECT COUNT(*) FROM activities WHERE account_id = d.account_id
+            AND activity_date >= date('now', '-30 days')) as recent_activities,
+           julianday('now') - julianday(d.created_date) as days_in_pipeline
+    FROM deals d
+    JOIN accounts a ON d.account_id = a.id
+    WHERE d.stage NOT IN ('Closed Won', 'Closed Lost')
+"""
+
+
+def legacy_results(db_path, account_id=None):
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    query = LEGACY_QUERY + (" AND d.account_id = ?" if account_id else "")
+    deals = [dict(row) for row in conn.execute(query, [account_id] if account_id else [])]
+    conn.close()
+    return legacy_score_deals(deals)
+
+
+@pytest.mark.parametrize("account_id", [None, 3])
+def test_matches_legacy_scoring(crm_db, account_id):
+    expected = legacy_results(crm_db, account_id)
+    actual = analytics_server.calculate_deal_scoring(account_id=account_id)
+
+    assert [d["deal_id"] for d in actual] == [d["deal_id"] for d in expected]
+    for got, want in zip(actual, expected):
+        assert got["score"] == pytest.approx(want["score"]) and type(got["score"]) is type(want["score"])
+        assert got["scoring_factors"] == want["scoring_factors"]
+        assert (got["priority"], got["days_in_pipeline"]) == (want["priority"], want["days_in_pipeline"])
+
+
+def test_no_open_deals_returns_empty(crm_db):
+    assert analytics_server.calculate_deal_scoring(account_id=10 ** 6) == []
+
+
+def test_top_k_ties_follow_stable_sort():
+    rng = np.random.default_rng(3)
+    scores = rng.integers(0, 5, 200).astype(float)  # heavy ties
+
+    for n in (200, 4):
+        expected = sorted(range(n), key=lambda i: scores[i], reverse=True)[:10]
+        assert list(analytics_server.top_k_indices(scores[:n], 10)) == expected
@@ -0,0 +1,60 @@
+"""
+Tests for the two-tier embedding cache
+"""
+
+import numpy as np
+
+from embedding_cache import EmbeddingCache
+
+
+class CountingEncoder:
+    """Deterministic stand-in for a model: records every text it is asked to embed"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return np.array([[len(text), sum(map(ord, text)) % 97, 1.0] for text in texts], dtype=np.float32)
+
+
+def test_only_new_texts_reach_the_model(tmp_path):
+    cache = EmbeddingCache("model-a", path=str(tmp_path / "cache.db"))
+    encode = CountingEncoder()
+
+    first = cache.embed(["budget: $50k", "Acme Corp", "budget: $50k"], encode)
+    second = cache.embed(["  Acme   Corp ", "timeline: Q3"], encode)
+
+    assert encode.calls == [["budget: $50k", "Acme Corp"], ["timeline: Q3"]]
+    np.testing.assert_array_equal(first[0], first[2])
+    np.testing.assert_array_equal(second[0], first[1])  # whitespace-normalized key
+    stats = cache.snapshot()
+    assert (stats["memory_hits"], stats["misses"]) == (1, 3)
+
+
+def test_disk_tier_survives_restart_and_is_model_scoped(tmp_path):
+    path = str(tmp_path / "cache.db")
+    warm = EmbeddingCache("model-a", path=path)
+    expected = warm.embed(["renewal risk"], CountingEncoder())
+    warm.close()
+
+    encode = CountingEncoder()
+    restarted = EmbeddingCache("model-a", path=path)
+    np.testing.assert_array_equal(restarted.embed(["renewal risk"], encode), expected)
+    assert encode.calls == [] and restarted.snapshot()["disk_hits"] == 1
+
+    EmbeddingCache("model-b", path=path).embed(["renewal risk"], encode)
+    assert encode.calls == [["renewal risk"]]
+
+
+def test_tiers_are_bounded(tmp_path):
+    cache = EmbeddingCache("model-a", path=str(tmp_path / "cache.db"), memory_entries=3, disk_entries=10)
+    encode = CountingEncoder()
+
+    cache.embed([f"text {i}" for i in range(25)], encode)
+
+    stats = cache.snapshot()
+    assert stats["memory_entries"] == 3 and stats["memory_evictions"] == 22
+    assert stats["disk_entries"] <= 10 and stats["disk_evictions"] > 0
+    cache.embed(["text 24"], encode)  # most recent stays in the memory tier
+    assert len(encode.calls) == 1
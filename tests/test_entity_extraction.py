@@ -0,0 +1,26 @@
+"""
+Tests for the compiled transcript entity extractor
+"""
+
+from benchmarks.bench_entity_extraction import reference_extract_entities, synthetic_transcript
+from entity_extraction import ENTITY_PATTERNS, extract_entities
+
+
+def test_matches_the_original_extractor():
+    texts = [
+        synthetic_transcript(20000, seed=3),
+        "I'm speaking with Jane Doe from Acme Corp. Budget is $50k, call 555-123-4567 by Q3 2025.",
+        "ΟΔΟΣ budget: ΣΑΣ $1,200.50 — İstanbul office, email İlker at ilker@example.com.tr",
+        "",
+    ]
+    for text in texts:
+        assert extract_entities(text) == reference_extract_entities(text, ENTITY_PATTERNS)
+
+
+def test_entities_carry_type_value_confidence_and_context():
+    entities = extract_entities("Our contact is Maria Lopez, email maria@globex.com, deadline March 2026.")
+    by_type = {(e["type"], e["value"]) for e in entities}
+    assert ("person", "Maria Lopez") in by_type and ("email", "maria@globex.com") in by_type
+    assert ("timeline", "March 2026") in by_type
+    email = next(e for e in entities if e["type"] == "email")
+    assert email["confidence"] == 0.85 and "maria@globex.com" in email["context"]
@@ -0,0 +1,108 @@
+"""
+Tests for the canonical entity registry behind the knowledge collection
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+from entity_store import EntityStore, canonical_entity_id, entity_key, normalize_entity_value
+
+
+def test_normalization_and_keys():
+    assert normalize_entity_value("  ACME, Inc. ") == normalize_entity_value("Acme Inc") == "acme inc"
+    assert normalize_entity_value("Jane.Doe@Acme.com") == "jane.doe@acme.com"
+    assert entity_key("Company", "Acme, Inc.") == ("company", "acme inc")
+    assert canonical_entity_id(("company", "acme inc")) == "entity_company_acme inc"
+
+
+def test_aliases_and_idempotent_mentions():
+    store = EntityStore(":memory:")
+    key = entity_key("company", "Acme Inc")
+    store.register(canonical_entity_id(key), key, "Acme Inc")
+    store.add_alias(entity_key("company", "Acme Corporation"), canonical_entity_id(key), "Acme Corporation")
+
+    resolved = store.resolve([entity_key("company", "ACME inc."), entity_key("company", "acme corporation"),
+                              entity_key("company", "Globex")])
+    assert set(resolved.values()) == {"entity_company_acme inc"} and len(resolved) == 2
+
+    entity_id = canonical_entity_id(key)
+    assert store.add_mentions([(entity_id, "t1", 0.6), (entity_id, "t2", 0.9)]) == {entity_id}
+    assert store.add_mentions([(entity_id, "t1", 0.95)]) == set()  # the same transcript again
+
+    summary = store.summaries([entity_id, "entity_company_missing"])
+    assert list(summary) == [entity_id]
+    assert summary[entity_id]["mention_count"] == 2 and summary[entity_id]["confidence"] == 0.95
+    assert summary[entity_id]["transcript_id"] == "t1"
+    assert sorted(json.loads(summary[entity_id]["transcript_ids"])) == ["t1", "t2"]
+    assert json.loads(summary[entity_id]["aliases"]) == ["Acme Inc", "Acme Corporation"]
+    assert store.known([entity_id, "outcome_1"]) == {entity_id}
+    assert store.stats() == {"entities": 1, "aliases": 2, "mentions": 2}
+
+
+def test_transaction_rolls_back_every_write():
+    store = EntityStore(":memory:")
+    key = entity_key("company", "Acme Inc")
+    try:
+        with store.transaction():
+            store.register(canonical_entity_id(key), key, "Acme Inc")
+            store.add_mentions([(canonical_entity_id(key), "t1", 0.9)])
+            raise RuntimeError("vector write failed")
+    except RuntimeError:
+        pass
+    assert store.stats() == {"entities": 0, "aliases": 0, "mentions": 0}
+
+
+@pytest.fixture
+def rag(tmp_path, monkeypatch):
+    """rag_server on a throwaway mmap store, with deterministic embeddings instead of the model"""
+    import rag_server
+    from hybrid_search import LexicalIndex
+
+    def fake_embeddings(texts, batch_size=None):
+        # Deterministic, mutually dissimilar vectors, so nothing collapses as a near-duplicate
+        return [np.random.default_rng(abs(hash(text)) % 2**32).standard_normal(32).tolist() for text in texts]
+
+    monkeypatch.setattr(rag_server, "VECTOR_BACKEND", "mmap")
+    monkeypatch.setattr(rag_server, "VECTOR_STORE_PATH", str(tmp_path / "vectors"))
+    monkeypatch.setattr(rag_server, "_vector_store", None)
+    monkeypatch.setattr(rag_server, "_collections", {})
+    monkeypatch.setattr(rag_server, "_lexical_index", LexicalIndex(str(tmp_path / "lexical.db")))
+    monkeypatch.setattr(rag_server, "_entity_store", EntityStore(str(tmp_path / "entities.db")))
+    monkeypatch.setattr(rag_server, "generate_embeddings", fake_embeddings)
+    return rag_server
+
+
+def test_failed_vector_write_leaves_no_registry_entries(rag, monkeypatch):
+    rag_server = rag
+    mention = ("t1", {"type": "company", "value": "Acme Inc", "confidence": 0.9})
+
+    def failing_add(name, ids, embeddings, documents, metadatas):
+        rag_server.get_collection(name).add(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+        raise RuntimeError("keyword index unavailable")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(rag_server, "add_documents", failing_add)
+        try:
+            rag_server.upsert_entities([mention])
+        except RuntimeError:
+            pass
+    assert rag_server.get_entity_store().stats() == {"entities": 0, "aliases": 0, "mentions": 0}
+    assert rag_server.get_collection("knowledge").count() == 0
+
+    report = rag_server.upsert_entities([mention, ("t2", mention[1])])
+    entity_id = report["t1"]["entity_ids"][0]
+    stored = rag_server.get_collection("knowledge").get(ids=[entity_id], include=["metadatas"])
+    assert report["t1"]["new"] == 1 and stored["metadatas"][0]["mention_count"] == 2
+
+
+def test_transcripts_without_entities_are_stored_with_their_chunks(rag):
+    results = rag.store_transcripts([
+        {"transcript_id": "quiet", "content": "We talked about the weather. Nothing else came up."},
+        {"transcript_id": "deal", "content": "Acme wants a proposal.", "entities": [{"type": "company", "value": "Acme"}]}
+    ])
+
+    assert [(r["transcript_id"], r["entities_stored"], r["entities_new"]) for r in results] == [("quiet", 0, 0), ("deal", 1, 1)]
+    assert all(r["chunks_stored"] >= 1 for r in results)
+    assert rag.get_collection("transcripts").count() == 2
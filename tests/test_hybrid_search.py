@@ -0,0 +1,45 @@
+"""
+Tests for the BM25 keyword index and rank fusion behind hybrid search_similar
+"""
+
+from hybrid_search import LexicalIndex, build_match_query, reciprocal_rank_fusion, term_coverage
+
+
+def test_exact_terms_rank_first_within_a_collection():
+    index = LexicalIndex(":memory:")
+    index.add("transcripts", ["t1", "t2", "t3"], [
+        "Budget is $400,000 to $600,000 and the timeline is Q3",
+        "They need SOC 2 Type II and asked about SKU-1042 pricing",
+        "Pricing came up again, pricing pricing, no SKU mentioned"
+    ], [{"transcript_id": 1}, {"transcript_id": 2}, {"transcript_id": 3}])
+    index.add("knowledge", ["k1"], ["product: SKU-1042"])
+
+    hits = index.search("transcripts", "SKU-1042 pricing")
+    assert [hit["id"] for hit in hits] == ["t2", "t3"]
+    assert hits[0]["metadata"] == {"transcript_id": 2} and hits[0]["bm25"] < hits[1]["bm25"]
+    assert [hit["id"] for hit in index.search("transcripts", "$400,000")] == ["t1"]
+    assert [hit["id"] for hit in index.search("knowledge", "sku 1042")] == ["k1"]
+    assert index.search("transcripts", "?!") == []
+
+
+def test_first_write_wins_like_chroma():
+    index = LexicalIndex(":memory:")
+    index.add("deals", ["d1"], ["Acme renewal"])
+    index.add("deals", ["d1", "d2"], ["Replaced text", "Globex expansion"])
+
+    assert index.count("deals") == 2
+    assert index.search("deals", "replaced") == []
+    assert [hit["id"] for hit in index.search("deals", "acme")] == ["d1"]
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "d"]], k=60)
+
+    assert [doc_id for doc_id, _ in fused] == ["c", "a", "b", "d"]
+    assert fused[0][1] == 1 / 63 + 1 / 61
+
+
+def test_query_helpers():
+    assert build_match_query("SKU-1042 sku") == '"sku" OR "1042"'
+    assert build_match_query("  ") is None
+    assert term_coverage("SOC 2 audit", "SOC 2 Type II") == 2 / 3
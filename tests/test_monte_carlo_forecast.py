@@ -0,0 +1,74 @@
+"""
+Tests for the Monte Carlo pipeline forecast
+"""
+
+import numpy as np
+import pytest
+
+from servers import analytics_server
+
+
+def synthetic_pipeline(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    return (
+        rng.integers(10000, 500000, n).astype(float),
+        rng.choice([0, 10, 25, 50, 75, 100], n).astype(float),
+        rng.integers(-30, 180, n).astype(float)
+    )
+
+
+def expected_band_revenue(amounts, probabilities, days_to_close, band_ends):
+    """Closed-form expectation of simulate_pipeline's band totals"""
+    days = np.maximum(days_to_close, 0)
+    closed_by = [
+        np.sum(amounts * probabilities / 100 * -np.expm1(
+            -np.maximum(end - days, 0) / analytics_server.SLIPPAGE_MEAN_DAYS
+        ))
+        for end in band_ends
+    ]
+    return np.diff(closed_by, prepend=0)
+
+
+def test_simulation_matches_expectation():
+    amounts, probabilities, days = synthetic_pipeline()
+    bands = analytics_server.simulate_pipeline(amounts, probabilities, days, [30, 60, 90], trials=4000, seed=1)
+
+    assert bands.shape == (4000, 3)
+    np.testing.assert_allclose(
+        bands.mean(axis=0), expected_band_revenue(amounts, probabilities, days, [30, 60, 90]), rtol=0.01
+    )
+
+
+def test_chunking_and_seed_are_deterministic():
+    amounts, probabilities, days = synthetic_pipeline()
+    run = lambda **kw: analytics_server.simulate_pipeline(amounts, probabilities, days, [91, 182], trials=300, **kw)
+
+    # Same draws either way; only float32 summation order differs
+    np.testing.assert_allclose(run(seed=7), run(seed=7, chunk_elements=12345), rtol=1e-5)
+    assert not np.array_equal(run(seed=7), run(seed=8))
+
+
+def test_certain_and_impossible_deals():
+    bands = analytics_server.simulate_pipeline(
+        amounts=np.array([100.0, 50.0, 70.0]),
+        probabilities=np.array([100.0, 0.0, 100.0]),
+        days_to_close=np.array([-5.0, 1.0, 400.0]),  # overdue, never wins, beyond horizon
+        band_ends=[30],
+        trials=2000,
+        seed=0
+    )
+
+    assert set(np.unique(bands)) <= {0.0, 100.0}
+    assert bands.mean() == pytest.approx(100 * -np.expm1(-30 / analytics_server.SLIPPAGE_MEAN_DAYS), rel=0.02)
+
+
+def test_forecast_tool_reports_bands(crm_db):
+    result = analytics_server.generate_sales_forecast(method="monte_carlo", trials=2000, seed=3)
+    forecast, simulation = result["forecast"], result["simulation"]
+
+    assert result == analytics_server.generate_sales_forecast(method="monte_carlo", trials=2000, seed=3)
+    assert forecast["low"] <= simulation["median"] <= forecast["high"]
+    assert len(simulation["period_bands"]) == 3
+    for band in simulation["period_bands"]:
+        assert band["p10"] <= band["p50"] <= band["p90"]
+    assert analytics_server.generate_sales_forecast()["forecast"]["confidence"] == "80%"
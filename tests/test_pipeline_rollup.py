@@ -0,0 +1,67 @@
+"""
+Tests for the write-maintained pipeline_rollup aggregates
+"""
+
+import sqlite3
+
+from servers import analytics_server, crm_server
+
+
+def scanned_stage_totals(db_path):
+    """The per-call GROUP BY the read tools used to run"""
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("""
+        SELECT stage, COUNT(*), SUM(amount), AVG(probability)
+        FROM deals
+        WHERE stage NOT IN ('Closed Won', 'Closed Lost')
+        GROUP BY stage
+    """).fetchall()
+    conn.close()
+    return rows
+
+
+def summary_stage_totals(summary):
+    return [
+        (s["stage"], s["deal_count"], s["total_value"], s["avg_probability"])
+        for s in summary["pipeline_stages"]
+    ]
+
+
+def test_reads_match_full_scan(crm_db):
+    expected = scanned_stage_totals(crm_db)
+
+    assert summary_stage_totals(crm_server.get_pipeline_summary()) == expected
+    breakdown = analytics_server.generate_sales_forecast()["pipeline_breakdown"]
+    assert [(s["stage"], s["deal_count"], s["total_value"]) for s in breakdown] == [row[:3] for row in expected]
+
+
+def test_writes_keep_rollup_consistent(crm_db):
+    deal = crm_server.create_deal(1, "Expansion", 75000, stage="Qualification", probability=30)
+    crm_server.update_deal_stage(deal["deal_id"], "Negotiation")
+    crm_server.bulk_create_deals(deals=[{"account_id": 2, "name": "Renewal", "amount": 12000}])
+    crm_server.update_deal_stage(deal["deal_id"], "Closed Won")
+
+    conn = sqlite3.connect(crm_db)
+    conn.execute("UPDATE deals SET amount = NULL WHERE id = 1")
+    conn.execute("DELETE FROM deals WHERE id = 2")
+    conn.commit()
+    conn.close()
+
+    report = crm_server.verify_pipeline_rollup()
+    assert report["consistent"] and report["cells_checked"] > 0
+    assert summary_stage_totals(crm_server.get_pipeline_summary()) == scanned_stage_totals(crm_db)
+
+
+def test_rebuild_repairs_drift(crm_db):
+    conn = sqlite3.connect(crm_db)
+    conn.execute("UPDATE pipeline_rollup SET deals = deals + 5 WHERE stage = 'Proposal'")
+    conn.execute("DELETE FROM pipeline_rollup WHERE stage = 'Prospecting'")
+    conn.commit()
+    conn.close()
+
+    report = crm_server.verify_pipeline_rollup(rebuild=True)
+
+    assert not report["consistent"] and report["rebuilt"]
+    assert {m["stage"] for m in report["mismatched"]} == {"Proposal", "Prospecting"}
+    assert crm_server.verify_pipeline_rollup()["consistent"]
+    assert summary_stage_totals(crm_server.get_pipeline_summary()) == scanned_stage_totals(crm_db)
@@ -0,0 +1,87 @@
+"""
+Tests for the RAG worker pool and search micro-batcher
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from rag_executor import BlockingExecutor, ExecutorBusy, MicroBatcher
+
+
+def test_concurrency_is_capped_and_loop_stays_free():
+    executor = BlockingExecutor(workers=2, max_queue=10)
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def blocking(seconds):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(seconds)
+        with lock:
+            running[0] -= 1
+        return seconds
+
+    async def scenario():
+        work = [asyncio.ensure_future(executor.run(blocking, 0.05)) for _ in range(6)]
+        await asyncio.sleep(0.01)
+        depth = executor.snapshot()["queue_depth"]
+        tick = time.perf_counter()
+        await asyncio.sleep(0)  # the loop is not blocked by the running calls
+        responsive = time.perf_counter() - tick
+        return await asyncio.gather(*work), depth, responsive
+
+    results, depth, responsive = asyncio.run(scenario())
+
+    assert results == [0.05] * 6 and peak[0] == 2
+    assert depth == 4 and responsive < 0.02
+    stats = executor.snapshot()
+    assert (stats["completed"], stats["max_in_flight"], stats["max_queue_depth"]) == (6, 2, 4)
+    executor.shutdown()
+
+
+def test_full_queue_rejects_and_errors_propagate():
+    executor = BlockingExecutor(workers=1, max_queue=1)
+
+    def fail():
+        raise ValueError("boom")
+
+    async def scenario():
+        held = [asyncio.ensure_future(executor.run(time.sleep, 0.05)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(ExecutorBusy):
+            await executor.run(time.sleep, 0)
+        await asyncio.gather(*held)
+        with pytest.raises(ValueError):
+            await executor.run(fail)
+
+    asyncio.run(scenario())
+    stats = executor.snapshot()
+    assert (stats["rejected"], stats["failed"], stats["completed"]) == (1, 1, 2)
+    executor.shutdown()
+
+
+def test_requests_in_one_window_share_a_batch():
+    executor = BlockingExecutor(workers=2)
+    batches = []
+
+    def process(items):
+        batches.append(list(items))
+        return [ValueError(item) if item < 0 else item * 10 for item in items]
+
+    batcher = MicroBatcher(process, executor, window_ms=20, max_batch=4)
+
+    async def scenario():
+        burst = await asyncio.gather(*(batcher.submit(i) for i in range(6)), return_exceptions=True)
+        late = await asyncio.gather(batcher.submit(7), batcher.submit(-1), return_exceptions=True)
+        return burst, late
+
+    burst, late = asyncio.run(scenario())
+
+    assert burst == [0, 10, 20, 30, 40, 50]
+    assert late[0] == 70 and isinstance(late[1], ValueError)
+    assert batches == [[0, 1, 2, 3], [4, 5], [7, -1]]  # max_batch flushes early
+    assert batcher.snapshot()["batches"] == 3
+    executor.shutdown()
@@ -0,0 +1,77 @@
+"""
+Tests for the analytics result cache and its write-aware invalidation
+"""
+
+import json
+
+import pytest
+
+from result_cache import ResultCache
+from servers import analytics_server, crm_server
+
+
+@pytest.fixture
+def cache(crm_db, monkeypatch):
+    """The analytics server's cache, emptied and with zeroed statistics"""
+    cache = analytics_server.cache
+    cache.clear()
+    monkeypatch.setattr(cache, "stats", dict.fromkeys(cache.stats, 0))
+    return cache
+
+
+def test_identical_calls_hit(cache):
+    first = analytics_server.generate_sales_forecast()
+    second = analytics_server.generate_sales_forecast(period="next_quarter")  # same after defaults
+    analytics_server.get_activity_analytics(group_by="day_of_week")
+
+    assert second == first
+    stats = analytics_server.get_cache_stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 2)
+
+
+def test_results_are_independent_copies(cache):
+    analytics_server.get_performance_metrics()["revenue_metrics"]["closed_revenue"] = -1
+
+    assert analytics_server.get_performance_metrics()["revenue_metrics"]["closed_revenue"] != -1
+
+
+@pytest.mark.parametrize("write", [
+    lambda: crm_server.create_deal(1, "Expansion", 250000, stage="Negotiation", probability=80),
+    lambda: crm_server.update_deal_stage(1, "Closed Won"),
+    lambda: crm_server.bulk_create_deals(deals=[{"account_id": 2, "name": "Renewal", "amount": 90000}])
+])
+def test_crm_writes_invalidate(cache, write):
+    before = analytics_server.get_performance_metrics()
+    write()
+    after = analytics_server.get_performance_metrics()
+
+    assert after != before
+    stats = analytics_server.get_cache_stats()
+    assert stats["hits"] == 0 and stats["invalidations"] == 1
+
+
+def test_ttl_and_lru_bounds():
+    cache = ResultCache(ttl=60, max_entries=2, max_bytes=30)
+    for key in ("a", "b", "c"):
+        assert cache.get(key, 1) is None
+        cache.put(key, 1, json.dumps(key))
+    assert cache.get("a", 1) is None  # least recently used, evicted
+
+    cache.put("big", 1, "x" * 31)  # larger than the whole cache
+    assert cache.get("big", 1) is None
+
+    cache.ttl = -1
+    cache.put("d", 1, json.dumps("d"))
+    assert cache.get("d", 1) is None
+    assert cache.snapshot()["expired"] == 1 and cache.snapshot()["evictions"] == 2
+
+
+def test_unseeded_simulations_are_not_cached(cache):
+    runs = [analytics_server.generate_sales_forecast(method="monte_carlo", trials=200) for _ in range(2)]
+    assert runs[0]["forecast"] != runs[1]["forecast"]
+    assert analytics_server.get_cache_stats()["entries"] == 0
+
+    analytics_server.generate_sales_forecast(method="monte_carlo", trials=200, seed=1)
+    analytics_server.generate_sales_forecast(method="monte_carlo", trials=200, seed=1)
+    stats = analytics_server.get_cache_stats()
+    assert (stats["hits"], stats["entries"]) == (1, 1)
@@ -0,0 +1,107 @@
+"""
+Tests for deal stage history and transition-based funnel analytics
+"""
+
+import sqlite3
+
+import pytest
+
+from servers import analytics_server, crm_server
+
+
+@pytest.fixture
+def empty_pipeline(crm_db):
+    """Sample accounts with no deals or stage history"""
+    conn = sqlite3.connect(crm_db)
+    conn.executescript("""
+        DELETE FROM deals;
+        DELETE FROM deal_stage_history;
+        DELETE FROM stage_transition_rollup;
+    """)
+    conn.close()
+    return crm_db
+
+
+def history(db_path, deal_id):
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(
+        "SELECT from_stage, to_stage FROM deal_stage_history WHERE deal_id = ? ORDER BY id", (deal_id,)
+    ).fetchall()
+    conn.close()
+    return rows
+
+
+def test_writes_append_history(empty_pipeline):
+    deal = crm_server.create_deal(1, "Expansion", 50000)
+    crm_server.update_deal_stage(deal["deal_id"], "Qualification")
+    crm_server.update_deal_stage(deal["deal_id"], "Qualification", probability=25)  # no stage change
+    crm_server.update_deal_stage(deal["deal_id"], "Closed Won")
+
+    assert history(empty_pipeline, deal["deal_id"]) == [
+        (None, "Prospecting"),
+        ("Prospecting", "Qualification"),
+        ("Qualification", "Closed Won"),
+    ]
+
+    bulk = crm_server.bulk_create_deals(deals=[{"account_id": 2, "deal_name": "Bulk", "amount": 1, "stage": "Proposal"}])
+    assert history(empty_pipeline, bulk["deal_ids"][0]) == [(None, "Proposal")]
+
+
+def test_funnel_from_real_transitions(empty_pipeline):
+    paths = [
+        ["Qualification", "Proposal", "Closed Won"],
+        ["Qualification", "Closed Lost"],
+        ["Qualification", "Proposal", "Negotiation", "Closed Won"],
+        [],
+    ]
+    for i, path in enumerate(paths):
+        deal = crm_server.create_deal(1, f"Deal {i}", 1000)
+        for stage in path:
+            crm_server.update_deal_stage(deal["deal_id"], stage)
+
+    result = analytics_server.analyze_conversion_rates("all_time")
+    funnel = {step["from_stage"]: step for step in result["funnel_stages"]}
+
+    assert funnel["Prospecting"]["deals_in_stage"] == 4
+    assert funnel["Prospecting"]["deals_converted"] == 3
+    assert funnel["Qualification"]["deals_converted"] == 2  # one went to Closed Lost
+    assert funnel["Proposal"]["deals_in_stage"] == 2
+    assert funnel["Proposal"]["deals_converted"] == 2  # one skipped straight to Closed Won
+    assert funnel["Proposal"]["conversion_rate"] == 100.0
+    assert result["overall_metrics"] == {
+        "total_deals": 4, "win_rate": 66.7, "loss_rate": 33.3, "deals_won": 2, "deals_lost": 1
+    }
+    assert set(result["velocity_by_stage"]) == {"Prospecting", "Qualification", "Proposal", "Negotiation"}
+
+
+def test_rollup_matches_history(crm_db):
+    crm_server.bulk_create_deals(deals=[{"account_id": 3, "deal_name": f"D{i}", "amount": 1} for i in range(5)])
+    crm_server.update_deal_stage(1, "Negotiation")
+
+    conn = sqlite3.connect(crm_db)
+    rollup = conn.execute(
+        "SELECT day, from_stage, to_stage, transitions FROM stage_transition_rollup ORDER BY 1, 2, 3"
+    ).fetchall()
+    rebuilt = conn.execute("""
+        SELECT date(changed_at), IFNULL(from_stage, ''), to_stage, COUNT(*)
+        FROM deal_stage_history GROUP BY 1, 2, 3 ORDER BY 1, 2, 3
+    """).fetchall()
+    conn.close()
+
+    assert rollup == rebuilt
+
+
+def test_imported_deals_enter_history_on_their_created_date(empty_pipeline):
+    conn = sqlite3.connect(empty_pipeline)
+    conn.execute(
+        "INSERT INTO deals (account_id, name, amount, stage, created_date) VALUES (1, 'Imported', 100, 'Proposal', '2024-01-15')"
+    )
+    conn.execute("INSERT INTO deals (account_id, name, amount, stage) VALUES (1, 'Undated', 100, 'Proposal')")
+    conn.commit()
+    stamped = conn.execute("SELECT changed_at FROM deal_stage_history ORDER BY id").fetchall()
+    today = conn.execute("SELECT date('now', 'localtime')").fetchone()[0]
+    days = conn.execute("SELECT day FROM stage_transition_rollup ORDER BY day").fetchall()
+    conn.close()
+
+    assert stamped[0] == ("2024-01-15",) and stamped[1][0].startswith(today)
+    assert days == [("2024-01-15",), (today,)]
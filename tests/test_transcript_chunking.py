@@ -0,0 +1,62 @@
+"""
+Tests for sentence-aware transcript chunking
+"""
+
+import pytest
+
+from context_packing import CHARS_PER_TOKEN
+from transcript_chunking import chunk_transcript, collapse_to_transcripts, sentence_spans
+
+CALL = "\n".join(
+    f"Rep: Question {i} is about pricing. Buyer: Budget is ${i}.5M, timeline Q{i % 4 + 1}!"
+    for i in range(40)
+)
+
+
+def test_windows_are_bounded_sentence_aligned_and_overlapping():
+    chunks = list(chunk_transcript(CALL, chunk_tokens=40, overlap_tokens=12))
+    starts = {start for start, _ in sentence_spans(CALL, 10 ** 6)}
+    ends = {end for _, end in sentence_spans(CALL, 10 ** 6)}
+
+    assert [chunk["chunk_index"] for chunk in chunks] == list(range(len(chunks)))
+    assert chunks[0]["start_char"] == 0 and chunks[-1]["end_char"] == len(CALL)
+    for chunk, following in zip(chunks, chunks[1:]):
+        assert len(chunk["text"]) <= 40 * CHARS_PER_TOKEN
+        assert chunk["text"] == CALL[chunk["start_char"]:chunk["end_char"]]
+        assert chunk["start_char"] in starts and chunk["end_char"] in ends
+        assert chunk["start_char"] < following["start_char"] < chunk["end_char"]  # overlap, progress
+        assert following["end_char"] > chunk["end_char"]
+
+
+def test_every_sentence_is_covered_and_decimals_do_not_split():
+    spans = list(sentence_spans(CALL, 10 ** 6))
+    chunks = list(chunk_transcript(CALL, chunk_tokens=30, overlap_tokens=0))
+
+    assert CALL[spans[1][0]:spans[1][1]] == "Buyer: Budget is $0.5M, timeline Q1!"
+    assert all(any(c["start_char"] <= s and e <= c["end_char"] for c in chunks) for s, e in spans)
+    assert all(a["end_char"] <= b["start_char"] for a, b in zip(chunks, chunks[1:]))
+
+
+def test_run_on_sentences_are_split_between_words():
+    text = " ".join(f"word{i}" for i in range(500))
+    chunks = list(chunk_transcript(text, chunk_tokens=20, overlap_tokens=5))
+
+    assert all(len(chunk["text"]) <= 80 for chunk in chunks)
+    assert " ".join(chunk["text"] for chunk in chunks).split() == text.split()
+    with pytest.raises(ValueError):
+        next(chunk_transcript(text, chunk_tokens=20, overlap_tokens=20))
+
+
+def test_collapse_keeps_best_chunk_per_transcript():
+    matches = [
+        {"id": "transcript_7_chunk_3", "metadata": {"transcript_id": 7}, "similarity": 0.9},
+        {"id": "transcript_7_chunk_4", "metadata": {"transcript_id": 7}, "similarity": 0.8},
+        {"id": "transcript_2_chunk_0", "metadata": {"transcript_id": 2}, "similarity": 0.7},
+        {"id": "transcript_5_chunk_1", "metadata": {"transcript_id": 5}, "similarity": 0.6}
+    ]
+
+    collapsed = collapse_to_transcripts(matches, top_k=2)
+
+    assert [(r["transcript_id"], r["id"], r["chunks_matched"]) for r in collapsed] == [
+        (7, "transcript_7_chunk_3", 2), (2, "transcript_2_chunk_0", 1)
+    ]
@@ -0,0 +1,140 @@
+"""
+Tests for batch transcript processing in the training pipeline
+"""
+
+import sqlite3
+
+import pytest
+
+from transcript_processing import (
+    analyze_transcript, init_training_db, process_transcript, process_transcripts_batch, write_results
+)
+
+CALL = "I'm speaking with Jane Doe from Acme Corp. Budget is $50k by Q3 2025, email jane@acme.com"
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "training.db")
+    init_training_db(path)
+    return path
+
+
+def table_counts(path):
+    with sqlite3.connect(path) as conn:
+        return {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("transcripts", "extracted_entities", "crm_suggestions")
+        }
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_batch_matches_single_processing_and_reports_progress(db_path, workers):
+    transcripts = [{"content": f"{CALL} call {i}", "source": "audio"} for i in range(7)]
+    steps = []
+
+    summary = process_transcripts_batch(db_path, transcripts, workers=workers, write_batch=3, progress=steps.append)
+
+    assert (summary["processed"], summary["failed"], summary["workers"]) == (7, 0, workers)
+    assert [step["done"] for step in steps] == [3, 6, 7] and summary["batches"] == steps
+    ids = [result["transcript_id"] for result in summary["results"]]
+    assert [result["index"] for result in summary["results"]] == list(range(7)) and ids == sorted(ids)
+
+    expected = analyze_transcript(transcripts[4]["content"])
+    with sqlite3.connect(db_path) as conn:
+        stored = conn.execute(
+            "SELECT entity_type, entity_value, confidence, context FROM extracted_entities WHERE transcript_id = ? ORDER BY id",
+            (ids[4],)
+        ).fetchall()
+        assert stored == [(e["type"], e["value"], e["confidence"], e["context"]) for e in expected["entities"]]
+        assert conn.execute("SELECT source, status FROM transcripts WHERE id = ?", (ids[4],)).fetchone() == ("audio", "processed")
+    assert table_counts(db_path)["crm_suggestions"] == summary["suggestions_generated"] > 0
+
+
+def test_failures_are_reported_without_losing_the_batch(db_path):
+    with sqlite3.connect(db_path) as conn:
+        write_results(conn, [{"content": "earlier call", "status": "processed"}])  # IDs continue after existing rows
+        conn.commit()
+
+    summary = process_transcripts_batch(db_path, [{"content": CALL}, {"content": None}, {"content": f"{CALL}!"}], workers=1)
+
+    assert (summary["processed"], summary["failed"]) == (2, 1)
+    assert summary["failures"][0]["index"] == 1 and "TypeError" in summary["failures"][0]["error"]
+    assert [result["transcript_id"] for result in summary["results"]] == [2, 3, 4]
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT status FROM transcripts WHERE id = 3").fetchone() == ("failed",)
+    assert table_counts(db_path)["transcripts"] == 4
+
+
+def test_resubmitted_transcript_returns_stored_results_until_forced(db_path):
+    with sqlite3.connect(db_path) as conn:
+        first = process_transcript(conn, CALL, source="audio")
+        retry = process_transcript(conn, CALL)
+        counts = table_counts(db_path)
+        forced = process_transcript(conn, CALL, force_reprocess=True)
+
+    assert not first["duplicate"] and retry["duplicate"] and not forced["duplicate"]
+    assert retry == {**first, "duplicate": True} and forced == first
+    assert counts["transcripts"] == 1 and table_counts(db_path) == counts
+
+
+def test_batch_skips_stored_and_repeated_content(db_path):
+    with sqlite3.connect(db_path) as conn:
+        stored_id = process_transcript(conn, CALL)["transcript_id"]
+    transcripts = [{"content": CALL}, {"content": f"{CALL} call 1"}, {"content": f"{CALL} call 1"}]
+
+    summary = process_transcripts_batch(db_path, transcripts, workers=1, write_batch=2)
+
+    assert (summary["processed"], summary["duplicates"]) == (1, 2)
+    ids = [result["transcript_id"] for result in summary["results"]]
+    assert ids[0] == stored_id and ids[1] == ids[2] != stored_id
+    assert [result["status"] for result in summary["results"]] == ["duplicate", "processed", "duplicate"]
+    counts = table_counts(db_path)
+    assert counts["transcripts"] == 2
+
+    forced = process_transcripts_batch(db_path, transcripts, workers=1, force_reprocess=True)
+    assert [result["status"] for result in forced["results"]] == ["reprocessed", "reprocessed", "duplicate"]
+    assert table_counts(db_path) == counts
+
+
+def test_existing_database_is_migrated_to_content_hashes(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("""
+            CREATE TABLE transcripts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, content TEXT NOT NULL, processed_at TIMESTAMP,
+                source TEXT, status TEXT DEFAULT 'pending'
+            )
+        """)
+        conn.executemany("INSERT INTO transcripts (content, status) VALUES (?, 'processed')", [(CALL,), ("other",), (CALL,)])
+
+    init_training_db(path)
+    init_training_db(path)
+
+    with sqlite3.connect(path) as conn:
+        assert process_transcript(conn, CALL)["transcript_id"] == 1
+        assert process_transcript(conn, "other")["duplicate"]
+        with pytest.raises(sqlite3.IntegrityError):
+            conn.execute("UPDATE transcripts SET content_hash = (SELECT content_hash FROM transcripts WHERE id = 1) WHERE id = 2")
+
+
+def test_repeat_of_a_failed_copy_is_analyzed_not_dropped(db_path, monkeypatch):
+    import transcript_processing
+    calls = []
+
+    def flaky_extract(text):
+        calls.append(text)
+        if len(calls) == 1:
+            raise RuntimeError("extractor crashed")
+        return []
+
+    monkeypatch.setattr(transcript_processing, "extract_entities", flaky_extract)
+    transcripts = [{"content": CALL}, {"content": CALL}, {"content": CALL}]
+
+    summary = process_transcripts_batch(db_path, transcripts, workers=1, write_batch=2)
+
+    assert [result["status"] for result in summary["results"]] == ["failed", "processed", "duplicate"]
+    ids = [result["transcript_id"] for result in summary["results"]]
+    assert None not in ids and ids[1] == ids[2] != ids[0] and len(calls) == 2
+    with sqlite3.connect(db_path) as conn:
+        assert process_transcript(conn, CALL)["transcript_id"] == ids[1]
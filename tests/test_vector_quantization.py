@@ -0,0 +1,29 @@
+"""
+Tests for int8 and product quantization of embeddings
+"""
+
+import numpy as np
+import pytest
+
+from vector_quantization import approximate_dots, decode_codes, encode_vectors, train_quantizer
+
+
+@pytest.mark.parametrize("kind", ["int8", "pq"])
+def test_approximate_dots_match_decoded_vectors(kind):
+    vectors = np.random.default_rng(0).standard_normal((600, 24)).astype(np.float32)
+    quantizer = train_quantizer(kind, vectors, subspaces=6)
+    codes = encode_vectors(quantizer, vectors)
+    assert codes.shape == ((600, 24) if kind == "int8" else (600, 6))
+
+    decoded = decode_codes(quantizer, codes)
+    queries = vectors[:3] + 0.1
+    np.testing.assert_allclose(approximate_dots(quantizer, codes, queries), queries @ decoded.T, rtol=1e-4, atol=1e-4)
+
+    # int8 is nearly lossless; PQ keeps the bulk of the signal
+    error = np.linalg.norm(decoded - vectors) / np.linalg.norm(vectors)
+    assert error < (0.02 if kind == "int8" else 0.6)
+
+
+def test_pq_subspaces_must_divide_the_dimension():
+    with pytest.raises(ValueError):
+        train_quantizer("pq", np.zeros((10, 10), dtype=np.float32), subspaces=4)
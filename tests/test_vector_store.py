@@ -0,0 +1,188 @@
+"""
+Tests for the built-in memory-mapped vector store backend
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+import vector_store
+from vector_store import MmapCollection, MmapVectorStore
+
+
+def unit_vectors(count, dim=16, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def fill(collection, vectors, prefix="doc"):
+    ids = [f"{prefix}_{i}" for i in range(len(vectors))]
+    collection.add(
+        ids=ids,
+        embeddings=vectors,
+        documents=[f"text {i}" for i in ids],
+        metadatas=[{"n": i} for i in range(len(vectors))]
+    )
+    return ids
+
+
+@pytest.mark.parametrize("space", ["l2", "cosine", "ip"])
+def test_matches_exact_search_in_chroma_shape(tmp_path, space):
+    vectors = unit_vectors(300) * np.linspace(0.5, 2, 300)[:, None].astype(np.float32)
+    collection = MmapCollection(str(tmp_path / space), "c", {"hnsw:space": space})
+    fill(collection, vectors)
+    queries = unit_vectors(4, seed=1)
+
+    result = collection.query(query_embeddings=queries.tolist(), n_results=5, include=["documents", "metadatas", "distances", "embeddings"])
+
+    dots = queries @ vectors.T
+    norms = (vectors ** 2).sum(axis=1)
+    expected = {"l2": 1 + norms - 2 * dots, "ip": 1 - dots, "cosine": 1 - dots / np.sqrt(norms)}[space]
+    for row in range(4):
+        order = np.argsort(expected[row])[:5]
+        assert result["ids"][row] == [f"doc_{i}" for i in order]
+        np.testing.assert_allclose(result["distances"][row], expected[row][order], rtol=1e-4, atol=1e-5)
+        assert result["metadatas"][row][0] == {"n": int(order[0])}
+        assert result["documents"][row][0] == f"text doc_{order[0]}"
+        np.testing.assert_allclose(result["embeddings"][row][0], vectors[order[0]], rtol=1e-6)
+
+
+def test_first_write_wins_and_empty_queries(tmp_path):
+    collection = MmapCollection(str(tmp_path / "c"), "c")
+    assert collection.query(query_embeddings=[[1.0, 0.0]], n_results=3)["ids"] == [[]]
+
+    collection.add(ids=["a"], embeddings=[[1.0, 0.0]], documents=["first"])
+    collection.add(ids=["a", "b"], embeddings=[[0.0, 1.0], [0.0, 1.0]], documents=["second", "other"])
+
+    assert collection.count() == 2
+    assert collection.get(ids=["a"])["documents"] == ["first"]
+    with pytest.raises(ValueError):
+        collection.add(ids=["c", "c"], embeddings=[[1.0, 0.0], [1.0, 0.0]])
+    with pytest.raises(ValueError):
+        collection.add(ids=["d"], embeddings=[[1.0, 0.0, 0.0]])
+
+
+def test_unsupported_arguments_are_rejected(tmp_path):
+    collection = MmapCollection(str(tmp_path / "c"), "c")
+    fill(collection, unit_vectors(3))
+
+    with pytest.raises(ValueError, match="immutable"):
+        collection.update(ids=["doc_0"], embeddings=[[0.0] * 16])
+    with pytest.raises(ValueError, match="filters"):
+        collection.query(query_embeddings=[[1.0] + [0.0] * 15], where={"n": 1})
+
+
+def test_tombstones_compaction_and_reopen(tmp_path):
+    path = str(tmp_path / "c")
+    vectors = unit_vectors(200)
+    collection = MmapCollection(path, "c", dtype="float16")
+    ids = fill(collection, vectors)
+
+    collection.delete(ids=ids[:150])
+    assert collection.count() == 50 and collection.stats()["tombstones"] == 150
+    hits = collection.query(query_embeddings=[vectors[0].tolist()], n_results=100)["ids"][0]
+    assert len(hits) == 50 and not set(hits) & set(ids[:150])
+
+    before = collection.query(query_embeddings=[vectors[160].tolist()], n_results=3)
+    stats = collection.compact()
+    assert (stats["rows_before"], stats["rows_after"]) == (200, 50) and stats["bytes_reclaimed"] > 0
+    assert collection.query(query_embeddings=[vectors[160].tolist()], n_results=3)["ids"] == before["ids"]
+
+    collection.add(ids=[ids[0]], embeddings=[vectors[0]], documents=["re-added"])  # deleted IDs can come back
+    collection.close()
+
+    reopened = MmapVectorStore(str(tmp_path)).get_or_create_collection("c")
+    assert reopened.count() == 51 and reopened.stats()["dtype"] == "float16"
+    assert reopened.query(query_embeddings=[vectors[0].tolist()], n_results=1)["documents"] == [["re-added"]]
+    assert reopened.get()["ids"] == ids[150:] + [ids[0]]
+
+
+def test_interrupted_compaction_is_finished_on_reopen(tmp_path, monkeypatch):
+    path = str(tmp_path / "c")
+    vectors = unit_vectors(200)
+    collection = MmapCollection(path, "c")
+    ids = fill(collection, vectors)
+    collection.delete(ids=ids[:150])
+    expected = collection.query(query_embeddings=[vectors[160].tolist()], n_results=3)
+
+    def crash(*args):
+        raise OSError("killed before the files were swapped")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(vector_store.os, "replace", crash)
+        with pytest.raises(OSError):
+            collection.compact()  # sidecar already renumbered, old vector files still in place
+    collection.close()
+
+    reopened = MmapCollection(path, "c")
+    result = reopened.query(query_embeddings=[vectors[160].tolist()], n_results=3)
+    assert result["ids"] == expected["ids"] and result["documents"] == expected["documents"]
+    assert reopened.stats()["tombstones"] == 0
+    reopened.close()
+
+    with open(os.path.join(path, "vectors.bin.compact"), "wb") as f:
+        f.write(b"left by a crash before the sidecar commit")
+    assert MmapCollection(path, "c").query(query_embeddings=[vectors[160].tolist()], n_results=3)["ids"] == expected["ids"]
+    assert not os.path.exists(os.path.join(path, "vectors.bin.compact"))
+
+
+def test_ivf_index_on_clustered_data(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_store, "IVF_MIN_ROWS", 1000)
+    rng = np.random.default_rng(3)
+    centers = rng.standard_normal((40, 32)).astype(np.float32)
+    vectors = centers.repeat(50, axis=0) + 0.3 * rng.standard_normal((2000, 32)).astype(np.float32)
+    collection = MmapCollection(str(tmp_path / "c"), "c", index="ivf", nprobe=8)
+    fill(collection, vectors[:1500])
+    assert collection.stats()["index"] == "ivf"
+    fill(collection, vectors[1500:1700], prefix="late")  # appended after training, scanned as a tail
+
+    queries = vectors[::97] + 0.05
+    result = collection.query(query_embeddings=queries.tolist(), n_results=10)
+
+    stored = np.concatenate([vectors[:1500], vectors[1500:1700]])
+    names = [f"doc_{i}" for i in range(1500)] + [f"late_{i}" for i in range(200)]
+    distances = (queries ** 2).sum(1)[:, None] + (stored ** 2).sum(1)[None, :] - 2 * queries @ stored.T
+    truth = [{names[i] for i in np.argsort(row)[:10]} for row in distances]
+    recall = np.mean([len(set(found) & expected) / 10 for found, expected in zip(result["ids"], truth)])
+    assert recall >= 0.9
+
+
+@pytest.mark.parametrize("quantization,code_bytes", [("int8", 32), ("pq", 8)])
+def test_quantized_scan_with_full_precision_rescoring(tmp_path, monkeypatch, quantization, code_bytes):
+    monkeypatch.setattr(vector_store, "QUANT_MIN_ROWS", 500)
+    rng = np.random.default_rng(5)
+    vectors = rng.standard_normal((40, 32)).astype(np.float32).repeat(30, axis=0)
+    vectors = _unit(vectors + 0.4 * rng.standard_normal(vectors.shape).astype(np.float32))
+    path = str(tmp_path / "c")
+    collection = MmapCollection(path, "c", {"hnsw:space": "cosine"}, quantization=quantization, pq_subspaces=8)
+    fill(collection, vectors[:400])
+    assert collection.stats()["quantized_rows"] == 0  # too few rows to train on yet
+    fill(collection, vectors[400:], prefix="late")
+    stats = collection.stats()
+    assert (stats["quantized_rows"], stats["code_bytes"]) == (1200, code_bytes)
+
+    names = [f"doc_{i}" for i in range(400)] + [f"late_{i}" for i in range(800)]
+    queries = _unit(vectors[::53] + 0.05)
+    result = collection.query(query_embeddings=queries.tolist(), n_results=10)
+    exact = 1 - queries @ vectors.T
+    for row, expected in enumerate(exact):
+        order = np.argsort(expected)[:10]
+        assert len(set(result["ids"][row]) & {names[i] for i in order}) >= 9
+        # Distances come from the full-precision rows, not the codes
+        found = [names.index(doc_id) for doc_id in result["ids"][row]]
+        np.testing.assert_allclose(result["distances"][row], expected[found], rtol=1e-4, atol=1e-5)
+
+    collection.delete(ids=names[:600])
+    collection.compact()
+    assert collection.stats()["quantized_rows"] == 600
+    assert collection.query(query_embeddings=[vectors[700].tolist()], n_results=1)["ids"] == [[names[700]]]
+    collection.close()
+
+    unquantized = MmapCollection(path, "c", quantization="none")
+    assert unquantized.stats()["quantized_rows"] == 0 and not (tmp_path / "c" / "codes.bin").exists()
+    assert unquantized.query(query_embeddings=[vectors[700].tolist()], n_results=1)["ids"] == [[names[700]]]
+
+
+def _unit(vectors):
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
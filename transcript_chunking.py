@@ -0,0 +1,118 @@
+"""
+Transcript Chunking - Sentence-aware sliding windows over long call transcripts
+Chunks stay under the embedding model's input limit and point back to their transcript
+"""
+
+import os
+import re
+from collections import deque
+from typing import Dict, Iterator, List, Tuple
+
+from context_packing import CHARS_PER_TOKEN
+
+# Window defaults (overridable per process through the environment). MiniLM reads at most
+# 256 word pieces, so the default window leaves headroom for tokenizer variance.
+DEFAULT_CHUNK_TOKENS = int(os.environ.get("RAG_CHUNK_TOKENS", "200"))
+DEFAULT_CHUNK_OVERLAP = int(os.environ.get("RAG_CHUNK_OVERLAP", "40"))
+
+# A sentence ends at terminal punctuation followed by whitespace, or at a line break
+# (transcripts put each speaker turn on its own line)
+SENTENCE = re.compile(r"\S[^\n]*?(?:[.!?]+(?=\s|$)|(?=\n)|$)")
+WORD = re.compile(r"\S+")
+
+
+def sentence_spans(text: str, max_chars: int) -> Iterator[Tuple[int, int]]:
+    """
+    (start, end) offsets of each sentence, lazily
+
+    Sentences longer than max_chars are split between words, so every span
+    fits a window (a single word longer than max_chars is kept whole).
+    """
+    for sentence in SENTENCE.finditer(text):
+        start, end = sentence.span()
+        if end - start <= max_chars:
+            yield start, end
+            continue
+
+        piece_start = piece_end = None
+        for word in WORD.finditer(text, start, end):
+            if piece_start is not None and word.end() - piece_start > max_chars:
+                yield piece_start, piece_end
+                piece_start = None
+            if piece_start is None:
+                piece_start = word.start()
+            piece_end = word.end()
+        if piece_start is not None:
+            yield piece_start, piece_end
+
+
+def chunk_transcript(
+    text: str,
+    chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+    overlap_tokens: int = DEFAULT_CHUNK_OVERLAP
+) -> Iterator[Dict]:
+    """
+    Overlapping windows of whole sentences, in order
+
+    Each window holds as many consecutive sentences as fit in chunk_tokens;
+    the next one starts with the trailing sentences of the previous window
+    that fit in overlap_tokens. Runs in one pass and only ever holds a
+    single window, so cost is linear in the transcript length.
+
+    Args:
+        text: Transcript content
+        chunk_tokens: Window size (estimated tokens)
+        overlap_tokens: Context repeated between neighbouring windows (must be smaller)
+
+    Returns:
+        Iterator of chunks with chunk_index, start_char, end_char and text
+    """
+    if not 0 <= overlap_tokens < chunk_tokens:
+        raise ValueError("overlap_tokens must be at least 0 and smaller than chunk_tokens")
+
+    max_chars = chunk_tokens * CHARS_PER_TOKEN
+    overlap_chars = overlap_tokens * CHARS_PER_TOKEN
+    window = deque()
+    index = 0
+
+    def emit():
+        start, end = window[0][0], window[-1][1]
+        return {"chunk_index": index, "start_char": start, "end_char": end, "text": text[start:end]}
+
+    for span in sentence_spans(text, max_chars):
+        if window and span[1] - window[0][0] > max_chars:
+            yield emit()
+            index += 1
+            # Carry the tail forward as overlap, then make room for the new sentence
+            tail_start = len(window)
+            while tail_start > 0 and window[-1][1] - window[tail_start - 1][0] <= overlap_chars:
+                tail_start -= 1
+            for _ in range(tail_start):
+                window.popleft()
+            while window and span[1] - window[0][0] > max_chars:
+                window.popleft()
+        window.append(span)
+
+    if window:
+        yield emit()
+
+
+def collapse_to_transcripts(matches: List[Dict], top_k: int) -> List[Dict]:
+    """
+    One result per transcript: its best-ranked chunk
+
+    Args:
+        matches: Chunk matches, best first, with transcript_id in their metadata
+        top_k: Transcripts to return
+
+    Returns:
+        Best chunk per transcript, with transcript_id and how many of its chunks matched
+    """
+    best = {}
+    for match in matches:
+        transcript_id = match["metadata"].get("transcript_id")
+        if transcript_id in best:
+            best[transcript_id]["chunks_matched"] += 1
+        elif len(best) < top_k:
+            best[transcript_id] = {"transcript_id": transcript_id, **match, "chunks_matched": 1}
+    return list(best.values())
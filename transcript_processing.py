@@ -0,0 +1,508 @@
+"""
+Transcript Processing - Entity extraction, CRM suggestions and storage for the training server
+Single transcripts in-process, or batches spread over a process pool with one write transaction per batch; content already stored is deduplicated by hash
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from entity_extraction import extract_entities
+
+
+def available_cores() -> int:
+    """CPUs this process may run on"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+# Batch defaults (overridable per process through the environment)
+DEFAULT_WORKERS = int(os.environ.get("TRAINING_BATCH_WORKERS", "0")) or available_cores()
+DEFAULT_WRITE_BATCH = int(os.environ.get("TRAINING_WRITE_BATCH", "200"))
+
+# Transcripts handed to a worker per task; amortizes pickling without starving other workers
+TASK_CHUNK = 4
+
+
+def content_hash(content: str) -> str:
+    """SHA-256 of the transcript text; identical submissions share one transcripts row"""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def find_transcripts(conn: sqlite3.Connection, hashes: List[str]) -> Dict[str, int]:
+    """Transcript IDs already stored under any of hashes"""
+    found = {}
+    unique = list(dict.fromkeys(h for h in hashes if h))
+    for start in range(0, len(unique), 500):  # stay under SQLite's bound-parameter limit
+        chunk = unique[start:start + 500]
+        found.update(conn.execute(
+            f"SELECT content_hash, id FROM transcripts WHERE content_hash IN ({','.join('?' * len(chunk))})", chunk
+        ).fetchall())
+    return found
+
+
+def load_results(conn: sqlite3.Connection, transcript_id: int) -> Dict[str, List[Dict]]:
+    """Stored entities and suggestions of a transcript, in the shape analyze_transcript returns"""
+    entities = [
+        {"type": row[0], "value": row[1], "confidence": row[2], "context": row[3]}
+        for row in conn.execute(
+            "SELECT entity_type, entity_value, confidence, context FROM extracted_entities WHERE transcript_id = ? ORDER BY id",
+            (transcript_id,)
+        )
+    ]
+    suggestions = [
+        {"type": row[0], "data": json.loads(row[1]), "confidence": row[2]}
+        for row in conn.execute(
+            "SELECT suggestion_type, suggestion_data, confidence FROM crm_suggestions WHERE transcript_id = ? ORDER BY id",
+            (transcript_id,)
+        )
+    ]
+    return {"entities": entities, "suggestions": suggestions}
+
+
+def init_training_db(db_path: str):
+    """Initialize training database"""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    # Transcripts table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS transcripts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            content TEXT NOT NULL,
+            processed_at TIMESTAMP,
+            source TEXT,
+            status TEXT DEFAULT 'pending',
+            content_hash TEXT
+        )
+    """)
+
+    # Databases created before content hashing: hash the first copy of each transcript
+    if "content_hash" not in {row[1] for row in cursor.execute("PRAGMA table_info(transcripts)")}:
+        cursor.execute("ALTER TABLE transcripts ADD COLUMN content_hash TEXT")
+        first = {}
+        for transcript_id, content in conn.execute("SELECT id, content FROM transcripts WHERE status != 'failed' ORDER BY id"):
+            first.setdefault(content_hash(content), transcript_id)
+        cursor.executemany("UPDATE transcripts SET content_hash = ? WHERE id = ?", list(first.items()))
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_transcripts_content_hash ON transcripts (content_hash)")
+
+    # Extracted entities table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS extracted_entities (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            transcript_id INTEGER,
+            entity_type TEXT,
+            entity_value TEXT,
+            confidence REAL,
+            context TEXT,
+            FOREIGN KEY(transcript_id) REFERENCES transcripts(id)
+        )
+    """)
+
+    # Feedback table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS feedback (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            entity_id INTEGER,
+            original_value TEXT,
+            corrected_value TEXT,
+            feedback_type TEXT,
+            created_at TIMESTAMP,
+            FOREIGN KEY(entity_id) REFERENCES extracted_entities(id)
+        )
+    """)
+
+    # Training suggestions table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS crm_suggestions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            transcript_id INTEGER,
+            suggestion_type TEXT,
+            suggestion_data JSON,
+            confidence REAL,
+            status TEXT DEFAULT 'pending',
+            created_at TIMESTAMP,
+            FOREIGN KEY(transcript_id) REFERENCES transcripts(id)
+        )
+    """)
+
+    conn.commit()
+    conn.close()
+
+
+def generate_crm_suggestions(transcript_id: Optional[int], entities: List[Dict]) -> List[Dict]:
+    """Generate CRM update suggestions based on extracted entities"""
+    suggestions = []
+
+    # Group entities by type
+    companies = [e for e in entities if e["type"] == "company"]
+    people = [e for e in entities if e["type"] == "person"]
+    amounts = [e for e in entities if e["type"] == "amount"]
+    timelines = [e for e in entities if e["type"] == "timeline"]
+    emails = [e for e in entities if e["type"] == "email"]
+
+    # Suggest account creation/update
+    for company in companies:
+        if company["confidence"] > 0.7:
+            suggestions.append({
+                "type": "create_account",
+                "data": {
+                    "name": company["value"],
+                    "source": "transcript",
+                    "confidence": company["confidence"]
+                },
+                "confidence": company["confidence"]
+            })
+
+    # Suggest contact creation
+    for i, person in enumerate(people):
+        if person["confidence"] > 0.6:
+            # Try to match with company
+            matched_company = companies[0]["value"] if companies else "Unknown"
+
+            # Check for associated email
+            person_email = emails[i]["value"] if i < len(emails) else None
+
+            suggestions.append({
+                "type": "create_contact",
+                "data": {
+                    "name": person["value"],
+                    "company": matched_company,
+                    "email": person_email,
+                    "confidence": person["confidence"]
+                },
+                "confidence": person["confidence"]
+            })
+
+    # Suggest deal creation
+    if amounts and companies:
+        deal_amount = amounts[0]["value"].replace(",", "").replace("$", "")
+        # Convert k/m to actual numbers
+        multiplier = 1
+        if deal_amount.lower().endswith('k'):
+            multiplier = 1000
+            deal_amount = deal_amount[:-1]
+        elif deal_amount.lower().endswith('m'):
+            multiplier = 1000000
+            deal_amount = deal_amount[:-1]
+
+        try:
+            amount_value = float(deal_amount) * multiplier
+
+            suggestions.append({
+                "type": "create_deal",
+                "data": {
+                    "name": f"{companies[0]['value']} Opportunity",
+                    "amount": amount_value,
+                    "company": companies[0]["value"],
+                    "timeline": timelines[0]["value"] if timelines else "Q2 2024",
+                    "confidence": min(companies[0]["confidence"], amounts[0]["confidence"])
+                },
+                "confidence": min(companies[0]["confidence"], amounts[0]["confidence"])
+            })
+        except ValueError:
+            pass
+
+    return suggestions
+
+
+def analyze_transcript(content: str) -> Dict[str, List[Dict]]:
+    """Entities and CRM suggestions for one transcript (pure CPU work, safe to run in a worker process)"""
+    entities = extract_entities(content)
+    return {"entities": entities, "suggestions": generate_crm_suggestions(None, entities)}
+
+
+def _analyze_item(item: tuple) -> tuple:
+    """Worker entry point: (index, analysis, error); failures are returned, never raised"""
+    index, content = item
+    try:
+        if not isinstance(content, str):
+            raise TypeError(f"content must be a string, not {type(content).__name__}")
+        return index, analyze_transcript(content), None
+    except Exception as e:
+        return index, None, f"{type(e).__name__}: {e}"
+
+
+def write_results(
+    conn: sqlite3.Connection,
+    records: List[Dict[str, Any]],
+    force_reprocess: bool = False
+) -> List[Tuple[int, str]]:
+    """
+    Insert transcripts with their entities and suggestions, a few executemany calls in all
+
+    Content already stored (or repeated within records) is not inserted again:
+    the record resolves to the existing transcript as a duplicate. With
+    force_reprocess, an analyzed record instead replaces the existing
+    transcript's entities and suggestions, keeping its ID. The caller owns
+    the transaction (commit/rollback). Transcript IDs are reserved up front so
+    the child rows can reference them without inserting transcripts one at a time.
+
+    Args:
+        conn: Connection to the training database
+        records: Items with content, source, status ('processed', 'failed', or 'duplicate'
+            for content the caller skipped analyzing) and, when processed, entities and suggestions
+        force_reprocess: Replace stored results for content that is already present
+
+    Returns:
+        (transcript ID, 'processed' | 'reprocessed' | 'duplicate' | 'failed') per record, in record order
+    """
+    if not records:
+        return []
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")  # hold the write lock so the reserved IDs and hash lookups stay valid
+    hashes = [content_hash(r["content"]) if r["status"] != "failed" else None for r in records]
+    stored = find_transcripts(conn, hashes)
+
+    outcomes: List[Optional[Tuple[int, str]]] = [None] * len(records)
+    first, repeats, new, replaced = {}, {}, [], []
+    for i, (record, digest) in enumerate(zip(records, hashes)):
+        if digest is None:
+            new.append(i)
+        elif digest in first:
+            repeats[i] = first[digest]
+        elif digest in stored and (record["status"] != "processed" or not force_reprocess):
+            first[digest] = i
+            outcomes[i] = (stored[digest], "duplicate")
+        elif digest in stored:
+            first[digest] = i
+            replaced.append(i)
+            outcomes[i] = (stored[digest], "reprocessed")
+        elif record["status"] == "processed":
+            first[digest] = i
+            new.append(i)
+        else:
+            outcomes[i] = (record.get("transcript_id"), "duplicate")  # skipped by the caller, since removed
+
+    last_id = conn.execute("""
+        SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'transcripts'), 0),
+                   COALESCE((SELECT MAX(id) FROM transcripts), 0))
+    """).fetchone()[0]
+    for offset, i in enumerate(new, start=last_id + 1):
+        outcomes[i] = (offset, records[i]["status"])
+    for i, source in repeats.items():
+        outcomes[i] = (outcomes[source][0], "duplicate")
+    now = datetime.now()
+
+    conn.executemany(
+        "INSERT INTO transcripts (id, content, source, processed_at, status, content_hash) VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            (outcomes[i][0], records[i]["content"], records[i].get("source", "upload"), now, records[i]["status"], hashes[i])
+            for i in new
+        ]
+    )
+    if replaced:
+        ids = [(outcomes[i][0],) for i in replaced]
+        conn.executemany("DELETE FROM extracted_entities WHERE transcript_id = ?", ids)
+        conn.executemany("DELETE FROM crm_suggestions WHERE transcript_id = ?", ids)
+        conn.executemany(
+            "UPDATE transcripts SET processed_at = ?, status = 'processed' WHERE id = ?", [(now, tid) for (tid,) in ids]
+        )
+
+    written = new + replaced
+    conn.executemany(
+        "INSERT INTO extracted_entities (transcript_id, entity_type, entity_value, confidence, context) VALUES (?, ?, ?, ?, ?)",
+        [
+            (outcomes[i][0], e["type"], e["value"], e["confidence"], e["context"])
+            for i in written for e in records[i].get("entities", [])
+        ]
+    )
+    conn.executemany(
+        "INSERT INTO crm_suggestions (transcript_id, suggestion_type, suggestion_data, confidence, created_at) VALUES (?, ?, ?, ?, ?)",
+        [
+            (outcomes[i][0], s["type"], json.dumps(s["data"]), s["confidence"], now)
+            for i in written for s in records[i].get("suggestions", [])
+        ]
+    )
+    return outcomes
+
+
+def process_transcript(
+    conn: sqlite3.Connection,
+    content: str,
+    source: str = "upload",
+    force_reprocess: bool = False
+) -> Dict[str, Any]:
+    """
+    Extract, store and return one transcript's entities and CRM suggestions
+
+    A transcript whose content is already stored is answered from the database
+    without re-running extraction (duplicate=True), unless force_reprocess is set.
+
+    Returns:
+        transcript_id, entities_found, suggestions_generated, entities, suggestions, duplicate
+    """
+    digest = content_hash(content)
+    transcript_id, outcome = find_transcripts(conn, [digest]).get(digest), "duplicate"
+    if transcript_id is None or force_reprocess:
+        analysis = analyze_transcript(content)
+        try:
+            (transcript_id, outcome), = write_results(
+                conn, [{"content": content, "source": source, "status": "processed", **analysis}], force_reprocess
+            )
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+    if outcome == "duplicate":
+        analysis = load_results(conn, transcript_id)
+
+    return {
+        "transcript_id": transcript_id,
+        "entities_found": len(analysis["entities"]),
+        "suggestions_generated": len(analysis["suggestions"]),
+        "entities": analysis["entities"],
+        "suggestions": analysis["suggestions"],
+        "duplicate": outcome == "duplicate"
+    }
+
+
+def process_transcripts_batch(
+    db_path: str,
+    transcripts: List[Dict[str, Any]],
+    workers: Optional[int] = None,
+    write_batch: int = DEFAULT_WRITE_BATCH,
+    progress: Optional[Callable[[Dict], None]] = None,
+    force_reprocess: bool = False
+) -> Dict[str, Any]:
+    """
+    Extract entities and suggestions for many transcripts and store them
+
+    Extraction runs on a process pool (workers defaults to the available
+    cores; 1 runs in-process). Results are written in input order, write_batch
+    transcripts per transaction, so the database is locked only while a batch
+    is written. A transcript whose extraction fails is stored with status
+    'failed' and reported; the rest of the batch is unaffected. Content that
+    is already stored, or repeated earlier in the batch, is not extracted again
+    and resolves to the existing transcript as a duplicate; force_reprocess
+    re-extracts stored content and replaces its entities and suggestions.
+
+    Args:
+        db_path: Training database
+        transcripts: Items with content and optional source
+        workers: Extraction processes
+        write_batch: Transcripts per write transaction
+        progress: Called after each committed batch with done/total/failed/elapsed_s
+        force_reprocess: Re-extract transcripts that are already stored
+
+    Returns:
+        Counts, per-transcript IDs/status (input order), failures and batch progress
+    """
+    workers = max(1, min(workers or DEFAULT_WORKERS, len(transcripts) or 1))
+    started = time.perf_counter()
+    items = list(enumerate(t.get("content") for t in transcripts))
+    summary = {
+        "transcripts_submitted": len(transcripts),
+        "processed": 0,
+        "failed": 0,
+        "duplicates": 0,
+        "entities_found": 0,
+        "suggestions_generated": 0,
+        "workers": workers,
+        "results": [],
+        "failures": [],
+        "batches": []
+    }
+
+    conn = sqlite3.connect(db_path)
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        # Skip extraction for stored content and for repeats within the batch
+        hashes = [content_hash(content) if isinstance(content, str) else None for _, content in items]
+        stored = {} if force_reprocess else find_transcripts(conn, hashes)
+        seen, skipped, failed_hashes = set(), set(), set()
+        for index, digest in enumerate(hashes):
+            if digest and (digest in stored or digest in seen):
+                skipped.add(index)
+            seen.add(digest)
+        work = [item for item in items if item[0] not in skipped]
+
+        analyses = pool.map(_analyze_item, work, chunksize=TASK_CHUNK) if pool else map(_analyze_item, work)
+        pending = []
+
+        def flush():
+            records = []
+            for position, (index, analysis, error) in enumerate(pending):
+                source = transcripts[index].get("source", "upload")
+                content = transcripts[index].get("content")
+                if index in skipped and hashes[index] in failed_hashes:
+                    # The earlier copy this repeat was skipped for failed extraction, so analyze this one
+                    skipped.discard(index)
+                    index, analysis, error = pending[position] = _analyze_item((index, content))
+                if index in skipped:
+                    records.append({
+                        "content": content, "source": source, "status": "duplicate", "transcript_id": stored.get(hashes[index])
+                    })
+                elif error:
+                    failed_hashes.add(hashes[index])
+                    records.append({"content": str(content or ""), "source": source, "status": "failed"})
+                else:
+                    failed_hashes.discard(hashes[index])
+                    records.append({"content": content, "source": source, "status": "processed", **analysis})
+            try:
+                outcomes = write_results(conn, records, force_reprocess)
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+
+            for (index, analysis, error), (transcript_id, status) in zip(pending, outcomes):
+                if status == "duplicate":
+                    summary["duplicates"] += 1
+                    summary["results"].append({"index": index, "transcript_id": transcript_id, "status": "duplicate"})
+                    continue
+                if error:
+                    summary["failed"] += 1
+                    summary["failures"].append({"index": index, "transcript_id": transcript_id, "error": error})
+                    summary["results"].append({"index": index, "transcript_id": transcript_id, "status": "failed"})
+                    continue
+                summary["processed"] += 1
+                summary["entities_found"] += len(analysis["entities"])
+                summary["suggestions_generated"] += len(analysis["suggestions"])
+                summary["results"].append({
+                    "index": index,
+                    "transcript_id": transcript_id,
+                    "status": status,
+                    "entities_found": len(analysis["entities"]),
+                    "suggestions_generated": len(analysis["suggestions"])
+                })
+            pending.clear()
+
+            step = {
+                "done": summary["processed"] + summary["failed"] + summary["duplicates"],
+                "total": len(transcripts),
+                "failed": summary["failed"],
+                "elapsed_s": round(time.perf_counter() - started, 3)
+            }
+            summary["batches"].append(step)
+            if progress:
+                progress(step)
+
+        analyzed = iter(analyses)
+        for index in range(len(items)):
+            pending.append((index, None, None) if index in skipped else next(analyzed))
+            if len(pending) >= write_batch:
+                flush()
+        if pending:
+            flush()
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+        conn.close()
+
+    summary["elapsed_s"] = round(time.perf_counter() - started, 3)
+    return summary
+
+
+def log_progress(step: Dict):
+    """Progress callback for servers: one line per committed batch on stderr (stdout carries MCP)"""
+    print(f"process_transcripts_batch: {step['done']}/{step['total']} done, {step['failed']} failed, "
+          f"{step['elapsed_s']}s", file=sys.stderr)
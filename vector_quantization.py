@@ -0,0 +1,128 @@
+"""
+Vector Quantization - Compact codes for stored embeddings
+int8 scalar quantization (4x smaller than float32) and product quantization (8-32x), scored without decoding
+"""
+
+import os
+from typing import Dict
+
+import numpy as np
+
+# Product quantization defaults (overridable per process through the environment)
+PQ_SUBSPACES = int(os.environ.get("RAG_PQ_SUBSPACES", "96"))
+PQ_CENTROIDS = 256  # one uint8 code per subspace
+PQ_TRAIN_ITERATIONS = 12
+
+# Training uses at most this many vectors
+TRAIN_SAMPLE = 25000
+
+QUANTIZATIONS = ("none", "int8", "pq")
+
+
+def code_width(quantizer: Dict) -> int:
+    """Bytes per encoded vector"""
+    if quantizer["kind"] == "int8":
+        return len(quantizer["scale"])
+    return quantizer["codebooks"].shape[0]
+
+
+def code_dtype(quantizer: Dict):
+    """numpy dtype of the codes"""
+    return np.int8 if quantizer["kind"] == "int8" else np.uint8
+
+
+def train_quantizer(kind: str, sample: np.ndarray, subspaces: int = PQ_SUBSPACES, seed: int = 0) -> Dict:
+    """
+    Fit a quantizer to a sample of float32 vectors
+
+    Args:
+        kind: "int8" (per-dimension symmetric scale) or "pq" (k-means codebook per subspace)
+        sample: Training vectors, one per row
+        subspaces: PQ subspaces; must divide the dimension
+
+    Returns:
+        Quantizer dict: kind plus scale (int8) or codebooks (pq, subspaces x centroids x sub-dim)
+    """
+    sample = np.asarray(sample, dtype=np.float32)
+    if kind == "int8":
+        scale = np.abs(sample).max(axis=0) / 127
+        return {"kind": "int8", "scale": np.where(scale == 0, 1, scale).astype(np.float32)}
+
+    if kind != "pq":
+        raise ValueError(f"Unknown quantization: {kind}")
+    dim = sample.shape[1]
+    if dim % subspaces:
+        raise ValueError(f"PQ subspaces ({subspaces}) must divide the dimension ({dim})")
+
+    rng = np.random.default_rng(seed)
+    centroids = min(PQ_CENTROIDS, len(sample))
+    parts = sample.reshape(len(sample), subspaces, dim // subspaces)
+    codebooks = np.empty((subspaces, centroids, dim // subspaces), dtype=np.float32)
+    for m in range(subspaces):
+        data = parts[:, m, :]
+        book = data[rng.choice(len(data), size=centroids, replace=False)].copy()
+        for _ in range(PQ_TRAIN_ITERATIONS):
+            assign = _nearest(data, book)
+            counts = np.bincount(assign, minlength=centroids)
+            sums = np.zeros_like(book)
+            np.add.at(sums, assign, data)
+            filled = counts > 0
+            book[filled] = sums[filled] / counts[filled, None]
+        codebooks[m] = book
+    return {"kind": "pq", "codebooks": codebooks}
+
+
+def encode_vectors(quantizer: Dict, vectors: np.ndarray) -> np.ndarray:
+    """Codes for float32 vectors (one row per vector, code_width bytes each)"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if quantizer["kind"] == "int8":
+        return np.clip(np.rint(vectors / quantizer["scale"]), -127, 127).astype(np.int8)
+
+    codebooks = quantizer["codebooks"]
+    subspaces, _, sub_dim = codebooks.shape
+    parts = vectors.reshape(len(vectors), subspaces, sub_dim)
+    codes = np.empty((len(vectors), subspaces), dtype=np.uint8)
+    for m in range(subspaces):
+        codes[:, m] = _nearest(parts[:, m, :], codebooks[m])
+    return codes
+
+
+def decode_codes(quantizer: Dict, codes: np.ndarray) -> np.ndarray:
+    """Approximate float32 vectors back from codes"""
+    if quantizer["kind"] == "int8":
+        return codes.astype(np.float32) * quantizer["scale"]
+    codebooks = quantizer["codebooks"]
+    subspaces = codebooks.shape[0]
+    return codebooks[np.arange(subspaces), codes].reshape(len(codes), -1)
+
+
+def approximate_dots(quantizer: Dict, codes: np.ndarray, queries: np.ndarray) -> np.ndarray:
+    """
+    Approximate query . vector for every (query, encoded vector) pair, without decoding
+
+    int8 folds the scale into the query; PQ sums per-subspace lookup tables
+    (asymmetric distance computation).
+
+    Returns:
+        (queries x codes) float32 matrix
+    """
+    if quantizer["kind"] == "int8":
+        return (queries * quantizer["scale"]) @ codes.astype(np.float32).T
+
+    codebooks = quantizer["codebooks"]
+    subspaces, _, sub_dim = codebooks.shape
+    tables = np.einsum("qmd,mkd->qmk", queries.reshape(len(queries), subspaces, sub_dim), codebooks)
+    dots = np.zeros((len(queries), len(codes)), dtype=np.float32)
+    for m in range(subspaces):
+        dots += tables[:, m, :][:, codes[:, m]]
+    return dots
+
+
+def _nearest(data: np.ndarray, centroids: np.ndarray, block: int = 65536) -> np.ndarray:
+    """Index of the closest centroid (L2) for each row"""
+    centroid_norms = (centroids ** 2).sum(axis=1)
+    out = np.empty(len(data), dtype=np.intp)
+    for start in range(0, len(data), block):
+        chunk = data[start:start + block]
+        out[start:start + len(chunk)] = np.argmin(centroid_norms[None, :] - 2 * chunk @ centroids.T, axis=1)
+    return out
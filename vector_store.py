@@ -0,0 +1,669 @@
+"""
+Vector Store - Pluggable storage behind the RAG collections
+Chroma, or a built-in backend: memory-mapped embeddings with a SQLite ID/metadata sidecar
+"""
+
+import json
+import math
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Protocol
+
+import numpy as np
+
+from vector_quantization import (
+    PQ_SUBSPACES, QUANTIZATIONS, TRAIN_SAMPLE, approximate_dots, code_dtype, code_width, encode_vectors,
+    train_quantizer
+)
+
+# Backend selection and built-in backend defaults (overridable per process through the environment)
+DEFAULT_BACKEND = os.environ.get("RAG_VECTOR_BACKEND", "chroma")
+DEFAULT_DTYPE = os.environ.get("RAG_VECTOR_DTYPE", "float32")
+DEFAULT_INDEX = os.environ.get("RAG_VECTOR_INDEX", "flat")
+IVF_MIN_ROWS = int(os.environ.get("RAG_IVF_MIN_ROWS", "50000"))
+IVF_NPROBE = int(os.environ.get("RAG_IVF_NPROBE", "16"))
+QUANT_MIN_ROWS = int(os.environ.get("RAG_QUANT_MIN_ROWS", "1024"))
+RESCORE_FACTOR = int(os.environ.get("RAG_RESCORE_FACTOR", "4"))
+
+# Quantized scans keep at least this many candidates for full-precision re-scoring
+RESCORE_MIN = 40
+
+# Rows scored per matrix product in a flat scan; bounds the float32 working copy of float16 data
+SCAN_BLOCK_ROWS = 8192
+
+# The IVF index is retrained once rows appended after training exceed this fraction of it
+IVF_REBUILD_FRACTION = 0.2
+IVF_TRAIN_ITERATIONS = 10
+
+DTYPES = {"float32": np.float32, "float16": np.float16}
+DISTANCE_SPACES = ("l2", "cosine", "ip")  # Chroma's hnsw:space values; Chroma defaults to l2
+
+
+class VectorCollection(Protocol):
+    """
+    The collection operations the RAG server relies on (a subset of Chroma's API)
+
+    Satisfied structurally by Chroma collections and MmapCollection. Results
+    use Chroma's shapes: query returns one list per query vector under ids,
+    documents, metadatas, distances (and embeddings when included); get
+    returns flat lists. Adding an ID that already exists is a no-op.
+    """
+
+    def add(self, ids: List[str], embeddings: List[List[float]], documents: Optional[List[str]] = None,
+            metadatas: Optional[List[Dict]] = None): ...
+
+    def query(self, query_embeddings: List[List[float]], n_results: int = 10, where: Optional[Dict] = None,
+              include: Optional[List[str]] = None) -> Dict: ...
+
+    def get(self, ids: Optional[List[str]] = None, include: Optional[List[str]] = None) -> Dict: ...
+
+    def update(self, ids: List[str], embeddings: Optional[List[List[float]]] = None,
+               metadatas: Optional[List[Dict]] = None, documents: Optional[List[str]] = None): ...
+
+    def delete(self, ids: List[str]): ...
+
+    def count(self) -> int: ...
+
+
+class MmapCollection:
+    """
+    Embeddings in an append-only memory-mapped matrix, IDs and metadata in SQLite
+
+    Files in the collection directory:
+        vectors.bin  row-major float32/float16 embeddings, one row per record ever added
+        norms.bin    float32 squared norm of each row
+        sidecar.db   records(row, id, document, metadata, deleted) plus collection settings
+        ivf.npz      optional inverted-file index (centroids and rows grouped by list)
+        codes.bin    optional int8 / PQ codes of each row, with the trained quantizer in quantizer.npz
+
+    Deletes set a tombstone; compact() rewrites the files without them (a crash
+    part-way is finished or discarded on the next open). Queries
+    scan every live row with blocked matrix products (BLAS), or only the nprobe
+    closest IVF lists once the collection has IVF_MIN_ROWS rows and index="ivf".
+
+    With quantization="int8" or "pq" (and QUANT_MIN_ROWS rows to train on) scans
+    read only the codes; the best n_results * RESCORE_FACTOR candidates are then
+    re-scored against the full-precision rows, so only those pages of vectors.bin
+    are touched and the resident set shrinks to roughly the codes.
+    """
+
+    def __init__(self, directory: str, name: str, metadata: Optional[Dict] = None,
+                 dtype: str = DEFAULT_DTYPE, index: str = DEFAULT_INDEX, nprobe: int = IVF_NPROBE,
+                 quantization: Optional[str] = None, pq_subspaces: int = PQ_SUBSPACES):
+        os.makedirs(directory, exist_ok=True)
+        self.name = name
+        self.directory = directory
+        self.nprobe = nprobe
+        self.pq_subspaces = pq_subspaces
+        self._lock = threading.RLock()
+        self._vectors_path = os.path.join(directory, "vectors.bin")
+        self._norms_path = os.path.join(directory, "norms.bin")
+        self._ivf_path = os.path.join(directory, "ivf.npz")
+        self._codes_path = os.path.join(directory, "codes.bin")
+        self._quantizer_path = os.path.join(directory, "quantizer.npz")
+
+        self._conn = sqlite3.connect(os.path.join(directory, "sidecar.db"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS records (
+                row INTEGER PRIMARY KEY,
+                id TEXT NOT NULL,
+                document TEXT,
+                metadata TEXT NOT NULL DEFAULT '{}',
+                deleted INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_records_live_id ON records (id) WHERE deleted = 0;
+        """)
+
+        # Settings are fixed by the first open; later opens read them back
+        metadata = metadata or {}
+        space = metadata.get("hnsw:space", "l2")
+        if space not in DISTANCE_SPACES or dtype not in DTYPES or index not in ("flat", "ivf") or \
+                quantization not in (None,) + QUANTIZATIONS:
+            raise ValueError(
+                f"Unsupported collection settings: space={space}, dtype={dtype}, index={index}, quantization={quantization}"
+            )
+        for key, value in (("dtype", dtype), ("space", space), ("index", index), ("metadata", json.dumps(metadata)),
+                           ("quantization", "none")):
+            self._conn.execute("INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)", (key, value))
+
+        # Codes are derived from the vectors, so quantization may be switched on any open
+        stored = self._conn.execute("SELECT value FROM settings WHERE key = 'quantization'").fetchone()[0]
+        changed = quantization is not None and quantization != stored
+        if quantization == "pq" and not changed and os.path.exists(self._quantizer_path):
+            with np.load(self._quantizer_path) as data:
+                changed = data["codebooks"].shape[0] != pq_subspaces
+        if changed:
+            self._conn.execute("UPDATE settings SET value = ? WHERE key = 'quantization'", (quantization,))
+            for path in (self._codes_path, self._quantizer_path):
+                if os.path.exists(path):
+                    os.remove(path)
+        self._conn.commit()
+        settings = dict(self._conn.execute("SELECT key, value FROM settings"))
+        self.dtype = DTYPES[settings["dtype"]]
+        self.space = settings["space"]
+        self.index = settings["index"]
+        self.quantization = settings["quantization"]
+        self.metadata = json.loads(settings["metadata"])
+        self.dim = int(settings["dim"]) if "dim" in settings else None
+
+        self._load()
+
+    # -- state ---------------------------------------------------------------
+
+    def _load(self):
+        """Read the sidecar and map the vector files (dropping rows a crash left half-written)"""
+        self._finish_compaction()
+        rows = self._conn.execute("SELECT row, id, deleted FROM records ORDER BY row").fetchall()
+        self._ids = [doc_id for _, doc_id, _ in rows]
+        self._alive = np.array([not deleted for _, _, deleted in rows], dtype=bool)
+        self._row_of = {doc_id: row for row, doc_id, deleted in rows if not deleted}
+
+        total = len(rows)
+        if self.dim is not None:
+            for path, width in ((self._vectors_path, self.dim * np.dtype(self.dtype).itemsize), (self._norms_path, 4)):
+                if os.path.exists(path) and os.path.getsize(path) > total * width:
+                    with open(path, "r+b") as f:
+                        f.truncate(total * width)
+        self._map()
+
+        self._ivf = None
+        if os.path.exists(self._ivf_path):
+            with np.load(self._ivf_path) as data:
+                self._ivf = {key: data[key] for key in data.files}
+
+        self._quantizer = None
+        if os.path.exists(self._quantizer_path):
+            with np.load(self._quantizer_path) as data:
+                self._quantizer = {key: data[key] for key in data.files}
+            self._quantizer["kind"] = str(self._quantizer["kind"])
+        self._sync_codes()
+
+    def _finish_compaction(self):
+        """
+        Complete or discard a compaction that a crash interrupted
+
+        The sidecar commit that renumbers the records also sets the 'compacting'
+        marker, so it decides: with the marker, the .compact files are swapped in
+        (renumbered rows must never meet the old files); without it, they are leftovers.
+        """
+        pending = self._conn.execute("SELECT 1 FROM settings WHERE key = 'compacting'").fetchone()
+        for path in (self._vectors_path, self._norms_path, self._codes_path):
+            if os.path.exists(path + ".compact"):
+                if pending:
+                    os.replace(path + ".compact", path)
+                else:
+                    os.remove(path + ".compact")
+        if pending:
+            if os.path.exists(self._ivf_path):
+                os.remove(self._ivf_path)  # lists hold pre-compaction row numbers
+            self._conn.execute("DELETE FROM settings WHERE key = 'compacting'")
+            self._conn.commit()
+
+    def _map(self):
+        """(Re)map the vector and norm files for the current row count"""
+        total = len(self._ids)
+        if total and self.dim:
+            self._vectors = np.memmap(self._vectors_path, dtype=self.dtype, mode="r", shape=(total, self.dim))
+            self._norms = np.memmap(self._norms_path, dtype=np.float32, mode="r", shape=(total,))
+        else:
+            self._vectors = np.zeros((0, self.dim or 0), dtype=self.dtype)
+            self._norms = np.zeros(0, dtype=np.float32)
+
+    # -- writes --------------------------------------------------------------
+
+    def add(self, ids: List[str], embeddings: List[List[float]], documents: Optional[List[str]] = None,
+            metadatas: Optional[List[Dict]] = None):
+        """Append records; IDs that are already live are left as they are"""
+        if len(set(ids)) != len(ids):
+            raise ValueError("IDs must be unique within one add")
+        documents = documents if documents is not None else [None] * len(ids)
+        metadatas = metadatas if metadatas is not None else [{}] * len(ids)
+
+        with self._lock:
+            keep = [i for i, doc_id in enumerate(ids) if doc_id not in self._row_of]
+            if not keep:
+                return
+
+            vectors = np.asarray(embeddings, dtype=np.float32)[keep].astype(self.dtype)
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                self._conn.execute("INSERT INTO settings (key, value) VALUES ('dim', ?)", (str(self.dim),))
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match collection dimension {self.dim}")
+
+            # Vectors first, then the sidecar rows that make them visible
+            start = len(self._ids)
+            with open(self._vectors_path, "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self._norms_path, "ab") as f:
+                squared = vectors.astype(np.float32)
+                f.write(np.einsum("ij,ij->i", squared, squared).astype(np.float32).tobytes())
+
+            self._conn.executemany(
+                "INSERT INTO records (row, id, document, metadata) VALUES (?, ?, ?, ?)",
+                [(start + n, ids[i], documents[i], json.dumps(metadatas[i] or {})) for n, i in enumerate(keep)]
+            )
+            self._conn.commit()
+
+            for n, i in enumerate(keep):
+                self._ids.append(ids[i])
+                self._row_of[ids[i]] = start + n
+            self._alive = np.concatenate([self._alive, np.ones(len(keep), dtype=bool)])
+            self._map()
+            self._sync_codes()
+
+            if self.index == "ivf" and self._ivf_stale():
+                self.build_index()
+
+    def update(self, ids: List[str], embeddings: Optional[List[List[float]]] = None,
+               metadatas: Optional[List[Dict]] = None, documents: Optional[List[str]] = None):
+        """Replace the metadata and/or documents of live records; unknown IDs are skipped"""
+        if embeddings is not None:
+            raise ValueError("Embeddings are immutable in the mmap backend; delete and add instead")
+        with self._lock:
+            rows = [(i, self._row_of[doc_id]) for i, doc_id in enumerate(ids) if doc_id in self._row_of]
+            if metadatas is not None:
+                self._conn.executemany(
+                    "UPDATE records SET metadata = ? WHERE row = ?",
+                    [(json.dumps(metadatas[i] or {}), row) for i, row in rows]
+                )
+            if documents is not None:
+                self._conn.executemany("UPDATE records SET document = ? WHERE row = ?", [(documents[i], row) for i, row in rows])
+            self._conn.commit()
+
+    def delete(self, ids: List[str]):
+        """Tombstone records; their space is reclaimed by compact()"""
+        with self._lock:
+            rows = [self._row_of.pop(doc_id) for doc_id in ids if doc_id in self._row_of]
+            if rows:
+                self._conn.executemany("UPDATE records SET deleted = 1 WHERE row = ?", [(row,) for row in rows])
+                self._conn.commit()
+                self._alive[rows] = False
+
+    def compact(self) -> Dict:
+        """
+        Rewrite the vector files and sidecar without tombstoned rows
+
+        Returns:
+            Row counts before/after and bytes reclaimed
+        """
+        with self._lock:
+            before = len(self._ids)
+            live = np.flatnonzero(self._alive)
+            if len(live) == before:
+                return {"rows_before": before, "rows_after": before, "bytes_reclaimed": 0}
+            size_before = self.disk_bytes()
+
+            # New files beside the old ones, written in blocks
+            files = [(self._vectors_path, self._vectors), (self._norms_path, self._norms)]
+            if self._codes is not None:
+                files.append((self._codes_path, self._codes))
+            for path, source in files:
+                with open(path + ".compact", "wb") as f:
+                    for start in range(0, len(live), SCAN_BLOCK_ROWS):
+                        f.write(np.ascontiguousarray(source[live[start:start + SCAN_BLOCK_ROWS]]).tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())  # durable before the sidecar commit that makes them current
+
+            # Renumbered records and the 'compacting' marker commit together; _finish_compaction swaps the files
+            self._conn.executescript("""
+                BEGIN;
+                CREATE TABLE records_compacted (
+                    row INTEGER PRIMARY KEY,
+                    id TEXT NOT NULL,
+                    document TEXT,
+                    metadata TEXT NOT NULL DEFAULT '{}',
+                    deleted INTEGER NOT NULL DEFAULT 0
+                );
+                INSERT INTO records_compacted (row, id, document, metadata)
+                    SELECT ROW_NUMBER() OVER (ORDER BY row) - 1, id, document, metadata
+                    FROM records WHERE deleted = 0;
+                DROP TABLE records;
+                ALTER TABLE records_compacted RENAME TO records;
+                CREATE UNIQUE INDEX idx_records_live_id ON records (id) WHERE deleted = 0;
+                INSERT OR REPLACE INTO settings (key, value) VALUES ('compacting', '1');
+                COMMIT;
+            """)
+            self._vectors = self._norms = self._codes = None
+            self._load()
+            self._conn.execute("VACUUM")
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            if self.index == "ivf" and len(self._ids) >= IVF_MIN_ROWS:
+                self.build_index()
+            return {
+                "rows_before": before,
+                "rows_after": len(self._ids),
+                "bytes_reclaimed": size_before - self.disk_bytes()
+            }
+
+    # -- quantization --------------------------------------------------------
+
+    def _sync_codes(self):
+        """Train the quantizer once there are enough rows, encode rows that have no codes yet, map the codes"""
+        self._codes = None
+        if self.quantization == "none" or not self.dim:
+            return
+        if self._quantizer is None:
+            if len(self._row_of) >= QUANT_MIN_ROWS:
+                self.train_quantizer()  # encodes and maps through _sync_codes
+            return
+
+        total = len(self._ids)
+        width = code_width(self._quantizer)
+        encoded = os.path.getsize(self._codes_path) // width if os.path.exists(self._codes_path) else 0
+        if encoded > total:
+            with open(self._codes_path, "r+b") as f:
+                f.truncate(total * width)
+        elif encoded < total:
+            with open(self._codes_path, "ab") as f:
+                for start in range(encoded, total, SCAN_BLOCK_ROWS):
+                    block = np.asarray(self._vectors[start:min(start + SCAN_BLOCK_ROWS, total)], dtype=np.float32)
+                    f.write(encode_vectors(self._quantizer, block).tobytes())
+        self._codes = np.memmap(self._codes_path, dtype=code_dtype(self._quantizer), mode="r", shape=(total, width))
+
+    def train_quantizer(self, seed: int = 0):
+        """
+        (Re)train the collection's quantizer on a sample of live rows; every row is re-encoded
+
+        Args:
+            seed: Sampling/initialization seed
+        """
+        with self._lock:
+            live = np.flatnonzero(self._alive)
+            if self.quantization == "none" or len(live) == 0:
+                return
+            rng = np.random.default_rng(seed)
+            sample = np.sort(rng.choice(live, size=min(len(live), TRAIN_SAMPLE), replace=False))
+            self._quantizer = train_quantizer(
+                self.quantization, np.asarray(self._vectors[sample], dtype=np.float32), self.pq_subspaces, seed
+            )
+            np.savez(self._quantizer_path + ".tmp.npz", **self._quantizer)
+            os.replace(self._quantizer_path + ".tmp.npz", self._quantizer_path)
+
+            self._codes = None
+            if os.path.exists(self._codes_path):
+                os.remove(self._codes_path)
+            self._sync_codes()
+
+    def _rescore(self, query: np.ndarray, rows: np.ndarray, k: int):
+        """
+        Exact top-k (distances, rows) among quantized-scan candidates, from the full-precision rows
+
+        The rows are read with pread rather than through the memory map: page faults on
+        the map would read around each row and leave most of vectors.bin resident.
+        """
+        rows = np.sort(rows)
+        width = self.dim * np.dtype(self.dtype).itemsize
+        with open(self._vectors_path, "rb") as f:
+            raw = b"".join(os.pread(f.fileno(), width, int(row) * width) for row in rows)
+        vectors = np.frombuffer(raw, dtype=self.dtype).reshape(len(rows), self.dim).astype(np.float32)
+        distances = self._distances(
+            (vectors @ query)[None, :], np.array([query @ query]), np.asarray(self._norms[rows])
+        )[0].astype(np.float32)
+        order = np.argsort(distances, kind="stable")[:k]
+        return distances[order], rows[order]
+
+    # -- IVF -----------------------------------------------------------------
+
+    def _ivf_stale(self) -> bool:
+        """Whether the IVF index is missing or has too many unindexed rows"""
+        total = len(self._ids)
+        if total < IVF_MIN_ROWS:
+            return False
+        if self._ivf is None:
+            return True
+        indexed = int(self._ivf["indexed_rows"])
+        return total - indexed > IVF_REBUILD_FRACTION * indexed
+
+    def build_index(self, nlist: Optional[int] = None, seed: int = 0):
+        """
+        Train an inverted-file index: spherical k-means on a sample, every live row assigned to its list
+
+        Args:
+            nlist: Number of lists (default ~sqrt(rows), at most 4096)
+            seed: Sampling/initialization seed
+        """
+        with self._lock:
+            live = np.flatnonzero(self._alive)
+            if len(live) == 0:
+                return
+            nlist = min(nlist or int(math.sqrt(len(live))), 4096, len(live))
+            rng = np.random.default_rng(seed)
+
+            sample = np.sort(rng.choice(live, size=min(len(live), nlist * 64), replace=False))
+            data = _unit_rows(np.asarray(self._vectors[sample], dtype=np.float32))
+            centroids = data[rng.choice(len(data), size=nlist, replace=False)]
+            for _ in range(IVF_TRAIN_ITERATIONS):
+                assign = np.argmax(data @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assign, data)
+                empty = ~np.bincount(assign, minlength=nlist).astype(bool)
+                sums[empty] = centroids[empty]
+                centroids = _unit_rows(sums)
+
+            assign = np.empty(len(live), dtype=np.int32)
+            for start in range(0, len(live), SCAN_BLOCK_ROWS):
+                rows = live[start:start + SCAN_BLOCK_ROWS]
+                assign[start:start + len(rows)] = np.argmax(
+                    np.asarray(self._vectors[rows], dtype=np.float32) @ centroids.T, axis=1
+                )
+            order = np.argsort(assign, kind="stable")
+            self._ivf = {
+                "centroids": centroids.astype(np.float32),
+                "rows": live[order].astype(np.int64),
+                "offsets": np.searchsorted(assign[order], np.arange(nlist + 1)).astype(np.int64),
+                "indexed_rows": np.int64(len(self._ids))
+            }
+            np.savez(self._ivf_path + ".tmp.npz", **self._ivf)
+            os.replace(self._ivf_path + ".tmp.npz", self._ivf_path)
+
+    # -- reads ---------------------------------------------------------------
+
+    def _distances(self, dots: np.ndarray, query_norms: np.ndarray, row_norms: np.ndarray) -> np.ndarray:
+        """Chroma-compatible distances from dot products (smaller is closer)"""
+        if self.space == "l2":
+            return np.maximum(query_norms[:, None] + row_norms[None, :] - 2 * dots, 0)
+        if self.space == "ip":
+            return 1 - dots
+        return 1 - dots / np.sqrt(np.maximum(query_norms[:, None] * row_norms[None, :], 1e-24))
+
+    def _blocks(self, segments: List, source: np.ndarray):
+        """(row numbers, rows of source) blocks for contiguous (start, stop) ranges or row arrays"""
+        data = np.asarray(source)
+        for segment in segments:
+            if isinstance(segment, tuple):
+                for start in range(segment[0], segment[1], SCAN_BLOCK_ROWS):
+                    stop = min(start + SCAN_BLOCK_ROWS, segment[1])
+                    yield np.arange(start, stop), data[start:stop]
+            else:
+                for start in range(0, len(segment), SCAN_BLOCK_ROWS):
+                    rows = segment[start:start + SCAN_BLOCK_ROWS]
+                    yield rows, data.take(rows, axis=0)
+
+    def _scan(self, queries: np.ndarray, segments: List, k: int):
+        """Top-k (distance, row) per query over the rows in segments (see _blocks); approximate when quantized"""
+        query_norms = np.einsum("ij,ij->i", queries, queries)
+        best_d = np.full((len(queries), 0), np.inf, dtype=np.float32)
+        best_r = np.zeros((len(queries), 0), dtype=np.int64)
+
+        quantized = self._codes is not None
+        for block_rows, block in self._blocks(segments, self._codes if quantized else self._vectors):
+            if quantized:
+                dots = approximate_dots(self._quantizer, block, queries)
+            else:
+                dots = queries @ block.astype(np.float32, copy=False).T
+            distances = self._distances(dots, query_norms, np.asarray(self._norms[block_rows]))
+            distances[:, ~self._alive[block_rows]] = np.inf
+
+            best_d = np.concatenate([best_d, distances.astype(np.float32)], axis=1)
+            best_r = np.concatenate([best_r, np.broadcast_to(block_rows, distances.shape)], axis=1)
+            if best_d.shape[1] > k:
+                keep = np.argpartition(best_d, k - 1, axis=1)[:, :k]
+                best_d = np.take_along_axis(best_d, keep, axis=1)
+                best_r = np.take_along_axis(best_r, keep, axis=1)
+
+        order = np.argsort(best_d, axis=1, kind="stable")
+        return np.take_along_axis(best_d, order, axis=1), np.take_along_axis(best_r, order, axis=1)
+
+    def _probe(self, query: np.ndarray) -> List:
+        """Segments to scan for a query: its nprobe closest IVF lists, plus the rows added since training"""
+        ivf = self._ivf
+        lists = np.argsort(-(ivf["centroids"] @ (query / (np.linalg.norm(query) or 1))))[:self.nprobe]
+        listed = np.sort(np.concatenate([ivf["rows"][ivf["offsets"][i]:ivf["offsets"][i + 1]] for i in lists]))
+        return [listed, (int(ivf["indexed_rows"]), len(self._ids))]
+
+    def query(self, query_embeddings: List[List[float]], n_results: int = 10, where: Optional[Dict] = None,
+              include: Optional[List[str]] = None) -> Dict:
+        """Nearest live records for each query vector, in Chroma's result shape"""
+        if where:
+            raise ValueError("Metadata filters are not supported by the mmap backend")
+        include = include or ["documents", "metadatas", "distances"]
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(len(query_embeddings), -1)
+
+        with self._lock:
+            k = min(n_results, len(self._row_of))
+            fetch = k if self._codes is None else min(max(k * RESCORE_FACTOR, RESCORE_MIN), len(self._row_of))
+            if k == 0:
+                found = [(np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)) for _ in queries]
+            elif self._ivf is not None and self.index == "ivf":
+                found = []
+                for query in queries:
+                    distances, rows = self._scan(query[None, :], self._probe(query), fetch)
+                    found.append((distances[0], rows[0]))
+            else:
+                distances, rows = self._scan(queries, [(0, len(self._ids))], fetch)
+                found = list(zip(distances, rows))
+
+            if self._codes is not None and k:
+                found = [self._rescore(query, r[np.isfinite(d)], k) for query, (d, r) in zip(queries, found)]
+
+            # Drop padding from lists that had fewer than k live rows
+            found = [(d[np.isfinite(d)], r[np.isfinite(d)]) for d, r in found]
+            records = self._records(sorted({int(row) for _, rows in found for row in rows}))
+            vectors = self._vectors
+
+            result = {"ids": [[self._ids[int(row)] for row in rows] for _, rows in found]}
+            if "documents" in include:
+                result["documents"] = [[records[int(row)][0] for row in rows] for _, rows in found]
+            if "metadatas" in include:
+                result["metadatas"] = [[records[int(row)][1] for row in rows] for _, rows in found]
+            if "distances" in include:
+                result["distances"] = [[float(d) for d in distances] for distances, _ in found]
+            if "embeddings" in include:
+                result["embeddings"] = [np.asarray(vectors[rows], dtype=np.float32) for _, rows in found]
+        return result
+
+    def _records(self, rows: List[int]) -> Dict[int, tuple]:
+        """row -> (document, metadata) from the sidecar"""
+        records = {}
+        for start in range(0, len(rows), 500):
+            chunk = rows[start:start + 500]
+            for row, document, metadata in self._conn.execute(
+                f"SELECT row, document, metadata FROM records WHERE row IN ({','.join('?' * len(chunk))})", chunk
+            ):
+                records[row] = (document, json.loads(metadata))
+        return records
+
+    def get(self, ids: Optional[List[str]] = None, include: Optional[List[str]] = None) -> Dict:
+        """Live records by ID (all of them when ids is None), in Chroma's result shape"""
+        include = include or ["documents", "metadatas"]
+        with self._lock:
+            if ids is None:
+                rows = sorted(self._row_of.values())
+            else:
+                rows = [self._row_of[doc_id] for doc_id in ids if doc_id in self._row_of]
+            records = self._records(rows)
+            result = {"ids": [self._ids[row] for row in rows]}
+            if "documents" in include:
+                result["documents"] = [records[row][0] for row in rows]
+            if "metadatas" in include:
+                result["metadatas"] = [records[row][1] for row in rows]
+            if "embeddings" in include:
+                result["embeddings"] = np.asarray(self._vectors[rows], dtype=np.float32)
+        return result
+
+    def count(self) -> int:
+        """Live records"""
+        return len(self._row_of)
+
+    def disk_bytes(self) -> int:
+        """Bytes used by the collection's files"""
+        return sum(
+            os.path.getsize(os.path.join(self.directory, entry))
+            for entry in os.listdir(self.directory)
+            if os.path.isfile(os.path.join(self.directory, entry))
+        )
+
+    def stats(self) -> Dict:
+        """Row counts, tombstones, index state and storage"""
+        with self._lock:
+            return {
+                "live": len(self._row_of),
+                "tombstones": len(self._ids) - len(self._row_of),
+                "dimension": self.dim,
+                "dtype": np.dtype(self.dtype).name,
+                "space": self.space,
+                "index": "ivf" if self._ivf is not None and self.index == "ivf" else "flat",
+                "ivf_lists": len(self._ivf["centroids"]) if self._ivf is not None else 0,
+                "quantization": self.quantization,
+                "quantized_rows": len(self._codes) if self._codes is not None else 0,
+                "code_bytes": code_width(self._quantizer) if self._quantizer is not None else 0,
+                "disk_bytes": self.disk_bytes()
+            }
+
+    def close(self):
+        """Release the memory maps and the sidecar connection"""
+        with self._lock:
+            self._vectors = self._norms = self._codes = None
+            self._conn.close()
+
+
+class MmapVectorStore:
+    """Directory of MmapCollections, with the client methods the RAG server uses"""
+
+    def __init__(self, path: str, dtype: str = DEFAULT_DTYPE, index: str = DEFAULT_INDEX):
+        self.path = path
+        self.dtype = dtype
+        self.index = index
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def get_or_create_collection(self, name: str, metadata: Optional[Dict] = None) -> MmapCollection:
+        """Open a collection, creating its directory on first use (metadata["quantization"] switches codes on/off)"""
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = MmapCollection(
+                    os.path.join(self.path, name), name, metadata, dtype=self.dtype, index=self.index,
+                    quantization=(metadata or {}).get("quantization")
+                )
+            return self._collections[name]
+
+
+def create_vector_store(backend: str = DEFAULT_BACKEND, path: Optional[str] = None):
+    """
+    Client for the configured backend
+
+    Args:
+        backend: "chroma" (chromadb.PersistentClient) or "mmap" (MmapVectorStore)
+        path: Storage directory
+
+    Returns:
+        An object with get_or_create_collection(name, metadata)
+    """
+    if backend == "chroma":
+        import chromadb
+        from chromadb.config import Settings
+        return chromadb.PersistentClient(path=path or "./chroma_db", settings=Settings(anonymized_telemetry=False))
+    if backend == "mmap":
+        return MmapVectorStore(path or "./vector_store")
+    raise ValueError(f"Unknown vector store backend: {backend}")
+
+
+def _unit_rows(matrix: np.ndarray) -> np.ndarray:
+    """Rows scaled to unit length (zero rows stay zero)"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)